@@ -0,0 +1,90 @@
+"""
+Compare generic per-call preprocessing with the preallocated LetterboxBuffer.
+
+The generic path mirrors what the YOLO predictor does for every frame
+(letterbox, BGR -> RGB, HWC -> CHW, contiguous copy, float conversion, /255).
+Reports per-frame time and the memory allocated per frame.
+
+Usage:
+    python bench_preprocess.py [--video uploads/sample.mp4] [--frames 300]
+"""
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+from src.detection.preprocess import LetterboxBuffer
+
+def generic_preprocess(frame, imgsz=640, stride=32):
+    """Per-call letterbox + normalize, allocating new arrays each time"""
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    pad_w = (-(-new_w // stride) * stride - new_w) / 2
+    pad_h = (-(-new_h // stride) * stride - new_h) / 2
+
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    padded = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                                value=(114, 114, 114))
+    chw = np.ascontiguousarray(padded[None, ..., ::-1].transpose(0, 3, 1, 2))
+    return chw.astype(np.float32) / 255.0
+
+def load_frames(video_path, count):
+    """Frames from a video, or synthetic 720p frames when no video is given"""
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        frames = []
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if frames:
+            return frames
+        print(f"Could not read {video_path}, using synthetic frames")
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(min(count, 30))]
+
+def measure(name, fn, frames, repeats):
+    """Time fn over frames and measure the memory it allocates per frame"""
+    fn(frames[0])  # warm caches / buffers
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for frame in frames:
+            fn(frame)
+    per_frame_ms = (time.perf_counter() - start) * 1000 / (repeats * len(frames))
+
+    # Peak traced memory above the baseline while preprocessing one frame
+    tracemalloc.start()
+    allocated = []
+    for frame in frames:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(frame)
+        allocated.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    print(f"{name:<14}{per_frame_ms:>10.2f} ms/frame{np.mean(allocated) / 1024:>12.1f} KiB allocated/frame")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detector preprocessing")
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}\n")
+
+    buffer = LetterboxBuffer()
+    measure("generic", generic_preprocess, frames, args.repeats)
+    measure("preallocated", lambda frame: buffer.load([frame]), frames, args.repeats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compare two benchmark result files from benchmarks/run_pipeline.py.
+
+Prints fps and per-stage p50 / p99 for every scenario present in both runs,
+with the relative change of the candidate against the baseline.
+
+Usage (from backend/):
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {result["scenario"]: result for result in report["results"]}
+
+def change(before, after):
+    if not before or after is None:
+        return "      n/a"
+    return f"{(after - before) / before * 100:>+8.1f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two pipeline benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    base_report, baseline = load(args.baseline)
+    cand_report, candidate = load(args.candidate)
+    for label, report in (("baseline", base_report), ("candidate", cand_report)):
+        env = report["environment"]
+        print(f"{label:<10} {env['timestamp']}  commit {env['commit']}  {report['detector']}  {report.get('tag', '')}")
+
+    for scenario in [name for name in baseline if name in candidate]:
+        before, after = baseline[scenario], candidate[scenario]
+        print(f"\n{scenario}")
+        print(f"  {'metric':<20}{'baseline':>12}{'candidate':>12}{'change':>10}")
+        print(f"  {'fps':<20}{before['fps']:>12.1f}{after['fps']:>12.1f}{change(before['fps'], after['fps'])}")
+        print(f"  {'peak RSS MiB':<20}{before['peak_rss_mib']:>12.1f}{after['peak_rss_mib']:>12.1f}"
+              f"{change(before['peak_rss_mib'], after['peak_rss_mib'])}")
+        for stage in before["stages"]:
+            if stage not in after["stages"]:
+                continue
+            for key in ("p50_ms", "p99_ms"):
+                old, new = before["stages"][stage][key], after["stages"][stage][key]
+                print(f"  {stage + ' ' + key:<20}{old:>12.3f}{new:>12.3f}{change(old, new)}")
+
+    missing = set(baseline) ^ set(candidate)
+    if missing:
+        print(f"\nScenarios only in one run: {', '.join(sorted(missing))}")
+
+if __name__ == "__main__":
+    main()
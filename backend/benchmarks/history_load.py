@@ -0,0 +1,177 @@
+"""
+/analysis-history load test.
+
+Fills analysis_logs with synthetic LLM analyses (random risk scores, a
+realistic prompt / RF payload / analysis text, timestamps spread over a
+year) in stages, and after each stage times the queries the endpoint runs:
+first page, a page 50 pages deep (keyset cursor), risk range, time window
+and the lightweight summary projection. With the startup indexes in place
+every query's latency should stay flat as the collection grows to 1M
+documents; the skip() column shows what offset pagination would cost at the
+same depth. Query plans are recorded from explain() so a missing index shows
+up as COLLSCAN.
+
+Run against a disposable database: the collection is dropped first. The
+in-process fake (memory://) has no indexes and scans, so it only checks that
+the script and queries work.
+
+Usage (from backend/):
+    MONGO_URI=mongodb://localhost:27017/uav_bench python -m benchmarks.history_load
+    MONGO_URI=mongodb://localhost:27017/uav_bench python -m benchmarks.history_load --stages 10000 100000 1000000
+    MONGO_URI=memory:// python -m benchmarks.history_load --stages 1000 5000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.db.history import ANALYSIS_LOGS, INDEXES, analysis_query, ensure_collections, field_projection
+from src.db.mongo import MEMORY_URI, MongoStore
+from src.db.pagination import paginate
+from benchmarks.run_pipeline import environment
+
+PAGE_SIZE = 50
+DEEP_PAGES = 50
+INSERT_BATCH = 10000
+START = datetime(2026, 1, 1)
+SPAN = timedelta(days=365)
+
+def synthetic_analysis(rng: random.Random) -> dict:
+    """One analysis_logs document shaped like what /analyze-json stores"""
+    risk = round(rng.random() * 10, 1)
+    return {
+        "success": True,
+        "status": 200,
+        "model": "gemini-2.0-flash",
+        "timestamp": START + timedelta(seconds=rng.random() * SPAN.total_seconds()),
+        "request_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "data": {
+            "input": {
+                "prompt": "Analyze the following RF signal data based on the provided framework.",
+                "rf_data": {"frequency_mhz": 2400 + rng.random() * 100,
+                            "rssi_dbm": -90 + rng.random() * 60,
+                            "samples": [round(rng.random(), 3) for _ in range(64)]},
+            },
+            "output": {"analysis": "Signal consistent with a consumer drone control link. " * 20,
+                       "risk_score": risk},
+        },
+        "error": None,
+        "risk_score": risk,
+    }
+
+def scenarios():
+    """(name, query, projection, cursor pages to follow first)"""
+    window_start = START + SPAN / 2
+    return [
+        ("first_page", {}, None, 0),
+        ("deep_page", {}, None, DEEP_PAGES),
+        ("risk_range", analysis_query(min_risk=8.0), None, 0),
+        ("time_window", analysis_query(since=window_start, until=window_start + timedelta(days=7)), None, 0),
+        ("risk_and_window", analysis_query(min_risk=5.0, since=window_start,
+                                           until=window_start + timedelta(days=30)), None, 0),
+        ("summary_rows", {}, field_projection("summary"), 0),
+    ]
+
+async def fill(collection, target: int, current: int, rng: random.Random):
+    while current < target:
+        batch = [synthetic_analysis(rng) for _ in range(min(INSERT_BATCH, target - current))]
+        current += await collection.insert_many(batch)
+    return current
+
+def plan_stages(plan: dict) -> list:
+    """Stage names of an explain() winning plan, outermost first"""
+    stages, node = [], plan.get("queryPlanner", {}).get("winningPlan", {})
+    while node:
+        stages.append(node.get("stage", "?"))
+        node = node.get("inputStage") or (node.get("inputStages") or [None])[0]
+    return stages
+
+async def measure(store: MongoStore, collection, repeat: int, explain: bool) -> dict:
+    results = {}
+    for name, query, projection, pages in scenarios():
+        # Follow the cursor to the starting page once; timing covers the page itself
+        cursor = None
+        for _ in range(pages):
+            _, cursor = await paginate(collection, query, "timestamp", PAGE_SIZE, cursor, projection)
+            if cursor is None:
+                break
+
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows, _ = await paginate(collection, query, "timestamp", PAGE_SIZE, cursor, projection)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        result = {"p50_ms": float(np.percentile(latencies, 50)), "p99_ms": float(np.percentile(latencies, 99)),
+                  "rows": len(rows)}
+        if explain:
+            explained = await store.run(lambda: collection.raw.find(query, projection)
+                                        .sort([("timestamp", -1), ("_id", -1)]).limit(PAGE_SIZE + 1).explain())
+            result["plan"] = plan_stages(explained)
+        results[name] = result
+
+    # Offset pagination to the same depth as deep_page, for contrast
+    start = time.perf_counter()
+    await collection.find({}, None, sort=[("timestamp", -1), ("_id", -1)], skip=DEEP_PAGES * PAGE_SIZE,
+                          limit=PAGE_SIZE)
+    results["deep_page_skip"] = {"p50_ms": (time.perf_counter() - start) * 1000}
+    return results
+
+def print_stage(count: int, results: dict):
+    print(f"\n{count:,} documents")
+    print(f"{'query':<18}{'p50 ms':>9}{'p99 ms':>9}{'rows':>6}  plan")
+    for name, result in results.items():
+        plan = " <- ".join(result.get("plan", []))
+        print(f"{name:<18}{result['p50_ms']:>9.2f}{result.get('p99_ms', float('nan')):>9.2f}"
+              f"{result.get('rows', ''):>6}  {plan}")
+
+async def run(args) -> dict:
+    store = MongoStore(args.uri, max_pool_size=8)
+    if not await store.connect():
+        raise SystemExit(f"Cannot reach MongoDB at {args.uri}")
+    await store.run(store.db.drop_collection, ANALYSIS_LOGS)
+    await ensure_collections(store)
+    collection = store.collection(ANALYSIS_LOGS)
+
+    rng = random.Random(args.seed)
+    stages, count = [], 0
+    for target in sorted(args.stages):
+        start = time.perf_counter()
+        count = await fill(collection, target, count, rng)
+        insert_seconds = time.perf_counter() - start
+        results = await measure(store, collection, args.repeat, explain=not args.uri.startswith(MEMORY_URI))
+        print_stage(count, results)
+        stages.append({"documents": count, "insert_seconds": insert_seconds, "queries": results})
+
+    await store.close()
+    return {"environment": environment(), "uri": args.uri.split("@")[-1], "page_size": PAGE_SIZE,
+            "indexes": {name: [keys for keys, _ in indexes] for name, indexes in INDEXES.items()},
+            "stages": stages}
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the analysis history queries")
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/uav_bench"))
+    parser.add_argument("--stages", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Collection sizes to measure at")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Result JSON (default benchmarks/results/history-<ts>.json)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results",
+                                         f"history-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+    print(f"\nSaved results to {output}")
+
+if __name__ == "__main__":
+    main()
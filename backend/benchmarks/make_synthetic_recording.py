@@ -0,0 +1,55 @@
+"""
+Write a labelled synthetic recording for replay_recording.py sweeps.
+
+Runs SyntheticDetector targets through the live pipeline with a PipelineRecorder
+attached, and saves per-frame ground truth (target ids, true boxes, whether the
+target should raise an alert) next to it, so sweeps can report ID switches and
+alert precision / recall.
+
+Usage (from backend/):
+    python -m benchmarks.make_synthetic_recording recordings/synthetic --targets 20 --frames 5000
+    python replay_recording.py recordings/synthetic --labels recordings/synthetic/labels.npz
+"""
+import argparse
+import os
+
+from src.alerts.alert_manager import AlertManager
+from src.detection.detector_with_tracking import DroneDetectorTracker
+from src.detection.stub_detectors import SyntheticDetector, default_zone
+from src.utils.recording import PipelineRecorder, save_labels
+from benchmarks.run_pipeline import parse_mix
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a labelled synthetic scene")
+    parser.add_argument("output", help="Recording directory")
+    parser.add_argument("--targets", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--mix", default=None, help="Pattern shares, e.g. cruise=0.5,fast=0.2,hover=0.2,zone_entry=0.1")
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--miss-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    zone = default_zone(args.width, args.height)
+    detector = SyntheticDetector(args.targets, args.width, args.height, patterns=parse_mix(args.mix),
+                                 zone=zone, noise=args.noise, miss_rate=args.miss_rate, seed=args.seed)
+    recorder = PipelineRecorder(args.output, metadata={'source_id': 'synthetic', 'restricted_zones': [zone],
+                                                       'targets': args.targets, 'seed': args.seed})
+    pipeline = DroneDetectorTracker(detector=detector, restricted_zones=[zone], recorder=recorder)
+    pipeline.alert_manager = AlertManager(log_file=None)
+
+    labels = []
+    for _ in range(args.frames):
+        labels.append(detector.labels())
+        pipeline.process_detections(None, detector.detect_array(), annotate=False)
+    pipeline.close()
+
+    labels_path = os.path.join(args.output, "labels.npz")
+    save_labels(labels_path, labels)
+    print(f"Recorded {args.frames} frames of {args.targets} targets to {args.output} "
+          f"({len(pipeline.alert_manager.alerts)} alerts), labels in {labels_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+/predict load test: throughput and latency versus concurrency.
+
+Each of N concurrent clients repeatedly sends one JPEG through the /predict
+path (cv2.imdecode off the event loop, then MicroBatcher.detect) for a fixed
+duration. Every concurrency level is run with batching off (max_batch 1) and
+on, so the table shows what coalescing buys: with batching, throughput keeps
+rising with concurrency while p99 latency grows far slower than the queue.
+
+The default detector is FixedCostDetector (real letterboxing plus a
+GPU-like cost: a fixed part per call and a smaller part per frame), so the
+numbers reflect the batching, not this machine's model speed; --model runs
+the real DroneDetector instead.
+
+Usage (from backend/):
+    python -m benchmarks.predict_load
+    python -m benchmarks.predict_load --concurrency 1 4 16 64 --max-batch 16 --max-wait-ms 10
+    python -m benchmarks.predict_load --model yolov8s.pt --backend onnx --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from src.detection.stub_detectors import FixedCostDetector, SyntheticDetector
+from src.streaming.batcher import MicroBatcher, decode_image
+from benchmarks.run_pipeline import environment
+
+def sample_jpeg(width: int = 1280, height: int = 720) -> bytes:
+    """A synthetic scene with a few targets, JPEG-encoded like a client upload"""
+    detector = SyntheticDetector(targets=5, width=width, height=height, seed=0)
+    frame = np.full((height, width, 3), 180, dtype=np.uint8)
+    ok, encoded = cv2.imencode('.jpg', detector.render(frame))
+    return encoded.tobytes()
+
+async def client(batcher: MicroBatcher, image: bytes, stop_at: float, latencies: list):
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        frame = await asyncio.to_thread(decode_image, image)
+        await batcher.detect([frame])
+        latencies.append(time.perf_counter() - start)
+
+async def measure(detector, image: bytes, concurrency: int, max_batch: int, max_wait: float,
+                  duration: float) -> dict:
+    batcher = MicroBatcher(detector, max_batch=max_batch, max_wait=max_wait)
+    batcher.start()
+    # Short warm-up so thread pools and buffers exist before timing
+    await asyncio.gather(*(client(batcher, image, time.perf_counter() + 0.2, []) for _ in range(concurrency)))
+    batches, frames = batcher.batches_run, batcher.frames_batched
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(batcher, image, start + duration, latencies) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    batches, frames = batcher.batches_run - batches, batcher.frames_batched - frames
+    await batcher.close()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "max_batch": max_batch,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+        "avg_batch": round(frames / batches, 2) if batches else 0.0,
+    }
+
+async def run(args) -> dict:
+    if args.model:
+        from src.detection.yolo_detector import DroneDetector
+        detector = DroneDetector(args.model, backend=args.backend, max_batch=args.max_batch)
+    else:
+        detector = FixedCostDetector(args.setup_ms / 1000, args.per_frame_ms / 1000, max_batch=args.max_batch)
+    image = sample_jpeg()
+
+    print(f"{'clients':>8}{'batch':>7}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'avg batch':>11}")
+    results = []
+    for concurrency in args.concurrency:
+        for max_batch in sorted({1, args.max_batch}):
+            result = await measure(detector, image, concurrency, max_batch, args.max_wait_ms / 1000, args.duration)
+            results.append(result)
+            print(f"{concurrency:>8}{max_batch:>7}{result['throughput_rps']:>9.1f}{result['p50_ms']:>9.2f}"
+                  f"{result['p99_ms']:>9.2f}{result['avg_batch']:>11.2f}")
+
+    detector_info = ({"model": args.model, "backend": args.backend} if args.model else
+                     {"setup_ms": args.setup_ms, "per_frame_ms": args.per_frame_ms})
+    return {"environment": environment(), "detector": detector_info, "max_wait_ms": args.max_wait_ms,
+            "duration_seconds": args.duration, "image_bytes": len(image), "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /predict micro-batching")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--max-batch", type=int, default=8, help="Batch size compared against no batching")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per measurement")
+    parser.add_argument("--setup-ms", type=float, default=8.0, help="FixedCostDetector cost per call")
+    parser.add_argument("--per-frame-ms", type=float, default=2.0, help="FixedCostDetector cost per frame")
+    parser.add_argument("--model", default=None, help="Run DroneDetector with these weights instead")
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--output", default=None, help="Result JSON (default benchmarks/results/predict-<ts>.json)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results",
+                                         f"predict-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+End-to-end pipeline benchmark.
+
+Runs DroneDetectorTracker (detect -> track -> behavior -> alert -> annotate)
+over the bundled sample video or over synthetic scenes with a controllable
+number of moving targets, and reports throughput, per-stage latency, peak RSS
+and (optionally) traced Python allocations. Each run is saved as JSON under
+benchmarks/results/ so runs can be compared with benchmarks/compare.py.
+
+The stub detector needs no model or GPU: synthetic scenes feed their ground
+truth (SyntheticDetector), videos use a frame-difference blob detector, and
+--replay feeds detections recorded from an earlier run (ReplayDetector).
+
+Usage (from backend/):
+    python -m benchmarks.run_pipeline --synthetic 10 100 500 --frames 600
+    python -m benchmarks.run_pipeline --synthetic 50 --mix cruise=0.4,fast=0.3,hover=0.2,zone_entry=0.1
+    python -m benchmarks.run_pipeline --replay recordings/lobby.npz
+    python -m benchmarks.run_pipeline --video uploads/istockphoto-611228576-640_adpp_is.mp4
+    python -m benchmarks.run_pipeline --detector yolo --model yolov8s.pt
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from src.alerts.alert_manager import AlertManager
+from src.detection.detector_with_tracking import DroneDetectorTracker
+from src.detection.stub_detectors import RecordingDetector, ReplayDetector, SyntheticDetector, default_zone
+from src.utils.metrics import METRICS
+from benchmarks.scenes import MotionBlobDetector, render_frames
+
+SAMPLE_VIDEO = "uploads/istockphoto-611228576-640_adpp_is.mp4"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def video_frames(path, limit):
+    """Yield up to `limit` decoded frames, timing decode as a pipeline stage"""
+    cap = cv2.VideoCapture(path)
+    try:
+        for _ in range(limit):
+            with METRICS.stage('decode'):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+def timed_frames(frames):
+    """Time frame production (rendering stands in for decode)"""
+    frames = iter(frames)
+    while True:
+        with METRICS.stage('decode'):
+            frame = next(frames, None)
+        if frame is None:
+            return
+        yield frame
+
+def parse_mix(spec):
+    """"cruise=0.5,hover=0.5" -> {'cruise': 0.5, 'hover': 0.5}"""
+    if not spec:
+        return None
+    return {name.strip(): float(share) for name, _, share in
+            (part.partition("=") for part in spec.split(",") if part.strip())}
+
+def build_detector(args):
+    if args.detector == "yolo":
+        from src.detection.yolo_detector import DroneDetector
+        return DroneDetector(args.model, args.conf, device="cpu", backend=args.backend)
+    return MotionBlobDetector()
+
+def run_scenario(name, frames, detector, restricted_zones, log_dir, encode, trace_allocations):
+    """Run the pipeline over `frames` and collect throughput, stage latency and memory"""
+    pipeline = DroneDetectorTracker(detector=detector, restricted_zones=restricted_zones)
+    pipeline.alert_manager = AlertManager(log_file=os.path.join(log_dir, f"{name}.json"))
+
+    METRICS.reset()
+    if trace_allocations:
+        tracemalloc.start()
+
+    processed = alerts = max_tracks = 0
+    start = time.perf_counter()
+    for frame in frames:
+        tracks, annotated, frame_alerts = pipeline.process_frame(frame)
+        if encode:
+            with METRICS.stage('encode'):
+                cv2.imencode('.jpg', annotated)
+        processed += 1
+        alerts += len(frame_alerts)
+        max_tracks = max(max_tracks, len(tracks))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "scenario": name,
+        "frames": processed,
+        "seconds": round(elapsed, 3),
+        "fps": round(processed / elapsed, 2) if elapsed else None,
+        "alerts": alerts,
+        "max_active_tracks": max_tracks,
+        "stages": METRICS.snapshot()["stages"],
+        "counters": METRICS.snapshot()["counters"],
+        # ru_maxrss is KiB on Linux and bytes on macOS; process-wide high-water mark
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                              / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1),
+    }
+    if trace_allocations:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["traced_peak_kib"] = round(peak / 1024, 1)
+        result["traced_retained_kib"] = round(current / 1024, 1)
+    return result
+
+def environment():
+    """Enough context to tell whether two result files are comparable"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def print_result(result):
+    print(f"\n{result['scenario']}: {result['frames']} frames in {result['seconds']}s "
+          f"= {result['fps']} fps, {result['alerts']} alerts, peak RSS {result['peak_rss_mib']} MiB")
+    if "traced_peak_kib" in result:
+        print(f"  traced allocations: peak {result['traced_peak_kib']} KiB, "
+              f"retained {result['traced_retained_kib']} KiB")
+    print(f"  {'stage':<10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:<10}{stats['p50_ms']:>10.3f}{stats['p90_ms']:>10.3f}"
+              f"{stats['p99_ms']:>10.3f}{stats['mean_ms']:>10.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline end to end")
+    parser.add_argument("--video", default=None, help=f"Video to run (default: {SAMPLE_VIDEO})")
+    parser.add_argument("--synthetic", type=int, nargs="+", metavar="TARGETS",
+                        help="Run synthetic scenes with these numbers of targets instead of a video")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--mix", default=None,
+                        help="Synthetic pattern shares, e.g. cruise=0.5,fast=0.2,hover=0.2,zone_entry=0.1")
+    parser.add_argument("--noise", type=float, default=0.0, help="Synthetic box jitter (pixels)")
+    parser.add_argument("--miss-rate", type=float, default=0.0, help="Synthetic missed-detection probability")
+    parser.add_argument("--replay", default=None, help="Replay recorded detections (.npz / .ndjson) on blank frames")
+    parser.add_argument("--record", default=None, help="Save the video run's detections for --replay")
+    parser.add_argument("--no-zone", action="store_true", help="Skip the restricted zone in synthetic scenes")
+    parser.add_argument("--detector", choices=["stub", "yolo"], default="stub")
+    parser.add_argument("--model", default="yolov8s.pt")
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--encode", action="store_true", help="Also JPEG-encode each annotated frame")
+    parser.add_argument("--trace-allocations", action="store_true",
+                        help="Trace Python allocations with tracemalloc (slows the run down)")
+    parser.add_argument("--tag", default="", help="Label stored with the results")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    if not METRICS.enabled:
+        print("Warning: METRICS_ENABLED=0, per-stage latencies will be empty")
+
+    results = []
+    with tempfile.TemporaryDirectory() as log_dir:
+        if args.synthetic:
+            zone = default_zone(args.width, args.height)
+            for targets in args.synthetic:
+                detector = SyntheticDetector(targets, args.width, args.height, patterns=parse_mix(args.mix),
+                                             zone=zone, noise=args.noise, miss_rate=args.miss_rate)
+                frames = timed_frames(render_frames(detector, args.width, args.height, args.frames))
+                results.append(run_scenario(f"synthetic-{targets}", frames, detector,
+                                            None if args.no_zone else [zone], log_dir,
+                                            args.encode, args.trace_allocations))
+                print_result(results[-1])
+        elif args.replay:
+            detector = ReplayDetector(args.replay)
+            blank = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+            frames = timed_frames(blank.copy() for _ in range(min(args.frames, len(detector))))
+            name = f"replay-{os.path.splitext(os.path.basename(args.replay))[0]}"
+            results.append(run_scenario(name, frames, detector, None, log_dir,
+                                        args.encode, args.trace_allocations))
+            print_result(results[-1])
+        else:
+            video = args.video or SAMPLE_VIDEO
+            if not os.path.exists(video):
+                print(f"Error: video not found: {video}")
+                return
+            name = f"video-{os.path.splitext(os.path.basename(video))[0]}"
+            detector = build_detector(args)
+            if args.record:
+                detector = RecordingDetector(detector)
+            results.append(run_scenario(name, video_frames(video, args.frames), detector,
+                                        None, log_dir, args.encode, args.trace_allocations))
+            print_result(results[-1])
+            if args.record:
+                detector.save(args.record)
+                print(f"Recorded detections for {len(detector.frames)} frames to {args.record}")
+
+    report = {
+        "tag": args.tag,
+        "detector": "replay" if args.replay else
+                    args.detector if args.detector == "stub" else f"{args.detector}:{args.backend}",
+        "environment": environment(),
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare exported inference backends against the PyTorch detector.
+
+Runs every backend over the same frames and reports latency (mean / p50 / p95)
+plus agreement with the PyTorch detections (precision / recall at IoU 0.5).
+
+Usage:
+    python compare_backends.py --video "uploads/sample.mp4" --backends pytorch onnx onnx-int8
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+
+from src.detection.yolo_detector import DroneDetector
+from src.utils.boxes import box_iou
+
+def load_frames(video_path, max_frames):
+    """Read up to max_frames frames from a video"""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def count_matches(reference, candidate, iou_threshold=0.5):
+    """Greedy one-to-one matches between reference and candidate detections"""
+    ref = np.array([d[:4] for d in reference], dtype=np.float32).reshape(-1, 4)
+    cand = np.array([d[:4] for d in candidate], dtype=np.float32).reshape(-1, 4)
+    iou = box_iou(ref, cand)
+
+    matches = 0
+    while iou.size and iou.max() >= iou_threshold:
+        r, c = np.unravel_index(iou.argmax(), iou.shape)
+        matches += 1
+        iou[r, :] = 0
+        iou[:, c] = 0
+    return matches
+
+def run_backend(detector, frames):
+    """Run detector over frames, returning detections and per-frame latency (ms)"""
+    outputs, latencies = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        outputs.append(detector.detect(frame))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return outputs, np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare detector inference backends")
+    parser.add_argument("--model", default="yolov8s.pt")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx", "onnx-int8", "torchscript"],
+                        help="Backend names; append -int8 for quantized weights")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        print(f"Error: could not read frames from {args.video}")
+        return
+    print(f"Loaded {len(frames)} frames from {args.video}\n")
+
+    reference = None
+    rows = []
+    for name in ["pytorch"] + [b for b in args.backends if b != "pytorch"]:
+        backend, _, quant = name.partition("-")
+        detector = DroneDetector(args.model, args.conf, device="cpu", backend=backend, int8=quant == "int8")
+        outputs, latencies = run_backend(detector, frames)
+
+        if reference is None:
+            reference = outputs
+
+        ref_total = sum(len(d) for d in reference)
+        cand_total = sum(len(d) for d in outputs)
+        matched = sum(count_matches(r, c) for r, c in zip(reference, outputs))
+        rows.append({
+            "backend": name,
+            "mean_ms": latencies.mean(),
+            "p50_ms": np.percentile(latencies, 50),
+            "p95_ms": np.percentile(latencies, 95),
+            "detections": cand_total,
+            "precision": matched / cand_total if cand_total else 1.0,
+            "recall": matched / ref_total if ref_total else 1.0,
+        })
+
+    print(f"{'backend':<16}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'dets':>8}{'prec':>8}{'recall':>8}")
+    for row in rows:
+        print(f"{row['backend']:<16}{row['mean_ms']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['detections']:>8}{row['precision']:>8.3f}{row['recall']:>8.3f}")
+    print("\nPrecision/recall are measured against the PyTorch detections (IoU >= 0.5).")
+
+if __name__ == "__main__":
+    main()
@@ -1,106 +1,359 @@
 import cv2
 import asyncio
 import numpy as np
-import uvicorn
 import os
 import json
 import time
 import shutil
 import re
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException
+from fastapi import FastAPI, WebSocket, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from typing import List
+from dotenv import load_dotenv
+from typing import List, Optional
 
+from src.db.history import (ALERTS, ANALYSIS_LOGS, JOBS, HistoryWriter, analysis_query, ensure_collections,
+                            field_projection)
+from src.db.mongo import MongoStore
+from src.db.pagination import paginate
+from src.db.uploads import read_chunks, store_upload
 from src.detection.detector_with_tracking import DroneDetectorTracker
+from src.llm.bulk import BulkAnalyzer, parse_records
+from src.llm.cache import CACHE_COLLECTION, ResponseCache, cache_key
+from src.llm.client import GeminiBackend, HTTPBackend, LLMClient, LLMTimeout
+from src.llm.risk_scorer import RiskScorer
+from src.state.backends import create_backend
+from src.state.shared import SharedState
+from src.state.stats_stream import StatsStream
+from src.detection.motion_gate import MotionGate
+from src.streaming.batcher import MicroBatcher, decode_image
+from src.streaming.scheduler import InferenceScheduler
+from src.streaming.track_stream import TrackStream
+from src.streaming.video_source import VideoSource
+from src.streaming.file_replay import FileReplaySource
+from src.utils.json_stream import PayloadTooLarge
+from src.utils.metrics import METRICS, render_histogram
+from src.utils.readiness import Readiness
+from src.utils.recording import PipelineRecorder
+from src.utils.websockets import Broadcaster
+
+# Load environment variables (before any config below is read)
+load_dotenv()
 
 # --- Global State ---
 class GlobalState:
-    drone_system = None
-    camera = None
+    drone_system = None  # pipeline of the default source
+    detector = None  # shared by every source
+    scheduler = None
+    batcher = None  # MicroBatcher behind /predict
+    readiness = None  # Readiness of the subsystems above, for /readyz
+    startup_tasks = []
+    mongo = None  # MongoStore, None when the database is unreachable
+    analysis_writer = None  # BatchWriter for analysis_logs
+    history = None  # HistoryWriter for alerts and track summaries
+    llm = None  # LLMClient, None without GEMINI_API_KEY / LLM_BASE_URL
+    llm_cache = None  # ResponseCache for /analyze-json, None when disabled
+    risk_scorer = None  # local fast path in front of the LLM, None when disabled
+    shared = None  # SharedState: alert counters, recent alerts, jobs and source leases seen by every worker
+    stats_stream = None  # StatsStream behind /ws/stats
+    track_stream = TrackStream()  # per-frame tracks behind /ws/tracks
+    video_jobs = set()  # /analyze-video jobs running in the background
 
 state = GlobalState()
 
+# --- Detector Config ---
+# DETECTOR_BACKEND: pytorch | onnx | torchscript | openvino (CPU deployments want onnx/openvino)
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "pytorch")
+DETECTOR_INT8 = os.getenv("DETECTOR_INT8", "0") == "1"
+# Frames from different sources coalesced into one detector call
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "4"))
+# /predict: concurrent requests' images coalesced into one detector call of up to
+# PREDICT_MAX_BATCH frames, waiting at most PREDICT_MAX_WAIT_MS for a batch to fill
+PREDICT_MAX_BATCH = int(os.getenv("PREDICT_MAX_BATCH", str(INFERENCE_MAX_BATCH)))
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+PREDICT_MAX_IMAGES = 32
+# File sources replay at source FPS times this (0 = as fast as possible, for soak tests)
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1.0"))
+DEFAULT_SOURCE_ID = "default"
+# RECORD_DIR: record every source's detections, tracks and behavior results to
+# RECORD_DIR/<source_id>/ for offline re-tuning (see replay_recording.py)
+RECORD_DIR = os.getenv("RECORD_DIR")
+
+# --- MongoDB Config ---
+# MONGO_URI=memory:// uses an in-process fake (tests, running without a database)
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/uav_detection")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+# Atlas (mongodb+srv) deployments here need certificate checks disabled
+MONGO_TLS_INSECURE = os.getenv("MONGO_TLS_INSECURE", "1" if MONGO_URI.startswith("mongodb+srv") else "0") == "1"
+# High-rate writes are coalesced into insert_many calls of up to this many documents
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "500"))
+MONGO_FLUSH_INTERVAL = float(os.getenv("MONGO_FLUSH_INTERVAL", "0.5"))
+# Subsystems /readyz requires to be up (comma-separated: database, llm, llm_cache,
+# risk_scorer, models); the others only have to have finished starting
+READY_REQUIRED = [name.strip() for name in os.getenv("READY_REQUIRED", "models").split(",") if name.strip()]
+# Page size cap for the history endpoints
+MAX_PAGE_SIZE = 500
+
+# --- Shared State Config ---
+# STATE_URL: memory:// (one worker) | sqlite:///state.db (workers on one host) | redis://host:6379/0
+STATE_URL = os.getenv("STATE_URL", "memory://")
+STATE_LEASE_TTL = float(os.getenv("STATE_LEASE_TTL", "10"))
+STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "0.1"))
+# /analyze-video job status is kept this many seconds after its last update
+STATE_JOB_TTL = float(os.getenv("STATE_JOB_TTL", "3600"))
+WORKER_ID = os.getenv("WORKER_ID")  # default host-pid
+# /ws/stats coalesces changes into one delta per interval
+STATS_PUSH_INTERVAL = float(os.getenv("STATS_PUSH_INTERVAL", "1.0"))
+# /ws/alerts messages queued per client; a client further behind loses the oldest
+ALERTS_WS_MAX_QUEUE = int(os.getenv("ALERTS_WS_MAX_QUEUE", "256"))
+# /upload-json limits: whole file and single record (MongoDB documents max out at 16 MB),
+# and records per insert_many
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(1 << 30)))
+UPLOAD_MAX_RECORD_BYTES = int(os.getenv("UPLOAD_MAX_RECORD_BYTES", str(1 << 20)))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "500"))
+
+# --- LLM Config ---
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+# LLM_BASE_URL: call a generateContent REST endpoint directly (e.g. the fake
+# server, python -m src.llm.fake_server) instead of the google-generativeai SDK
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+# Response cache: LRU entries (0 disables), TTL in seconds, and significant digits
+# numeric RF fields are rounded to before keying (near-identical captures share an entry)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_DIGITS = int(os.getenv("LLM_CACHE_DIGITS", "3"))
+# Local risk scorer: answers clear-cut RF captures (predicted risk <= LOW or >= HIGH)
+# without the LLM; refit from analysis_logs at startup and via POST /risk-model/refit
+RISK_LOCAL_ENABLED = os.getenv("RISK_LOCAL_ENABLED", "1") == "1"
+RISK_LOCAL_LOW = float(os.getenv("RISK_LOCAL_LOW", "0.1"))
+RISK_LOCAL_HIGH = float(os.getenv("RISK_LOCAL_HIGH", "0.9"))
+RISK_MODEL_PATH = os.getenv("RISK_MODEL_PATH", "models/risk_model.json")
+# /analyze-bulk: RF records packed into one LLM prompt, and records accepted per request
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "10"))
+LLM_MAX_BATCH_SIZE = 50
+BULK_MAX_RECORDS = int(os.getenv("BULK_MAX_RECORDS", "10000"))
+
+def register_source(source_id: str, uri, queue_size: Optional[int] = None, drop_policy: Optional[str] = None,
+                    loop: bool = True, restricted_zones=None,
+                    replay_speed: Optional[float] = None) -> VideoSource:
+    """Create a per-source pipeline sharing the global detector and add it to the scheduler"""
+    # MOTION_GATE=1 skips YOLO on static frames (fixed cameras only)
+    motion_gate = MotionGate() if os.getenv("MOTION_GATE", "0") == "1" else None
+    recorder = None
+    if RECORD_DIR:
+        recorder = PipelineRecorder(os.path.join(RECORD_DIR, source_id),
+                                    metadata={'source_id': source_id, 'uri': str(uri),
+                                              'restricted_zones': restricted_zones})
+    pipeline = DroneDetectorTracker(detector=state.detector, restricted_zones=restricted_zones,
+                                    motion_gate=motion_gate, source_id=source_id, recorder=recorder,
+                                    history=state.history)
+    if isinstance(uri, str) and os.path.isfile(uri) and drop_policy in (None, "block"):
+        # Local files are replayed as paced, seamlessly looping "live" feeds
+        speed = REPLAY_SPEED if replay_speed is None else replay_speed
+        source = FileReplaySource(source_id, uri, pipeline, speed=speed, queue_size=queue_size, loop=loop)
+    else:
+        source = VideoSource(source_id, uri, pipeline, queue_size=queue_size, drop_policy=drop_policy, loop=loop)
+    state.scheduler.add_source(source)
+    return source
+
+def claim_source(source_id: str, uri, **options) -> Optional[VideoSource]:
+    """
+    Register a source if this worker holds its lease, else None (another worker
+    runs it). The lease keeps being competed for: the source is started here if
+    its owner goes away and stopped if the lease is lost.
+    """
+    name = f"source:{source_id}"
+
+    def stop():
+        state.scheduler.remove_source(source_id)
+        state.shared.forget_source(source_id)
+
+    if not state.shared.own(name, on_acquire=lambda: register_source(source_id, uri, **options), on_lose=stop):
+        return None
+    try:
+        return register_source(source_id, uri, **options)
+    except Exception:
+        state.shared.disown(name)
+        raise
+
+def parse_video_sources(spec: str):
+    """Parse VIDEO_SOURCES ("cam1=rtsp://...;cam2=0;lobby=clips/lobby.mp4") into (id, uri) pairs"""
+    sources = []
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        source_id, _, uri = entry.partition("=")
+        sources.append((source_id.strip(), uri.strip()))
+    return sources
+
 # --- WebSocket Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+# /ws/alerts clients, each behind its own bounded queue
+manager = Broadcaster(max_queue=ALERTS_WS_MAX_QUEUE)
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+async def broadcast_alert(alert: dict):
+    """Relay an alert recorded by any worker to this worker's /ws/alerts clients (never waits on them)"""
+    manager.broadcast(json.dumps(alert))
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+def attach_history():
+    """Give pipelines created before the database was connected its history writer"""
+    if state.history is None or state.scheduler is None:
+        return
+    for source in list(state.scheduler.sources.values()):
+        if source.pipeline.history is None:
+            source.pipeline.history = state.history
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
+# --- Startup ---
+# Every subsystem initializes in the background while the server already answers
+# requests; endpoints needing one that is not up yet return 503. /readyz reports progress.
+async def init_database() -> bool:
+    mongo = MongoStore(MONGO_URI, max_pool_size=MONGO_MAX_POOL_SIZE, min_pool_size=MONGO_MIN_POOL_SIZE,
+                       tls_insecure=MONGO_TLS_INSECURE)
+    if not await mongo.connect():
+        print("Warning: Stats will not be saved.")
+        return False
+    await ensure_collections(mongo)
+    state.analysis_writer = mongo.batch_writer(ANALYSIS_LOGS, max_batch=MONGO_BATCH_SIZE,
+                                               flush_interval=MONGO_FLUSH_INTERVAL)
+    state.history = HistoryWriter(mongo, max_batch=MONGO_BATCH_SIZE, flush_interval=MONGO_FLUSH_INTERVAL)
+    state.mongo = mongo
+    attach_history()
+    return True
 
-manager = ConnectionManager()
+async def init_llm() -> bool:
+    # The Gemini SDK is slow to import: done off the event loop
+    genai_model = None if LLM_BASE_URL else await asyncio.to_thread(create_gemini_model)
+    state.llm = create_llm_client(genai_model)
+    return state.llm is not None
+
+async def init_llm_cache(database: asyncio.Task, llm: asyncio.Task) -> bool:
+    await asyncio.wait([database, llm])
+    if state.llm is None or LLM_CACHE_SIZE <= 0:
+        return False
+    # Persistent tier in MongoDB when connected, memory only otherwise
+    cache = ResponseCache(LLM_CACHE_SIZE, LLM_CACHE_TTL,
+                          state.mongo.collection(CACHE_COLLECTION) if state.mongo else None)
+    await cache.ensure_indexes()
+    state.llm_cache = cache
+    return True
+
+async def init_risk_scorer(database: asyncio.Task) -> bool:
+    if not RISK_LOCAL_ENABLED:
+        return False
+    await asyncio.wait([database])
+    state.risk_scorer = await create_risk_scorer()
+    return True
+
+def load_models():
+    """Load the shared detector and open the video sources (blocking: run off the event loop)"""
+    # Imported here: torch / ultralytics take seconds to import
+    from src.detection.yolo_detector import DroneDetector
 
-# --- Lifespan ---
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup
     print("Initializing AI Models...")
-    try:
-        # Load the requested best.pt model via DroneDetectorTracker
-        # SWITCHING TO YOLOv8s TEMPORARILY AS best.pt IS NOT DETECTING
-        model_path = "yolov8s.pt" 
-        print(f"Loading model: {model_path}")
-        # Initialize DroneDetectorTracker
-        # Note: restricted_zones can be passed if needed later
-        state.drone_system = DroneDetectorTracker(model_path=model_path)
-        
-        # Initialize video capture (0 for webcam, or path to file)
-        # For demo purposes, we will try to use webcam 0. 
-        # If not available, we might need a fallback.
-        # TEST MODE: Using uploaded video file
+    # Load the requested best.pt model via DroneDetectorTracker
+    # SWITCHING TO YOLOv8s TEMPORARILY AS best.pt IS NOT DETECTING
+    model_path = "yolov8s.pt" 
+    print(f"Loading model: {model_path}")
+    # One detector shared by every source; the scheduler batches their frames
+    state.detector = DroneDetector(model_path, backend=DETECTOR_BACKEND, int8=DETECTOR_INT8,
+                                   max_batch=max(INFERENCE_MAX_BATCH, PREDICT_MAX_BATCH))
+    state.scheduler = InferenceScheduler(state.detector, max_batch=INFERENCE_MAX_BATCH)
+    state.scheduler.add_listener(state.shared.on_frame)
+    state.scheduler.add_listener(state.track_stream.on_frame)
+    
+    # Initialize video sources (VIDEO_SOURCES, or the test video / webcam 0)
+    # TEST MODE: Using uploaded video file
+    video_sources = parse_video_sources(os.getenv("VIDEO_SOURCES", ""))
+    if not video_sources:
         video_path = "uploads/2a0e3c36-259c-43c3-840e-dcc224c44b32_WhatsApp Video 2026-02-07 at 19.51.36.mp4"
         if os.path.exists(video_path):
             print(f"Using video file: {video_path}")
-            state.camera = cv2.VideoCapture(video_path)
+            video_sources = [(DEFAULT_SOURCE_ID, video_path)]
         else:
             print("Video file not found, trying webcam...")
-            state.camera = cv2.VideoCapture(0)
+            video_sources = [(DEFAULT_SOURCE_ID, 0)]
 
-        if not state.camera.isOpened():
-             print("Warning: Camera 0 not found. Using test video or placeholder.")
-             # Fallback logic could be added here
-        print("AI Models Initialized.")
-    except Exception as e:
-        print(f"Error initializing models: {e}")
+    # With several workers each source runs in the one holding its lease
+    for source_id, uri in video_sources:
+        source = claim_source(source_id, uri)
+        if source is None:
+            print(f"Source '{source_id}' is run by another worker.")
+        elif not source.is_open:
+            print(f"Warning: source '{source_id}' not available.")
+
+    # Backwards compatible handle for single-camera endpoints
+    first_source = state.scheduler.get_source(video_sources[0][0])
+    state.drone_system = first_source.pipeline if first_source else None
+
+    state.scheduler.start()
+    print("AI Models Initialized.")
+
+async def init_models() -> bool:
+    await asyncio.to_thread(load_models)
+    batcher = MicroBatcher(state.detector, max_batch=PREDICT_MAX_BATCH, max_wait=PREDICT_MAX_WAIT_MS / 1000)
+    batcher.start()
+    state.batcher = batcher
+    attach_history()
+    return True
+
+# --- Lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: nothing is awaited here, so the first request is served right away
+    state.shared = SharedState(create_backend(STATE_URL), worker_id=WORKER_ID, lease_ttl=STATE_LEASE_TTL,
+                               flush_interval=STATE_FLUSH_INTERVAL, job_ttl=STATE_JOB_TTL)
+    state.shared.subscribe(broadcast_alert)
+    state.stats_stream = StatsStream(state.shared, interval=STATS_PUSH_INTERVAL)
+    state.stats_stream.start()
+    state.shared.start()
+    readiness = state.readiness = Readiness(required=READY_REQUIRED)
+    database = readiness.start("database", init_database())
+    llm = readiness.start("llm", init_llm())
+    state.startup_tasks = [
+        database,
+        llm,
+        readiness.start("llm_cache", init_llm_cache(database, llm)),
+        readiness.start("risk_scorer", init_risk_scorer(database)),
+        readiness.start("models", init_models()),
+    ]
     
     yield
     
     # Shutdown
-    if state.camera:
-        state.camera.release()
+    for task in state.startup_tasks:
+        task.cancel()
+    await asyncio.gather(*state.startup_tasks, return_exceptions=True)
+    if state.batcher:
+        await state.batcher.close()
+    if state.scheduler:
+        state.scheduler.stop()
+    await state.stats_stream.close()
+    # Writes the last alerts and releases this worker's sources to the others
+    await state.shared.close()
+    if state.mongo:
+        # Flushes queued batches before closing the pool
+        await state.mongo.close()
+        state.mongo = None
+        state.analysis_writer = None
+        state.history = None
+    if state.llm:
+        await state.llm.close()
+        state.llm = None
+        state.llm_cache = None
     print("Cleaned up resources.")
 
 app = FastAPI(lifespan=lifespan)
 
 # CORS
-from ultralytics import YOLO
-import io
-from PIL import Image
 import os
-from dotenv import load_dotenv
-import google.generativeai as genai
 from pydantic import BaseModel
 from typing import Dict, Any
 from datetime import datetime
 import uuid
 
-# Load environment variables
-load_dotenv()
-
 # app = FastAPI() # Removed to use the instance with lifespan defined above
 
 # Allow CORS for frontend
@@ -116,66 +369,41 @@ app.add_middleware(
 
 # Mount static files to serve processed videos
 app.mount("/videos", StaticFiles(directory="outputs"), name="videos")
-# Initialize Gemini Client
+# Gemini client: created in the background at startup (init_llm)
 api_key = os.getenv("GEMINI_API_KEY")
-genai_model = None
 
-# --- MongoDB Setup ---
-import pymongo
-from pymongo.errors import ConnectionFailure
-import certifi
-
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/uav_detection")
-mongo_client = None
-db = None
-analysis_collection = None
-
-try:
-    # Connect to MongoDB (Atlas or Local)
-    # FORCED SSL BYPASS: Creating a custom SSL context to ignore all verification
-    import ssl
-    try:
-        mongo_client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, tls=True, tlsAllowInvalidCertificates=True, tlsAllowInvalidHostnames=True)
-    except:
-        # Fallback for older pymongo versions or specific SSL envs
-        mongo_client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    # Trigger a server check
-    mongo_client.admin.command('ping')
-    
-    db_name = MONGO_URI.split("/")[-1].split("?")[0] or "uav_detection"
-    db = mongo_client[db_name]
-    analysis_collection = db["analysis_logs"]
-    json_collection = db["json_uploads"] # Collection for JSON uploads
-    print(f"Connected to MongoDB: {db_name}")
-except Exception as e:
-    print(f"Warning: MongoDB connection failed: {e}. Stats will not be saved.")
-    mongo_client = None
+# --- MongoDB ---
+# Connected in lifespan (state.mongo); every call is awaited on the store's pool
 
 @app.post("/upload-json")
 async def upload_json(file: UploadFile = File(...)):
-    if json_collection is None:
+    """
+    Store a JSON array or NDJSON file (a single JSON document counts as one
+    record), one document per record in json_upload_records. The file is
+    parsed as it is read, so memory stays flat whatever its size;
+    UPLOAD_MAX_BYTES and UPLOAD_MAX_RECORD_BYTES bound the file and each record.
+    """
+    if state.mongo is None:
         raise HTTPException(status_code=503, detail="Database not available")
-    
+    size = getattr(file, "size", None)
+    if size is not None and size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+
     try:
-        content = await file.read()
-        json_data = json.loads(content.decode("utf-8"))
-        
-        # Add metadata
-        document = {
-            "filename": file.filename,
-            "upload_timestamp": datetime.utcnow(),
-            "data": json_data
-        }
-        
-        result = json_collection.insert_one(document)
-        
+        upload = await store_upload(state.mongo, read_chunks(file), file.filename, batch_size=UPLOAD_BATCH_SIZE,
+                                    max_bytes=UPLOAD_MAX_BYTES, max_record_bytes=UPLOAD_MAX_RECORD_BYTES)
         return {
             "message": "JSON uploaded successfully",
-            "id": str(result.inserted_id),
-            "filename": file.filename
+            "id": str(upload["_id"]),
+            "filename": file.filename,
+            "format": upload["format"],
+            "records": upload["records"],
+            "bytes": upload["bytes"]
         }
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON file")
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON file: {e}")
     except Exception as e:
         print(f"Error uploading JSON: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -202,107 +430,208 @@ SYSTEM_PROMPT = """You are an expert RF signal analyst specializing in unmanned
 """
 
 
-if api_key:
+def create_gemini_model():
+    """GenerativeModel with SYSTEM_PROMPT, or None without GEMINI_API_KEY"""
+    if not api_key:
+        print("Warning: GEMINI_API_KEY not found in environment variables.")
+        return None
     try:
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         genai_model = genai.GenerativeModel(
-            model_name=os.getenv("LLM_MODEL", "gemini-2.0-flash"),
+            model_name=LLM_MODEL,
             system_instruction=SYSTEM_PROMPT
         )
         print("Gemini Client initialized with system prompt.")
+        return genai_model
     except Exception as e:
         print(f"Failed to initialize Gemini client: {e}")
-else:
-    print("Warning: GEMINI_API_KEY not found in environment variables.")
-
-# Load model - Update this path to where you put your model
-# MODEL_PATH = "models/best.pt" # This is now handled in lifespan
-model = None # Initialized to None, loaded in lifespan
-
-# @app.on_event("startup") # This is now handled by the lifespan context manager
-# async def startup_event():
-#     global model
-#     if os.path.exists(f"backend/{MODEL_PATH}"):
-#          # logic if running from root
-#          model_file = f"backend/{MODEL_PATH}"
-#     elif os.path.exists(MODEL_PATH):
-#          # logic if running from backend dir
-#          model_file = MODEL_PATH
-#     else:
-#         print(f"Warning: Model not found at {MODEL_PATH}. Prediction endpoint will return errors.")
-#         return
-
-#     try:
-#         model = YOLO(model_file)
-#         print(f"Model loaded from {model_file}")
-#     except Exception as e:
-#         print(f"Failed to load model: {e}")
+        return None
+
+async def create_risk_scorer() -> RiskScorer:
+    """Scorer from RISK_MODEL_PATH, refit from analysis_logs when MongoDB has enough history"""
+    scorer = RiskScorer(low=RISK_LOCAL_LOW, high=RISK_LOCAL_HIGH)
+    if os.path.exists(RISK_MODEL_PATH):
+        try:
+            scorer.load(RISK_MODEL_PATH)
+        except Exception as e:
+            print(f"Error loading risk model: {e}")
+    if state.mongo is not None:
+        try:
+            fit = await scorer.refit_from(state.mongo.collection(ANALYSIS_LOGS))
+            print(f"Risk model refit: {fit}")
+        except Exception as e:
+            print(f"Error refitting risk model: {e}")
+    return scorer
+
+def create_llm_client(genai_model=None) -> Optional[LLMClient]:
+    """Concurrency-limited client over the REST endpoint (LLM_BASE_URL) or the Gemini SDK"""
+    if LLM_BASE_URL:
+        backend = HTTPBackend(LLM_BASE_URL, LLM_MODEL, api_key=api_key, system_instruction=SYSTEM_PROMPT,
+                              max_connections=LLM_MAX_CONCURRENCY)
+        print(f"LLM calls go to {LLM_BASE_URL}")
+    elif genai_model is not None:
+        backend = GeminiBackend(genai_model)
+    else:
+        return None
+    return LLMClient(backend, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT, retries=LLM_RETRIES)
 
 @app.get("/")
 def read_root():
     return {"status": "running", "service": "YOLOv8 Surveillance Backend"}
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving, whatever its subsystems are doing"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once startup is done and READY_REQUIRED subsystems are up, else 503"""
+    if state.readiness is None:
+        return JSONResponse({"ready": False, "subsystems": {}}, status_code=503)
+    snapshot = state.readiness.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
 @app.websocket("/ws/alerts")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
-    try:
-        while True:
-            await websocket.receive_text() # Keep connection alive
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
+    await websocket.accept()
+    await manager.serve(websocket)
+
+@app.websocket("/ws/stats")
+async def stats_websocket(websocket: WebSocket):
+    """Dashboard stats: a snapshot, then coalesced deltas (see StatsStream)"""
+    await websocket.accept()
+    await state.stats_stream.serve(websocket)
 
-def generate_frames():
+def generate_frames(source_id: Optional[str] = None, raw: bool = False):
+    """
+    MJPEG parts of a source's processed frames: annotated, or raw for clients
+    drawing /ws/tracks themselves (raw parts carry the capture time in an
+    X-Timestamp header, the timestamp of the matching track message)
+    """
+    source = None
+    sequence = 0
     while True:
-        if state.camera is None or not state.camera.isOpened():
-             time.sleep(1)
-             continue
-        
-        success, frame = state.camera.read()
-        if not success:
-            # If video ends, loop it or just wait
-            state.camera.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        if state.scheduler is None:
+            time.sleep(1)
+            continue
+
+        if source is None or source.source_id not in state.scheduler.sources:
+            source = _resolve_source(source_id)
+            if source is None:
+                time.sleep(1)
+                continue
+
+        # Frames are read and processed by the inference scheduler, which only
+        # annotates while some viewer keeps asking for it
+        if not raw:
+            source.want_annotated()
+        sequence, output = source.wait_for_output(sequence, timeout=1.0)
+        frame = None if output is None else output.frame if raw else output.annotated
+        if frame is None:
             continue
-        
-        # Process frame using the new system
-        if state.drone_system:
-            tracks, annotated_frame, alerts = state.drone_system.process_frame(frame)
-            
-            # Broadcast alerts via WebSocket if any
-            if alerts:
-                # We need an async loop to broadcast, but generate_frames is sync generator.
-                # In a real app, this would be handled differently (e.g., background task).
-                # Skipping broadcast here for simplicity or using run_in_executor if needed.
-                pass
-        else:
-            annotated_frame = frame
         
         # Encode
-        ret, buffer = cv2.imencode('.jpg', annotated_frame)
+        with METRICS.stage('encode'):
+            ret, buffer = cv2.imencode('.jpg', frame)
         frame_bytes = buffer.tobytes()
         
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        headers = b'Content-Type: image/jpeg\r\nContent-Length: %d\r\n' % len(frame_bytes)
+        if raw:
+            headers += b'X-Timestamp: %.6f\r\n' % output.timestamp
+        yield b'--frame\r\n' + headers + b'\r\n' + frame_bytes + b'\r\n'
+
+def _resolve_source(source_id: Optional[str]) -> Optional[VideoSource]:
+    """Look up a source, defaulting to the first registered one"""
+    if source_id is not None:
+        return state.scheduler.get_source(source_id)
+    sources = list(state.scheduler.sources.values())
+    return sources[0] if sources else None
 
 @app.get("/video_feed")
-def video_feed():
-    return StreamingResponse(generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+def video_feed(raw: bool = False):
+    return StreamingResponse(generate_frames(raw=raw), media_type="multipart/x-mixed-replace; boundary=frame")
 
-@app.post("/analyze-video")
-async def analyze_video(file: UploadFile = File(...)):
-    # 1. Save uploaded file
-    os.makedirs("uploads", exist_ok=True)
-    os.makedirs("outputs", exist_ok=True)
-    
-    file_location = f"uploads/{file.filename}"
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    print(f"Video uploaded: {file_location}")
+@app.get("/video_feed/{source_id}")
+def source_video_feed(source_id: str, raw: bool = False):
+    if state.scheduler is None or state.scheduler.get_source(source_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown source '{source_id}'")
+    return StreamingResponse(generate_frames(source_id, raw=raw), media_type="multipart/x-mixed-replace; boundary=frame")
+
+async def serve_tracks(websocket: WebSocket, source_id: Optional[str]):
+    await websocket.accept()
+    source = _resolve_source(source_id) if state.scheduler else None
+    if source is None:
+        # Sources only stream from the worker running them (see claim_source)
+        await websocket.close(code=4404, reason="Unknown source, or run by another worker")
+        return
+    await state.track_stream.serve(source.source_id, websocket)
+
+@app.websocket("/ws/tracks")
+async def tracks_websocket(websocket: WebSocket):
+    """Binary per-frame tracks of the default source (see encode_tracks)"""
+    await serve_tracks(websocket, None)
+
+@app.websocket("/ws/tracks/{source_id}")
+async def source_tracks_websocket(websocket: WebSocket, source_id: str):
+    await serve_tracks(websocket, source_id)
+
+class SourceRequest(BaseModel):
+    source_id: str
+    uri: str  # file path, RTSP/HTTP URL, or device index
+    queue_size: Optional[int] = None  # default: 1 (newest frame) for live, 4 for files
+    drop_policy: Optional[str] = None  # drop_oldest | drop_newest | block
+    loop: bool = True
+    restricted_zones: Optional[List[List[List[int]]]] = None
+    replay_speed: Optional[float] = None  # file sources only
+
+@app.get("/sources")
+def list_sources():
+    if state.scheduler is None:
+        raise HTTPException(status_code=503, detail="Inference scheduler not running")
+    return state.scheduler.get_statistics()
+
+@app.post("/sources")
+def add_source(request: SourceRequest):
+    if state.scheduler is None:
+        raise HTTPException(status_code=503, detail="Inference scheduler not running")
+    try:
+        source = claim_source(request.source_id, request.uri, queue_size=request.queue_size,
+                              drop_policy=request.drop_policy, loop=request.loop,
+                              restricted_zones=request.restricted_zones,
+                              replay_speed=request.replay_speed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if source is None:
+        raise HTTPException(status_code=409, detail=f"Source '{request.source_id}' is run by another worker")
+    return source.get_statistics()
 
-    # 2. Process Video
+@app.delete("/sources/{source_id}")
+def remove_source(source_id: str):
+    if state.scheduler is None or not state.scheduler.remove_source(source_id):
+        raise HTTPException(status_code=404, detail=f"Unknown source '{source_id}'")
+    state.shared.disown(f"source:{source_id}")
+    state.shared.forget_source(source_id)
+    return {"message": f"Source '{source_id}' removed"}
+
+def update_job(job_id: str, **status):
+    """Publish a job's progress to every worker (GET /jobs/{job_id}); errors are only logged"""
+    try:
+        state.shared.set_job(job_id, status)
+    except Exception as e:
+        print(f"Error updating job {job_id}: {e}")
+
+def process_video(job_id: str, file_location: str, filename: str) -> Optional[dict]:
+    """
+    Run an uploaded video through a fresh pipeline, publishing progress with
+    update_job (blocking, runs on a worker thread); the job's result, None
+    if the video could not be opened
+    """
     cap = cv2.VideoCapture(file_location)
     if not cap.isOpened():
-        return {"error": "Could not open video file"}
+        update_job(job_id, status="failed", filename=filename, error="Could not open video file")
+        return None
 
     # Video properties
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -310,7 +639,7 @@ async def analyze_video(file: UploadFile = File(...)):
     fps = int(cap.get(cv2.CAP_PROP_FPS))
     
     # Output path
-    output_filename = f"processed_{file.filename}"
+    output_filename = f"processed_{filename}"
     output_path = f"outputs/{output_filename}"
     
     # Initialize VideoWriter
@@ -320,19 +649,18 @@ async def analyze_video(file: UploadFile = File(...)):
 
     print(f"Processing video to {output_path}...")
     
-    # Reset system frame count for new video if needed, or create a new instance?
-    # Ideally we should create a new instance per video analysis request to avoid state leaking from live feed.
-    # But for now, let's use a fresh instance for this request to be safe.
-    # We can reuse the model loaded in state to avoid reloading weights, but tracking state is per-video.
-    # So let's instantiate a new DroneDetectorTracker sharing the model?
-    # Actually, simpler is just to create a new instance. Loading model is fast if cached by YOLO.
-    
-    # Create a dedicated processor for this video
-    video_processor = DroneDetectorTracker(model_path="yolov8s.pt")
+    # Create a dedicated processor for this video, reusing the loaded detector weights
+    # (tracking state is per video, so nothing leaks from the live feed)
+    if state.detector is not None:
+        video_processor = DroneDetectorTracker(detector=state.detector)
+    else:
+        video_processor = DroneDetectorTracker(model_path="yolov8s.pt",
+                                               backend=DETECTOR_BACKEND, int8=DETECTOR_INT8)
     
     frame_count = 0
     while cap.isOpened():
-        ret, frame = cap.read()
+        with METRICS.stage('decode'):
+            ret, frame = cap.read()
         if not ret:
             break
             
@@ -341,7 +669,8 @@ async def analyze_video(file: UploadFile = File(...)):
             tracks, annotated_frame, alerts = video_processor.process_frame(frame)
             
             # Write to output video
-            out.write(annotated_frame)
+            with METRICS.stage('encode'):
+                out.write(annotated_frame)
         except Exception as e:
             print(f"Error processing frame {frame_count}: {e}")
             out.write(frame) # Write original frame if detection fails
@@ -349,24 +678,75 @@ async def analyze_video(file: UploadFile = File(...)):
         frame_count += 1
         if frame_count % 30 == 0:
             print(f"Processed {frame_count} frames")
+            update_job(job_id, status="processing", filename=filename, frames=frame_count)
 
     # Release resources
     cap.release()
     out.release()
     
-    # Get analysis results
-    stats = video_processor.alert_manager.get_statistics()
-    alerts = video_processor.alert_manager.alerts
-    
     print("Video analysis complete.")
     
-    return {
+    summary = {
         "message": "Video analysis complete.",
-        "job_id": str(int(time.time())), 
         "output_video_path": output_filename,
-        "stats": stats,
-        "alerts": alerts
+        "stats": video_processor.alert_manager.get_statistics(),
     }
+    # Shared state only gets the summary; the full alert list is stored with the job in MongoDB
+    update_job(job_id, status="complete", filename=filename, frames=frame_count, **summary)
+    return {**summary, "alerts": video_processor.alert_manager.alerts,
+            "job_id": job_id, "filename": filename, "frames": frame_count}
+
+async def run_video_job(job_id: str, file_location: str, filename: str):
+    """Process an uploaded video off the event loop, then record the finished job"""
+    try:
+        result = await asyncio.to_thread(process_video, job_id, file_location, filename)
+    except Exception as e:
+        print(f"Error analyzing video {filename}: {e}")
+        await asyncio.to_thread(update_job, job_id, status="failed", filename=filename, error=str(e))
+        return
+    if result is None or state.mongo is None:
+        return
+    try:
+        await state.mongo.collection(JOBS).insert_one({**result, "created_at": datetime.utcnow()})
+    except Exception as e:
+        print(f"Error saving job to MongoDB: {e}")
+
+@app.post("/analyze-video", status_code=202)
+async def analyze_video(file: UploadFile = File(...)):
+    """
+    Start analyzing an uploaded video; returns its job id at once. Progress
+    and the result (output video, alert stats) are read from GET /jobs/{job_id};
+    the full alert list is saved with the job in MongoDB.
+    """
+    job_id = uuid.uuid4().hex
+    await asyncio.to_thread(update_job, job_id, status="uploading", filename=file.filename)
+
+    # 1. Save uploaded file
+    os.makedirs("uploads", exist_ok=True)
+    os.makedirs("outputs", exist_ok=True)
+    
+    file_location = f"uploads/{file.filename}"
+    await asyncio.to_thread(save_upload, file, file_location)
+    print(f"Video uploaded: {file_location}")
+
+    # 2. Process Video in the background
+    await asyncio.to_thread(update_job, job_id, status="processing", filename=file.filename, frames=0)
+    task = asyncio.get_running_loop().create_task(run_video_job(job_id, file_location, file.filename))
+    state.video_jobs.add(task)
+    task.add_done_callback(state.video_jobs.discard)
+    return {"job_id": job_id, "status": "processing"}
+
+def save_upload(file: UploadFile, path: str):
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status of an /analyze-video job, whichever worker runs it"""
+    job = state.shared.get_job(job_id) if state.shared else None
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job
 
 @app.get("/stats")
 def get_stats():
@@ -382,38 +762,84 @@ def get_stats():
         "recent_alerts": []
     }
 
+    # Alert counters, recent alerts and live tracks of every source, whichever worker runs it
+    if state.shared:
+        stats["total_detections"] = sum(state.shared.occupancy().values())
+        stats.update(state.shared.alert_statistics())
+        stats["recent_alerts"] = state.shared.recent_alerts(10)
+        stats["shared_state"] = state.shared.get_statistics()
+    if state.stats_stream:
+        stats["stats_stream"] = state.stats_stream.get_statistics()
+    stats["alert_stream"] = manager.get_statistics()
+    stats["track_stream"] = state.track_stream.get_statistics()
+
     if state.drone_system:
-        # Get tracker stats
-        if state.drone_system.tracker:
-            stats["total_detections"] = len(state.drone_system.tracker.tracks)
-        
-        # Get alert stats
-        if state.drone_system.alert_manager:
-            alert_stats = state.drone_system.alert_manager.get_statistics()
-            stats.update(alert_stats)
-            # Get recent alerts for feed
-            stats["recent_alerts"] = state.drone_system.alert_manager.alerts[-10:] if state.drone_system.alert_manager.alerts else []
+        # Motion gate counters
+        stats["motion_gate"] = state.drone_system.get_gate_statistics()
+
+    # Per-source fps, latency and drop counters
+    if state.scheduler:
+        stats["sources"] = state.scheduler.get_statistics()["sources"]
+    if state.batcher:
+        stats["predict"] = state.batcher.get_statistics()
+    if state.analysis_writer:
+        stats["analysis_writes"] = state.analysis_writer.get_statistics()
+    if state.history:
+        stats["history_writes"] = state.history.get_statistics()
+    if state.llm:
+        stats["llm"] = state.llm.get_statistics()
+    if state.llm_cache:
+        stats["llm_cache"] = state.llm_cache.get_statistics()
+    if state.risk_scorer:
+        stats["risk_scorer"] = state.risk_scorer.get_statistics()
 
     return stats
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition: stage latencies, pipeline counters, capture-to-alert histograms"""
+    if not METRICS.enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled (METRICS_ENABLED=0)")
+
+    body = METRICS.render_prometheus()
+    if state.scheduler:
+        name = f"{METRICS.prefix}_capture_to_alert_seconds"
+        body += f"# TYPE {name} histogram\n"
+        for source in list(state.scheduler.sources.values()):
+            body += render_histogram(name, source.alert_latency, source=source.source_id)
+    return body
+
+
+DEFAULT_ANALYSIS_PROMPT = "Analyze the following RF signal data based on the provided framework."
 
 class AnalysisRequest(BaseModel):
     data: Dict[str, Any]
-    prompt: str = "Analyze the following RF signal data based on the provided framework."
+    prompt: str = DEFAULT_ANALYSIS_PROMPT
 @app.post("/analyze-json")
 async def analyze_json(request: AnalysisRequest):
-    if genai_model is None:
+    # Clear-cut captures are answered locally; the rest escalate to the LLM
+    local = state.risk_scorer.assess(request.data) if state.risk_scorer is not None else None
+    if local is None and state.llm is None:
         raise HTTPException(status_code=503, detail="LLM Client not initialized")
 
     try:
-        response = genai_model.generate_content(
-            f"{request.prompt}\n\nData:\n{request.data}"
-        )
+        # Awaited on the event loop; at most LLM_MAX_CONCURRENCY calls in flight
+        prompt = f"{request.prompt}\n\nData:\n{request.data}"
+        cached = False
+        answered_by = "llm"
+        if local is not None:
+            _, answered_by, response_text = local
+        elif state.llm_cache is not None:
+            key = cache_key(request.prompt, request.data, LLM_MODEL, LLM_CACHE_DIGITS)
+            response_text, cached = await state.llm_cache.get_or_compute(
+                key, lambda: state.llm.generate(prompt), model=LLM_MODEL)
+        else:
+            response_text = await state.llm.generate(prompt)
 
         # Parse Risk Score
         risk_score = 0.0
         try:
-            match = re.search(r"Risk Score:\s*([0-9]*\.?[0-9]+)", response.text)
+            match = re.search(r"Risk Score:\s*([0-9]*\.?[0-9]+)", response_text)
             if match:
                 risk_score = float(match.group(1))
         except Exception as e:
@@ -422,36 +848,46 @@ async def analyze_json(request: AnalysisRequest):
         response_data = {
             "success": True,
             "status": 200,
-            "model": os.getenv("LLM_MODEL", "gemini-2.0-flash"),
+            "model": LLM_MODEL if answered_by == "llm" else "local-risk-scorer",
             "timestamp": datetime.utcnow().isoformat(),
             "request_id": str(uuid.uuid4()),
+            "cached": cached,
+            "answered_by": answered_by,
             "data": {
                 "input": {
                     "prompt": request.prompt,
                     "rf_data": request.data
                 },
                 "output": {
-                    "analysis": response.text,
+                    "analysis": response_text,
                     "risk_score": risk_score
                 }
             },
             "error": None
         }
 
-        # Save to MongoDB
-        if analysis_collection is not None:
-            try:
-                # Flattens structure slightly for easier querying if needed, or keeps it nested
-                # Let's add top-level risk_score for easier querying
-                mongo_doc = response_data.copy()
-                mongo_doc["risk_score"] = risk_score
-                analysis_collection.insert_one(mongo_doc)
-                print(f"Saved analysis to MongoDB: {response_data['request_id']} (Risk: {risk_score})")
-            except Exception as e:
-                print(f"Error saving to MongoDB: {e}")
+        # Save to MongoDB (queued; written in the next batch)
+        if state.analysis_writer is not None:
+            # Flattens structure slightly for easier querying if needed, or keeps it nested
+            # Let's add top-level risk_score for easier querying
+            mongo_doc = response_data.copy()
+            mongo_doc["risk_score"] = risk_score
+            mongo_doc["answered_by"] = answered_by
+            # Stored as a date so time-window queries and the timestamp index work
+            mongo_doc["timestamp"] = datetime.fromisoformat(response_data["timestamp"])
+            state.analysis_writer.add(mongo_doc)
 
         return response_data
 
+    except LLMTimeout as e:
+        return {
+            "success": False,
+            "status": 504,
+            "error": {
+                "code": "LLM_TIMEOUT",
+                "message": str(e)
+            }
+        }
     except Exception as e:
         return {
             "success": False,
@@ -462,48 +898,148 @@ async def analyze_json(request: AnalysisRequest):
             }
         }
 
+@app.post("/analyze-bulk")
+async def analyze_bulk(request: Request, prompt: str = DEFAULT_ANALYSIS_PROMPT, batch_size: Optional[int] = None):
+    """
+    Analyze many RF captures at once. The body is a JSON array or NDJSON
+    (one RF data object per line, Content-Type application/x-ndjson); up to
+    batch_size records share an LLM prompt. Streams NDJSON back: one line
+    per record ({"index": ...}) as its batch finishes, then a {"summary": ...}
+    line with records/sec and tokens per record.
+    """
+    content_type = request.headers.get("content-type", "")
+    ndjson = True if "ndjson" in content_type or "jsonl" in content_type else None
+    try:
+        records = parse_records(await request.body(), ndjson=ndjson)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid records: {e}")
+    if len(records) > BULK_MAX_RECORDS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_RECORDS} records per request")
+
+    batch_size = min(max(1, batch_size or LLM_BATCH_SIZE), LLM_MAX_BATCH_SIZE)
+    analyzer = BulkAnalyzer(state.llm, LLM_MODEL, cache=state.llm_cache, scorer=state.risk_scorer,
+                            collection=state.mongo.collection(ANALYSIS_LOGS) if state.mongo is not None else None,
+                            batch_size=batch_size, digits=LLM_CACHE_DIGITS)
+
+    async def results():
+        async for result in analyzer.run(records, prompt):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.post("/risk-model/refit")
+async def refit_risk_model():
+    """Refit the local risk scorer on LLM-answered analyses and save it to RISK_MODEL_PATH"""
+    if state.risk_scorer is None:
+        raise HTTPException(status_code=503, detail="Local risk scorer disabled")
+    if state.mongo is None:
+        raise HTTPException(status_code=503, detail="MongoDB not connected")
+
+    fit = await state.risk_scorer.refit_from(state.mongo.collection(ANALYSIS_LOGS))
+    if fit["samples"]:
+        os.makedirs(os.path.dirname(RISK_MODEL_PATH) or ".", exist_ok=True)
+        state.risk_scorer.save(RISK_MODEL_PATH)
+    return {**fit, **state.risk_scorer.get_statistics()}
+
 @app.get("/analysis-history")
-async def get_analysis_history(limit: int = 50):
-    if analysis_collection is None:
+async def get_analysis_history(limit: int = 50, cursor: Optional[str] = None,
+                               min_risk: Optional[float] = None, max_risk: Optional[float] = None,
+                               since: Optional[datetime] = None, until: Optional[datetime] = None,
+                               fields: Optional[str] = None):
+    """
+    Stored LLM analyses, newest first. Filters by risk score range and
+    [since, until) window (UTC); fields=summary (or a comma-separated field
+    list) returns lightweight rows instead of whole documents.
+    """
+    if state.mongo is None:
         raise HTTPException(status_code=503, detail="MongoDB not connected")
     
     try:
-        # Fetch recent logs, sorted by timestamp descending
-        cursor = analysis_collection.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit)
-        history = list(cursor)
+        # Newest first; pass next_cursor back to get the following page
+        query = analysis_query(min_risk, max_risk, since, until)
+        history, next_cursor = await paginate(state.mongo.collection(ANALYSIS_LOGS), query, "timestamp",
+                                              max(1, min(limit, MAX_PAGE_SIZE)), cursor,
+                                              projection=field_projection(fields))
         return {
             "count": len(history),
-            "history": history
+            "history": history,
+            "next_cursor": next_cursor
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/alerts/history")
+async def get_alert_history(source_id: Optional[str] = None, track_id: Optional[int] = None,
+                            level: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None):
+    """Stored video alerts, newest first, optionally for one source / track / alert level"""
+    if state.mongo is None:
+        raise HTTPException(status_code=503, detail="MongoDB not connected")
+
+    query = {}
+    if source_id is not None:
+        query["source_id"] = source_id
+    if track_id is not None:
+        query["track_id"] = track_id
+    if level is not None:
+        query["alert_level"] = level.upper()
+
+    try:
+        alerts, next_cursor = await paginate(state.mongo.collection(ALERTS), query, "timestamp",
+                                             max(1, min(limit, MAX_PAGE_SIZE)), cursor)
+        return {
+            "count": len(alerts),
+            "alerts": alerts,
+            "next_cursor": next_cursor
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 @app.post("/predict")
-async def predict(file: UploadFile = File(...)):
-    if model is None:
-         raise HTTPException(status_code=503, detail="Model not loaded. Please ensure 'backend/models/best.pt' exists.")
+async def predict(file: List[UploadFile] = File(...)):
+    """
+    Detect drones in one or more images (repeat the "file" field). Images of
+    concurrent requests are batched into shared detector calls. One image
+    returns {"detections": [...]}, several {"results": [{"filename", "detections"}, ...]}.
+    """
+    if state.batcher is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    if len(file) > PREDICT_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {PREDICT_MAX_IMAGES} images per request")
+
+    frames = []
+    for upload in file:
+        try:
+            # Decoded off the event loop; OpenCV releases the GIL
+            frames.append(await asyncio.to_thread(decode_image, await upload.read()))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{upload.filename}: {e}")
 
     try:
-        image_data = await file.read()
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Run inference
-        results = model(image)
-        
-        # Process results
-        detections = []
-        for result in results:
-            for box in result.boxes:
-                detections.append({
-                    "bbox": box.xyxy[0].tolist(), # [x1, y1, x2, y2]
-                    "conf": float(box.conf[0]),
-                    "class": int(box.cls[0]),
-                    "label": result.names[int(box.cls[0])]
-                })
-        
-        return {"detections": detections}
+        batch_detections = await state.batcher.detect(frames)
     except Exception as e:
         print(f"Error processing image: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    names = getattr(getattr(state.detector, "model", None), "names", None) or {}
+    results = []
+    for upload, detections in zip(file, batch_detections):
+        results.append({
+            "filename": upload.filename,
+            "detections": [{
+                "bbox": [float(v) for v in row[:4]],  # [x1, y1, x2, y2]
+                "conf": float(row[4]),
+                "class": int(row[5]),
+                "label": names.get(int(row[5]), str(int(row[5])))
+            } for row in detections.data]
+        })
+
+    if len(results) == 1:
+        return {"detections": results[0]["detections"]}
+    return {"results": results}
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
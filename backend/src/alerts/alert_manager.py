@@ -21,9 +21,16 @@ class NumpyEncoder(json.JSONEncoder):
 class AlertManager:
     """Manage alerts and logging"""
     
-    def __init__(self, log_file='outputs/logs/alerts.json'):
-        self.log_file = Path(log_file)
-        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, log_file='outputs/logs/alerts.json', source_id=None):
+        """
+        Args:
+            log_file: JSON-lines file every alert is appended to (None = keep in memory only)
+            source_id: Camera source recorded on each alert
+        """
+        self.log_file = Path(log_file) if log_file else None
+        self.source_id = source_id
+        if self.log_file is not None:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
         self.alerts = []
     
     def _safe_serialize(self, obj):
@@ -60,6 +67,8 @@ class AlertManager:
             'speed_value': self._safe_serialize(analysis.speed_value),
             'zone_name': self._safe_serialize(analysis.zone_name)
         }
+        if self.source_id is not None:
+            alert['source_id'] = str(self.source_id)
         
         self.alerts.append(alert)
         self._log_alert(alert)
@@ -68,6 +77,8 @@ class AlertManager:
     
     def _log_alert(self, alert):
         """Append alert to log file"""
+        if self.log_file is None:
+            return
         try:
             # Use standard JSON dumps since alert is already safely serialized
             with open(self.log_file, 'a') as f:
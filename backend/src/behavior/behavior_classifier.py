@@ -1,5 +1,6 @@
+import numpy as np
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, Tuple, Union
 from src.behavior.speed_analyzer import SpeedAnalyzer
 from src.behavior.hover_detector import HoverDetector
 from src.behavior.zone_checker import ZoneChecker
@@ -19,29 +20,40 @@ class BehaviorAnalysis:
 class BehaviorClassifier:
     """Classify drone behavior as normal or suspicious"""
     
-    def __init__(self, fps=30, restricted_zones=None):
-        self.speed_analyzer = SpeedAnalyzer(fps=fps, speed_threshold_pixels=50)
-        self.hover_detector = HoverDetector(radius_threshold=10, min_frames=30)
+    def __init__(self, fps=30, restricted_zones=None, speed_threshold_pixels=50,
+                 radius_threshold=10, hover_min_frames=30):
+        """
+        Args:
+            fps: Frames per second of the source
+            restricted_zones: List of polygons that raise HIGH alerts
+            speed_threshold_pixels: Speed above which a track is flagged (pixels/second)
+            radius_threshold: Maximum movement radius that still counts as hovering (pixels)
+            hover_min_frames: Frames a track must stay within the radius to be hovering
+        """
+        self.speed_analyzer = SpeedAnalyzer(fps=fps, speed_threshold_pixels=speed_threshold_pixels)
+        self.hover_detector = HoverDetector(radius_threshold=radius_threshold, min_frames=hover_min_frames)
         
         if restricted_zones:
             self.zone_checker = ZoneChecker(restricted_zones)
         else:
             self.zone_checker = None
     
-    def analyze(self, track_id: int, trajectory: List[Tuple]) -> BehaviorAnalysis:
+    def analyze(self, track_id: int, trajectory: Union[np.ndarray, List[Tuple]]) -> BehaviorAnalysis:
         """
         Analyze trajectory and classify behavior
         
         Args:
             track_id: Track ID
-            trajectory: [(frame_num, center_x, center_y), ...]
+            trajectory: (K, 3) array or [(frame_num, center_x, center_y), ...]
         
         Returns:
             BehaviorAnalysis object
         """
+        trajectory = np.asarray(trajectory, dtype=np.float64).reshape(-1, 3)
+        
         # Analyze speed
         speed = self.speed_analyzer.calculate_speed(trajectory)
-        speed_flag = self.speed_analyzer.is_high_speed(trajectory)
+        speed_flag = speed > self.speed_analyzer.speed_threshold
         
         # Check hovering
         hover_flag = self.hover_detector.is_hovering(trajectory)
@@ -49,8 +61,8 @@ class BehaviorClassifier:
         # Check restricted zones
         zone_flag = False
         zone_name = ""
-        if self.zone_checker and trajectory:
-            _, last_x, last_y = trajectory[-1]
+        if self.zone_checker and len(trajectory):
+            _, last_x, last_y = trajectory[-1].tolist()
             zone_flag, zone_name = self.zone_checker.check_position(last_x, last_y)
         
         # Determine alert level
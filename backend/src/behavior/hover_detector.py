@@ -27,8 +27,7 @@ class HoverDetector:
             return False
         
         # Check recent trajectory
-        recent = trajectory[-self.min_frames:]
-        positions = np.array([(x, y) for _, x, y in recent])
+        positions = np.asarray(trajectory, dtype=np.float64)[-self.min_frames:, 1:3]
         
         # Calculate centroid
         centroid = positions.mean(axis=0)
@@ -44,5 +43,5 @@ class HoverDetector:
         if len(trajectory) < 2:
             return 0.0
         
-        positions = np.array([(x, y) for _, x, y in trajectory])
+        positions = np.asarray(trajectory, dtype=np.float64)[:, 1:3]
         return float(np.var(positions))
\ No newline at end of file
@@ -26,19 +26,14 @@ class SpeedAnalyzer:
         if len(trajectory) < 2:
             return 0.0
         
-        speeds = []
-        for i in range(len(trajectory) - 1):
-            frame1, x1, y1 = trajectory[i]
-            frame2, x2, y2 = trajectory[i + 1]
-            
-            distance = np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            time_diff = (frame2 - frame1) / self.fps  # seconds
-            
-            if time_diff > 0:
-                speed = distance / time_diff  # pixels/second
-                speeds.append(speed)
+        steps = np.diff(np.asarray(trajectory, dtype=np.float64), axis=0)
+        distances = np.hypot(steps[:, 1], steps[:, 2])
+        time_diffs = steps[:, 0] / self.fps  # seconds
         
-        return float(np.mean(speeds)) if speeds else 0.0
+        valid = time_diffs > 0
+        if not valid.any():
+            return 0.0
+        return float(np.mean(distances[valid] / time_diffs[valid]))  # pixels/second
     
     def is_high_speed(self, trajectory: List[Tuple]) -> bool:
         """Check if drone is moving at suspicious speed"""
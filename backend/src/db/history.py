@@ -0,0 +1,147 @@
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from pymongo.errors import PyMongoError
+
+from src.db.mongo import MongoStore
+
+# Collections
+ALERTS = "alerts"
+TRACKS = "tracks"
+JOBS = "jobs"
+ANALYSIS_LOGS = "analysis_logs"
+JSON_UPLOADS = "json_uploads"
+JSON_UPLOAD_RECORDS = "json_upload_records"  # one document per record of an upload
+
+# Alerts are a time-series collection (MongoDB 5.0+): bucketed per source by timestamp
+ALERTS_TIMESERIES = {'timeField': 'timestamp', 'metaField': 'source_id', 'granularity': 'seconds'}
+
+# (keys, options) per collection, matching the history queries and their keyset sort
+INDEXES: Dict[str, List[Tuple[List[Tuple[str, int]], Dict]]] = {
+    ALERTS: [
+        ([('timestamp', -1), ('_id', -1)], {}),
+        ([('source_id', 1), ('timestamp', -1), ('_id', -1)], {}),
+        ([('source_id', 1), ('track_id', 1), ('timestamp', -1), ('_id', -1)], {}),
+        ([('alert_level', 1), ('timestamp', -1), ('_id', -1)], {}),
+    ],
+    TRACKS: [
+        ([('source_id', 1), ('end', -1), ('_id', -1)], {}),
+        ([('source_id', 1), ('track_id', 1), ('end', -1)], {}),
+    ],
+    JOBS: [
+        ([('job_id', 1)], {'unique': True}),
+        ([('created_at', -1), ('_id', -1)], {}),
+    ],
+    ANALYSIS_LOGS: [
+        ([('timestamp', -1), ('_id', -1)], {}),
+        ([('risk_score', -1), ('timestamp', -1)], {}),
+    ],
+    JSON_UPLOAD_RECORDS: [
+        ([('upload_id', 1), ('index', 1)], {'unique': True}),
+    ],
+}
+
+# Lightweight analysis rows for dashboard lists (no prompt, RF input or LLM text)
+ANALYSIS_SUMMARY_FIELDS = ('request_id', 'timestamp', 'risk_score', 'model', 'success')
+
+_FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+async def ensure_collections(store: MongoStore):
+    """
+    Create the alerts time-series collection and every history index, and
+    convert legacy string timestamps to dates (idempotent)
+    """
+    existing = await store.run(store.db.list_collection_names)
+    if ALERTS not in existing:
+        try:
+            await store.run(store.db.create_collection, ALERTS, timeseries=ALERTS_TIMESERIES)
+        except PyMongoError as e:
+            # Servers before 5.0: a regular collection with the same indexes
+            print(f"Warning: time-series collection unavailable ({e}), using a regular collection")
+
+    for name, indexes in INDEXES.items():
+        collection = store.collection(name)
+        for keys, options in indexes:
+            try:
+                await collection.create_index(keys, **options)
+            except PyMongoError as e:
+                print(f"Warning: could not create index {keys} on {name}: {e}")
+
+    # analysis_logs rows from before timestamps were stored as dates hold ISO strings, which
+    # never compare with dates in range or keyset queries; convert them (no-op once done)
+    try:
+        converted = await store.collection(ANALYSIS_LOGS).update_many(
+            {'timestamp': {'$type': 'string'}},
+            [{'$set': {'timestamp': {'$dateFromString': {'dateString': '$timestamp'}}}}])
+        if converted:
+            print(f"Converted {converted} string timestamps in {ANALYSIS_LOGS} to dates")
+    except PyMongoError as e:
+        print(f"Warning: could not convert string timestamps in {ANALYSIS_LOGS}: {e}")
+
+def analysis_query(min_risk: Optional[float] = None, max_risk: Optional[float] = None,
+                   since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict:
+    """analysis_logs filter for a risk score range and a [since, until) time window"""
+    query = {}
+    risk = {key: value for key, value in (('$gte', min_risk), ('$lte', max_risk)) if value is not None}
+    if risk:
+        query['risk_score'] = risk
+    window = {key: value for key, value in (('$gte', since), ('$lt', until)) if value is not None}
+    if window:
+        query['timestamp'] = window
+    return query
+
+def field_projection(fields: Optional[str]) -> Optional[Dict]:
+    """
+    Inclusion projection from a comma-separated field list ('summary' for
+    ANALYSIS_SUMMARY_FIELDS); None returns whole documents. ValueError on
+    names that are not plain (dotted) field paths.
+    """
+    if not fields:
+        return None
+    names = ANALYSIS_SUMMARY_FIELDS if fields == 'summary' else [name.strip() for name in fields.split(',')]
+    for name in names:
+        if not _FIELD_NAME.match(name):
+            raise ValueError(f"Invalid field name: {name!r}")
+    return {name: 1 for name in names}
+
+def to_utc(timestamp) -> datetime:
+    """Alert ISO string (local time) or epoch seconds as an aware UTC datetime"""
+    if isinstance(timestamp, (int, float)):
+        return datetime.fromtimestamp(timestamp, timezone.utc)
+    return datetime.fromisoformat(timestamp).astimezone(timezone.utc)
+
+class HistoryWriter:
+    """
+    Batched, thread-safe writes of pipeline events to MongoDB
+
+    Called from the inference scheduler thread; documents are queued on the
+    event loop and written by the store's BatchWriters.
+    """
+
+    def __init__(self, store: MongoStore, **batch_options):
+        """
+        Args:
+            store: Connected MongoStore
+            batch_options: BatchWriter options (max_batch, flush_interval, max_pending)
+        """
+        self.alerts = store.batch_writer(ALERTS, **batch_options)
+        self.tracks = store.batch_writer(TRACKS, **batch_options)
+
+    def alert(self, alert: Dict):
+        """Queue an AlertManager alert"""
+        document = dict(alert)
+        document['timestamp'] = to_utc(alert['timestamp'])
+        self.alerts.add_threadsafe(document)
+
+    def track(self, summary: Dict):
+        """Queue the summary of a finished track (see DroneDetectorTracker)"""
+        document = dict(summary)
+        document['start'] = to_utc(summary['start'])
+        document['end'] = to_utc(summary['end'])
+        self.tracks.add_threadsafe(document)
+
+    def get_statistics(self) -> Dict:
+        return {
+            'alerts': self.alerts.get_statistics(),
+            'tracks': self.tracks.get_statistics(),
+        }
@@ -0,0 +1,346 @@
+import copy
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+class DeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+def _get_path(document: Dict, path: str):
+    """Value at a dotted path, or a sentinel when missing"""
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+_MISSING = object()
+
+def _to_bson(value):
+    """Values as they come back from MongoDB: datetimes naive UTC with millisecond precision"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: _to_bson(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_bson(item) for item in value]
+    return value
+
+# $type aliases the fake understands
+_BSON_TYPES = {
+    'string': lambda value: isinstance(value, str),
+    'date': lambda value: isinstance(value, datetime),
+    'bool': lambda value: isinstance(value, bool),
+    'int': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'double': lambda value: isinstance(value, float),
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'null': lambda value: value is None,
+}
+
+_COMPARATORS = {
+    '$gt': lambda a, b: a is not _MISSING and a is not None and a > b,
+    '$gte': lambda a, b: a is not _MISSING and a is not None and a >= b,
+    '$lt': lambda a, b: a is not _MISSING and a is not None and a < b,
+    '$lte': lambda a, b: a is not _MISSING and a is not None and a <= b,
+    '$ne': lambda a, b: (None if a is _MISSING else a) != b,
+    '$in': lambda a, b: (None if a is _MISSING else a) in b,
+    '$nin': lambda a, b: (None if a is _MISSING else a) not in b,
+    '$exists': lambda a, b: (a is not _MISSING) == bool(b),
+    '$type': lambda a, b: a is not _MISSING and _BSON_TYPES[b](a),
+}
+
+def matches(document: Dict, query: Optional[Dict]) -> bool:
+    """Subset of MongoDB query semantics: equality, comparisons, $in, $exists, $type, $and, $or"""
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        else:
+            value = _get_path(document, key)
+            if isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+                for op, operand in condition.items():
+                    if op not in _COMPARATORS:
+                        raise NotImplementedError(f"In-memory store does not support {op}")
+                    if not _COMPARATORS[op](value, _to_bson(operand)):
+                        return False
+            elif (None if value is _MISSING else value) != _to_bson(condition):
+                return False
+    return True
+
+def _evaluate(expression, document: Dict):
+    """Aggregation expression for pipeline updates: '$field' paths, $dateFromString and literals"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        value = _get_path(document, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1 and next(iter(expression)).startswith('$'):
+        op, operand = next(iter(expression.items()))
+        if op != '$dateFromString':
+            raise NotImplementedError(f"In-memory store does not support {op}")
+        value = _evaluate(operand['dateString'], document)
+        if value is None:
+            return None
+        try:
+            # Like MongoDB: no offset in the string means UTC
+            return _to_bson(datetime.fromisoformat(value))
+        except (TypeError, ValueError):
+            raise OperationFailure(f"Error parsing date string '{value}'")
+    return _to_bson(expression)
+
+def _apply_update(document: Dict, update) -> Dict:
+    """Updated copy of document for a {'$set': ...} update or a pipeline of $set stages"""
+    stages = update if isinstance(update, list) else [update]
+    result = copy.deepcopy(document)
+    for stage in stages:
+        for op, fields in stage.items():
+            if op != '$set':
+                raise NotImplementedError(f"In-memory store does not support {op}")
+            # Pipeline stages see the document as of the stage; $set values are literals
+            values = {key: _evaluate(value, result) if isinstance(update, list) else _to_bson(value)
+                      for key, value in fields.items()}
+            for key, value in values.items():
+                *parents, leaf = key.split('.')
+                target = result
+                for part in parents:
+                    target = target.setdefault(part, {})
+                target[leaf] = value
+    return result
+
+def _project(document: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return document
+    include_id = projection.get('_id', 1)
+    fields = {key: value for key, value in projection.items() if key != '_id'}
+    if fields and all(fields.values()):
+        result = {}
+        for key in fields:
+            value = _get_path(document, key)
+            if value is _MISSING:
+                continue
+            *parents, leaf = key.split('.')
+            target = result
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = value
+        if include_id and '_id' in document:
+            result['_id'] = document['_id']
+        return result
+    excluded = {key for key, value in projection.items() if not value}
+    return {key: value for key, value in document.items() if key not in excluded}
+
+def _sort_key(value):
+    # None / missing first, then numbers, strings and everything else, like MongoDB's type order
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, value)
+
+class MemoryCursor:
+    """Lazy cursor supporting sort / skip / limit chaining like pymongo's"""
+
+    def __init__(self, documents: List[Dict], projection: Optional[Dict]):
+        self._documents = documents
+        self._projection = projection
+        self._sort: List = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction: int = 1) -> 'MemoryCursor':
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def skip(self, count: int) -> 'MemoryCursor':
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> 'MemoryCursor':
+        self._limit = count
+        return self
+
+    def __iter__(self) -> Iterator[Dict]:
+        documents = self._documents
+        for key, direction in reversed(self._sort):
+            documents = sorted(documents, key=lambda d: _sort_key(_get_path(d, key)), reverse=direction < 0)
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return (copy.deepcopy(_project(d, self._projection)) for d in documents)
+
+class MemoryCollection:
+    """Thread-safe in-process stand-in for a pymongo Collection (tests and local runs)"""
+
+    def __init__(self, name: str, options: Optional[Dict] = None):
+        self.name = name
+        self.options = options or {}
+        self._documents: List[Dict] = []
+        self._indexes: Dict[str, Dict] = {'_id_': {'key': [('_id', 1)], 'unique': True}}
+        self._unique_keys: Optional[Dict[str, set]] = None  # per unique index, rebuilt after deletes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(document: Dict, spec: Dict) -> str:
+        return repr([_get_path(document, field) for field, _ in spec['key']])
+
+    def _check_unique(self, document: Dict):
+        """Raise on a unique index conflict, else reserve the document's keys"""
+        unique = {name: spec for name, spec in self._indexes.items() if spec.get('unique')}
+        if self._unique_keys is None:
+            self._unique_keys = {name: {self._key(d, spec) for d in self._documents} for name, spec in unique.items()}
+        keys = {name: self._key(document, spec) for name, spec in unique.items()}
+        for name, key in keys.items():
+            if key in self._unique_keys[name]:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+        for name, key in keys.items():
+            self._unique_keys[name].add(key)
+
+    def insert_one(self, document: Dict) -> InsertOneResult:
+        document.setdefault('_id', ObjectId())
+        with self._lock:
+            self._check_unique(document)
+            self._documents.append(_to_bson(copy.deepcopy(document)))
+        return InsertOneResult(document['_id'])
+
+    def insert_many(self, documents: List[Dict], ordered: bool = True) -> InsertManyResult:
+        ids, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                ids.append(self.insert_one(document).inserted_id)
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(ids)})
+        return InsertManyResult(ids)
+
+    def find(self, filter: Optional[Dict] = None, projection: Optional[Dict] = None, **kwargs) -> MemoryCursor:
+        with self._lock:
+            documents = [d for d in self._documents if matches(d, filter)]
+        cursor = MemoryCursor(documents, projection)
+        if kwargs.get('sort'):
+            cursor.sort(kwargs['sort'])
+        if kwargs.get('limit'):
+            cursor.limit(kwargs['limit'])
+        return cursor
+
+    def find_one(self, filter: Optional[Dict] = None, projection: Optional[Dict] = None, **kwargs) -> Optional[Dict]:
+        return next(iter(self.find(filter, projection, limit=1, **kwargs)), None)
+
+    def count_documents(self, filter: Optional[Dict] = None, **kwargs) -> int:
+        with self._lock:
+            return sum(1 for d in self._documents if matches(d, filter))
+
+    def replace_one(self, filter: Dict, replacement: Dict, upsert: bool = False) -> UpdateResult:
+        with self._lock:
+            for i, document in enumerate(self._documents):
+                if matches(document, filter):
+                    replacement = {**replacement, '_id': document['_id']}
+                    self._documents[i] = _to_bson(copy.deepcopy(replacement))
+                    self._unique_keys = None
+                    return UpdateResult(1, 1)
+        if not upsert:
+            return UpdateResult(0, 0)
+        document = {**{key: value for key, value in filter.items() if not key.startswith('$')}, **replacement}
+        return UpdateResult(0, 0, self.insert_one(document).inserted_id)
+
+    def update_many(self, filter: Dict, update) -> UpdateResult:
+        with self._lock:
+            # All updates are computed before any is applied, so a failing one changes nothing
+            updated = [(i, _apply_update(document, update)) for i, document in enumerate(self._documents)
+                       if matches(document, filter)]
+            modified = 0
+            for i, document in updated:
+                if document != self._documents[i]:
+                    self._documents[i] = document
+                    modified += 1
+            self._unique_keys = None
+        return UpdateResult(len(updated), modified)
+
+    def delete_many(self, filter: Optional[Dict] = None) -> DeleteResult:
+        with self._lock:
+            kept = [d for d in self._documents if not matches(d, filter)]
+            deleted = len(self._documents) - len(kept)
+            self._documents = kept
+            self._unique_keys = None
+        return DeleteResult(deleted)
+
+    def create_index(self, keys, name: Optional[str] = None, unique: bool = False, **kwargs) -> str:
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = name or '_'.join(f"{field}_{direction}" for field, direction in keys)
+        with self._lock:
+            self._indexes[name] = {'key': keys, 'unique': unique, **kwargs}
+            self._unique_keys = None
+        return name
+
+    def index_information(self) -> Dict[str, Dict]:
+        with self._lock:
+            return copy.deepcopy(self._indexes)
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name)
+            return self._collections[name]
+
+    def create_collection(self, name: str, **options) -> MemoryCollection:
+        with self._lock:
+            self._collections[name] = MemoryCollection(name, options)
+            return self._collections[name]
+
+    def drop_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def list_collection_names(self) -> List[str]:
+        with self._lock:
+            return list(self._collections)
+
+    def command(self, name: str, *args, **kwargs) -> Dict[str, Any]:
+        return {'ok': 1.0}
+
+class MemoryClient:
+    """In-process fake of pymongo.MongoClient (MONGO_URI=memory://)"""
+
+    def __init__(self, *args, **kwargs):
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self.admin = MemoryDatabase('admin')
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+    def close(self):
+        pass
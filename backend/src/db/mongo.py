@@ -0,0 +1,302 @@
+import asyncio
+import functools
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import pymongo
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+
+from src.db.memory import MemoryClient
+
+# URI scheme for the in-process fake (tests and running without a database)
+MEMORY_URI = "memory://"
+
+def is_transient(error: PyMongoError) -> bool:
+    """Network / failover errors worth retrying (AutoReconnect, NetworkTimeout, no primary, ...)"""
+    return (isinstance(error, ConnectionFailure)
+            or error.has_error_label("RetryableWriteError")
+            or error.has_error_label("TransientTransactionError"))
+
+def _insert_many(collection, documents: List[Dict], ordered: bool) -> int:
+    try:
+        return len(collection.insert_many(documents, ordered=ordered).inserted_ids)
+    except BulkWriteError as e:
+        # Documents carry client-generated _ids, so duplicate keys only come
+        # from a retried batch whose first attempt was partly applied
+        errors = e.details.get("writeErrors", [])
+        if errors and all(error.get("code") == 11000 for error in errors):
+            return e.details.get("nInserted", 0)
+        raise
+
+def _find(collection, filter, projection, sort, skip, limit) -> List[Dict]:
+    cursor = collection.find(filter or {}, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return list(cursor)
+
+class AsyncCollection:
+    """Awaitable view of a collection; every call runs on the store's thread pool with retries"""
+
+    def __init__(self, store: 'MongoStore', collection):
+        self.store = store
+        self.raw = collection  # synchronous pymongo (or in-memory) collection
+
+    @property
+    def name(self) -> str:
+        return self.raw.name
+
+    async def insert_one(self, document: Dict) -> Any:
+        result = await self.store.run(self.raw.insert_one, document)
+        return result.inserted_id
+
+    async def insert_many(self, documents: List[Dict], ordered: bool = False) -> int:
+        """Insert documents in one round trip, returning how many were written"""
+        if not documents:
+            return 0
+        return await self.store.run(_insert_many, self.raw, documents, ordered)
+
+    async def find(self, filter: Optional[Dict] = None, projection: Optional[Dict] = None,
+                   sort: Optional[List[Tuple[str, int]]] = None, skip: int = 0, limit: int = 0) -> List[Dict]:
+        return await self.store.run(_find, self.raw, filter, projection, sort, skip, limit)
+
+    async def find_one(self, filter: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        return await self.store.run(self.raw.find_one, filter or {}, projection)
+
+    async def replace_one(self, filter: Dict, replacement: Dict, upsert: bool = False) -> int:
+        """Replace (or upsert) one document, returning the matched count"""
+        result = await self.store.run(self.raw.replace_one, filter, replacement, upsert=upsert)
+        return result.matched_count
+
+    async def update_many(self, filter: Dict, update: Union[Dict, List[Dict]]) -> int:
+        """Apply an update document or pipeline to every match, returning the modified count"""
+        result = await self.store.run(self.raw.update_many, filter, update)
+        return result.modified_count
+
+    async def delete_many(self, filter: Dict) -> int:
+        result = await self.store.run(self.raw.delete_many, filter)
+        return result.deleted_count
+
+    async def count_documents(self, filter: Optional[Dict] = None) -> int:
+        return await self.store.run(self.raw.count_documents, filter or {})
+
+    async def create_index(self, keys: Union[str, Sequence[Tuple[str, int]]], **kwargs) -> str:
+        return await self.store.run(self.raw.create_index, keys, **kwargs)
+
+class MongoStore:
+    """
+    Async access to MongoDB for the API
+
+    pymongo's thread-safe client (and its connection pool) is driven from a
+    thread pool sized to the pool, so handlers await database calls instead
+    of blocking the event loop. Transient failures are retried with
+    exponential backoff and jitter. MONGO_URI=memory:// swaps in an
+    in-process fake with the same interface.
+    """
+
+    def __init__(self, uri: str, max_pool_size: int = 50, min_pool_size: int = 0,
+                 max_idle_time_ms: int = 60000, timeout_ms: int = 5000, tls_insecure: bool = False,
+                 retries: int = 3, backoff: float = 0.1):
+        """
+        Args:
+            uri: MongoDB connection string, or memory:// for the in-process fake
+            max_pool_size: Maximum connections (and worker threads)
+            min_pool_size: Connections kept open while idle
+            max_idle_time_ms: Close pooled connections idle for longer than this
+            timeout_ms: Server selection / connect timeout
+            tls_insecure: Skip certificate and hostname verification
+            retries: Retries of a transient failure before giving up
+            backoff: First retry delay in seconds (doubles per attempt)
+        """
+        self.uri = uri
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.max_idle_time_ms = max_idle_time_ms
+        self.timeout_ms = timeout_ms
+        self.tls_insecure = tls_insecure
+        self.retries = retries
+        self.backoff = backoff
+
+        self.client = None
+        self.db = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._writers: List['BatchWriter'] = []
+
+    @property
+    def available(self) -> bool:
+        return self.db is not None
+
+    @property
+    def database_name(self) -> str:
+        """Database from the URI path (mongodb://host/<name>?...), default uav_detection"""
+        rest = self.uri.split("://", 1)[-1]
+        path = rest.split("/", 1)[1] if "/" in rest else ""
+        return path.split("?")[0] or "uav_detection"
+
+    def _create_client(self):
+        if self.uri.startswith(MEMORY_URI):
+            return MemoryClient()
+        options = dict(maxPoolSize=self.max_pool_size, minPoolSize=self.min_pool_size,
+                       maxIdleTimeMS=self.max_idle_time_ms, serverSelectionTimeoutMS=self.timeout_ms,
+                       connectTimeoutMS=self.timeout_ms, retryWrites=True, retryReads=True)
+        if self.tls_insecure:
+            options.update(tls=True, tlsAllowInvalidCertificates=True, tlsAllowInvalidHostnames=True)
+        return pymongo.MongoClient(self.uri, **options)
+
+    async def connect(self) -> bool:
+        """Create the client and verify the server answers; False when unreachable"""
+        self._executor = ThreadPoolExecutor(max_workers=self.max_pool_size, thread_name_prefix="mongo")
+        try:
+            self.client = self._create_client()
+            # No retries: server selection already waited timeout_ms
+            await asyncio.get_running_loop().run_in_executor(self._executor, self.client.admin.command, "ping")
+        except Exception as e:
+            print(f"Warning: MongoDB connection failed: {e}")
+            await self.close()
+            return False
+
+        self.db = self.client[self.database_name]
+        print(f"Connected to MongoDB: {self.database_name}")
+        return True
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run a blocking driver call on the pool, retrying transient errors with backoff"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        for attempt in range(self.retries + 1):
+            try:
+                return await loop.run_in_executor(self._executor, call)
+            except PyMongoError as e:
+                if attempt == self.retries or not is_transient(e):
+                    raise
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"MongoDB transient error ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def collection(self, name: str) -> AsyncCollection:
+        if self.db is None:
+            raise RuntimeError("MongoDB not connected")
+        return AsyncCollection(self, self.db[name])
+
+    def batch_writer(self, name: str, **kwargs) -> 'BatchWriter':
+        """Start a BatchWriter for a collection; flushed and stopped by close()"""
+        writer = BatchWriter(self.collection(name), **kwargs)
+        writer.start()
+        self._writers.append(writer)
+        return writer
+
+    async def close(self):
+        for writer in self._writers:
+            await writer.close()
+        self._writers = []
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+        self.db = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+class BatchWriter:
+    """
+    Coalesces high-rate inserts (alerts, analysis logs) into insert_many calls
+
+    Documents are queued without waiting and written every flush_interval
+    seconds or as soon as max_batch are pending. A batch that still fails
+    after the store's retries is put back and tried again on the next flush;
+    beyond max_pending the oldest queued documents are dropped (and counted).
+    """
+
+    def __init__(self, collection: AsyncCollection, max_batch: int = 500,
+                 flush_interval: float = 0.5, max_pending: int = 50000):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: List[Dict] = []
+        self._flush_lock = asyncio.Lock()  # one flush at a time; flush() waits for in-flight batches
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop = None
+        self._task = None
+        self._closed = False
+
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def add(self, document: Dict):
+        """Queue a document (event loop thread)"""
+        self._pending.append(document)
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+        if len(self._pending) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    def add_threadsafe(self, document: Dict):
+        """Queue a document from another thread (e.g. the inference scheduler)"""
+        try:
+            if self._in_loop_thread():
+                self.add(document)
+                return
+            self._loop.call_soon_threadsafe(self.add, document)
+        except (AttributeError, RuntimeError):
+            # Writer not started or event loop already closed
+            self.dropped += 1
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything pending, max_batch documents per round trip"""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:len(batch)]
+                try:
+                    self.written += await self.collection.insert_many(batch)
+                except Exception as e:
+                    print(f"Error writing {len(batch)} documents to {self.collection.name}: {e}")
+                    self.failed_batches += 1
+                    self._pending[:0] = batch
+                    return
+
+    async def close(self):
+        """Stop the background task and write what is left"""
+        self._closed = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def get_statistics(self) -> Dict:
+        return {
+            'pending': len(self._pending),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed_batches': self.failed_batches,
+        }
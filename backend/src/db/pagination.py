@@ -0,0 +1,61 @@
+import base64
+from typing import Any, Dict, List, Optional, Tuple
+from bson import json_util
+
+from src.db.mongo import AsyncCollection
+
+def encode_cursor(document: Dict, field: str) -> str:
+    """Opaque token pointing just past document in (field, _id) descending order"""
+    raw = json_util.dumps([document[field], document['_id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token: str) -> Tuple[Any, Any]:
+    """(field value, _id) of a token from encode_cursor; ValueError when malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, document_id = json_util.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return value, document_id
+
+def after_cursor(field: str, token: str) -> Dict:
+    """Filter for documents after the cursor in (field, _id) descending order"""
+    value, document_id = decode_cursor(token)
+    return {'$or': [{field: {'$lt': value}}, {field: value, '_id': {'$lt': document_id}}]}
+
+async def paginate(collection: AsyncCollection, filter: Optional[Dict], field: str, limit: int,
+                   cursor: Optional[str] = None,
+                   projection: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Newest-first keyset pagination on (field, _id)
+
+    Each page starts from the previous page's last key instead of skipping,
+    so it is served from a (..., field, _id) index at any depth and stays
+    stable while new documents arrive. _id is dropped from the returned
+    documents.
+
+    Args:
+        collection: Collection to read
+        filter: Query the page is restricted to
+        field: Sort field (descending), e.g. timestamp
+        limit: Page size
+        cursor: next_cursor of the previous page, None for the first page
+        projection: Fields to return (inclusion or exclusion, without _id)
+
+    Returns:
+        (documents, next_cursor), next_cursor None on the last page
+    """
+    clauses = [filter] if filter else []
+    if cursor:
+        clauses.append(after_cursor(field, cursor))
+    query = {'$and': clauses} if len(clauses) > 1 else (clauses[0] if clauses else {})
+
+    if projection and any(projection.values()):
+        projection = {**projection, field: 1}
+
+    documents = await collection.find(query, projection, sort=[(field, -1), ('_id', -1)], limit=limit + 1)
+    next_cursor = encode_cursor(documents[limit - 1], field) if len(documents) > limit else None
+    documents = documents[:limit]
+    for document in documents:
+        document.pop('_id', None)
+    return documents, next_cursor
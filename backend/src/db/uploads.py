@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+from bson import ObjectId
+
+from src.db.history import JSON_UPLOAD_RECORDS, JSON_UPLOADS
+from src.db.mongo import MongoStore
+from src.utils.json_stream import RecordParser, iter_records
+
+async def read_chunks(file, chunk_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    """Chunks of an UploadFile (or anything with async read(size))"""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+async def store_upload(store: MongoStore, chunks: AsyncIterator[bytes], filename: Optional[str],
+                       batch_size: int = 500, max_bytes: Optional[int] = None,
+                       max_record_bytes: int = 1 << 20) -> Dict:
+    """
+    Parse a JSON array / NDJSON upload as it streams in and store every record
+    as its own JSON_UPLOAD_RECORDS document ({upload_id, index, data}), written
+    batch_size at a time; each batch is awaited before reading on, so memory
+    stays flat whatever the upload size. The JSON_UPLOADS summary document is
+    written last. On a parse error or size limit the records already stored
+    are removed and the error re-raised.
+
+    Returns:
+        The JSON_UPLOADS document
+    """
+    upload_id = ObjectId()
+    records = store.collection(JSON_UPLOAD_RECORDS)
+    parser = RecordParser(max_bytes=max_bytes, max_record_bytes=max_record_bytes)
+    batch = []
+    count = 0
+    try:
+        async for record in iter_records(chunks, parser):
+            batch.append({'upload_id': upload_id, 'index': count, 'data': record})
+            count += 1
+            if len(batch) >= batch_size:
+                await records.insert_many(batch)
+                batch = []
+        if batch:
+            await records.insert_many(batch)
+    except BaseException:
+        try:
+            await records.delete_many({'upload_id': upload_id})
+        except Exception as e:
+            print(f"Error removing partial upload {upload_id}: {e}")
+        raise
+
+    document = {
+        '_id': upload_id,
+        'filename': filename,
+        'upload_timestamp': datetime.utcnow(),
+        'format': parser.format,
+        'records': count,
+        'bytes': parser.bytes,
+        'records_collection': JSON_UPLOAD_RECORDS,
+    }
+    await store.collection(JSON_UPLOADS).insert_one(document)
+    return document
@@ -0,0 +1,54 @@
+import numpy as np
+from typing import List, Tuple
+from src.utils.boxes import Detections
+
+class Detector:
+    """
+    Interface shared by every detector the pipeline can run on
+
+    Subclasses implement detect_array (one frame) or detect_batch_arrays (many
+    frames in one call); the tuple-returning variants are derived from those.
+    Besides DroneDetector (YOLO) there are model-free implementations in
+    src.detection.stub_detectors for deterministic testing and profiling.
+    """
+
+    def detect(self, frame: np.ndarray) -> List[Tuple[float, float, float, float, float]]:
+        """
+        Detect drones in frame
+        
+        Args:
+            frame: Input frame (BGR format)
+        
+        Returns:
+            List of detections: [(x1, y1, x2, y2, confidence), ...]
+        """
+        return self.detect_array(frame).to_tuples()
+
+    def detect_array(self, frame: np.ndarray) -> Detections:
+        """
+        Detect drones in frame (columnar fast path)
+        
+        Returns:
+            Detections: (N, 6) float32 array of x1, y1, x2, y2, conf, cls
+        """
+        return self.detect_batch_arrays([frame])[0]
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Tuple[float, float, float, float, float]]]:
+        """
+        Detect drones in a batch of frames
+
+        Returns:
+            Per-frame detection lists, in the same format as detect()
+        """
+        return [detections.to_tuples() for detections in self.detect_batch_arrays(frames)]
+
+    def detect_batch_arrays(self, frames: List[np.ndarray]) -> List[Detections]:
+        """
+        Detect drones in a batch of frames
+
+        Returns:
+            Per-frame Detections
+        """
+        if type(self).detect_array is Detector.detect_array:
+            raise NotImplementedError(f"{type(self).__name__} must implement detect_array or detect_batch_arrays")
+        return [self.detect_array(frame) for frame in frames]
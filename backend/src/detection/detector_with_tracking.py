@@ -1,81 +1,262 @@
 import cv2
+import time
 import numpy as np
 from typing import List, Tuple
-from src.detection.yolo_detector import DroneDetector
 from src.tracking.tracker import SimpleTracker
 from src.behavior.behavior_classifier import BehaviorClassifier
 from src.alerts.alert_manager import AlertManager
+from src.utils.boxes import Detections
+from src.utils.metrics import METRICS
+from src.utils.recording import ALERT_LEVELS
+
+# Box colors (BGR) per alert level
+ALERT_COLORS = {
+    'HIGH': (0, 0, 255),      # Red
+    'MEDIUM': (0, 165, 255),  # Orange
+    'LOW': (0, 255, 255),     # Yellow
+}
 
 class DroneDetectorTracker:
     """Combined detection + tracking + behavior analysis pipeline"""
     
-    def __init__(self, model_path="yolov8s.pt", conf_threshold=0.5, restricted_zones=None):
-        self.detector = DroneDetector(model_path, conf_threshold)
-        self.tracker = SimpleTracker()
-        self.behavior_classifier = BehaviorClassifier(fps=30, restricted_zones=restricted_zones)
-        self.alert_manager = AlertManager()
+    def __init__(self, model_path="yolov8s.pt", conf_threshold=0.5, restricted_zones=None,
+                 motion_gate=None, backend="pytorch", int8=False, detector=None,
+                 source_id=None, recorder=None, tracker_params=None, behavior_params=None,
+                 history=None):
+        """
+        Args:
+            model_path: Path to YOLO model weights
+            conf_threshold: Confidence threshold for detections
+            restricted_zones: List of polygons passed to the behavior classifier
+            motion_gate: Optional pre-stage with a check(frame, track_boxes) method
+                         (e.g. MotionGate) that returns an ROI or None to skip detection
+            backend: Detector inference backend ('pytorch', 'onnx', 'torchscript', 'openvino')
+            int8: Use INT8-quantized weights for the backend
+            detector: Existing detector to share (e.g. across camera sources); when
+                      given, model_path/conf_threshold/backend/int8 are ignored
+            source_id: Camera source this pipeline belongs to, recorded on alerts
+            recorder: Optional PipelineRecorder receiving every frame's detections,
+                      tracks and behavior results (for offline re-tuning)
+            tracker_params: SimpleTracker keyword arguments (max_age, min_hits, iou_threshold)
+            behavior_params: BehaviorClassifier keyword arguments (speed_threshold_pixels,
+                             radius_threshold, hover_min_frames)
+            history: Optional sink with alert(alert) and track(summary) methods (e.g.
+                     HistoryWriter) receiving every alert and a summary of every
+                     track once it ends
+        """
+        if detector is None:
+            # Imported here so stub/replay detectors work without torch installed
+            from src.detection.yolo_detector import DroneDetector
+            detector = DroneDetector(model_path, conf_threshold, backend=backend, int8=int8)
+        self.detector = detector
+        self.source_id = source_id
+        self.tracker = SimpleTracker(**(tracker_params or {}))
+        self.behavior_classifier = BehaviorClassifier(fps=30, restricted_zones=restricted_zones,
+                                                      **(behavior_params or {}))
+        self.alert_manager = AlertManager(source_id=source_id)
+        self.recorder = recorder
+        self.history = history
         self.frame_count = 0
+        self._track_summaries = {}  # track_id -> summary of the live track (history only)
+
+        # Motion gate counters
+        self.motion_gate = motion_gate
+        self.frames_skipped = 0
+        self.detector_time_saved = 0.0
+        self._avg_detect_time = 0.0
     
     def process_frame(self, frame):
         """
         Process single frame
         
         Returns:
-            tracks: List of (track_id, x1, y1, x2, y2, conf)
+            tracks: Tracks array (iterates as (track_id, x1, y1, x2, y2, conf) tuples)
             annotated_frame: Frame with visualizations
             alerts: List of current alerts
         """
-        self.frame_count += 1
-        
         # Run detection
-        detections = self.detector.detect(frame)
+        with METRICS.stage('detect'):
+            detections = self._run_detection(frame)
+        
+        return self.process_detections(frame, detections)
+
+    def reset_tracking(self):
+        """
+        Start tracking from scratch (e.g. when a replayed clip loops), so track ids
+        and frame numbers restart and nothing carries over from the previous pass.
+        Alert history is kept.
+        """
+        self.tracker = SimpleTracker(max_age=self.tracker.max_age, min_hits=self.tracker.min_hits,
+                                     iou_threshold=self.tracker.iou_threshold)
+        self.frame_count = 0
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self._finish_tracks(list(self._track_summaries))
+
+    def process_detections(self, frame, detections: Detections, annotate: bool = True):
+        """
+        Run tracking, behavior analysis and annotation on detections produced elsewhere
+        (e.g. by a batched detector call shared between sources)
+        
+        Args:
+            frame: Frame the detections belong to (unused when annotate is False)
+            detections: Detections in frame coordinates
+            annotate: Draw the annotated frame; when False None is returned in its place
+        
+        Returns:
+            Same as process_frame
+        """
+        self.frame_count += 1
         
         # Update tracker
-        tracks = self.tracker.update(detections)
-        
-        # Analyze behavior and generate alerts
-        alerts = []
-        for track_id, x1, y1, x2, y2, conf in tracks:
-            trajectory = self.tracker.get_track_history(track_id)
-            if len(trajectory) > 5:  # Only analyze if we have enough history
-                analysis = self.behavior_classifier.analyze(track_id, trajectory)
+        with METRICS.stage('track'):
+            tracks = self.tracker.update_array(detections)
+        
+        # Analyze behavior (only tracks with enough history), then generate alerts
+        with METRICS.stage('behavior'):
+            analyses = []
+            for track_id in tracks.ids.tolist():
+                trajectory = self.tracker.get_track_history_array(track_id)
+                if len(trajectory) > 5:
+                    analyses.append(self.behavior_classifier.analyze(track_id, trajectory))
+        
+        with METRICS.stage('alert'):
+            alerts = []
+            for analysis in analyses:
                 alert = self.alert_manager.generate_alert(analysis, self.frame_count)
                 if alert:
                     alerts.append(alert)
         
+        if self.history is not None:
+            for alert in alerts:
+                self.history.alert(alert)
+            self._summarize_tracks(tracks, analyses, alerts)
+        
+        if self.recorder is not None:
+            self.recorder.record(self.frame_count, detections, tracks, analyses, timestamp=time.time())
+        
         # Annotate frame
-        try:
-            annotated_frame = self._annotate_frame(frame.copy(), tracks, alerts, detections)
-        except Exception as e:
-            print(f"Error annotating frame {self.frame_count}: {e}")
-            annotated_frame = frame
+        annotated_frame = None
+        if annotate:
+            with METRICS.stage('annotate'):
+                try:
+                    annotated_frame = self._annotate_frame(frame.copy(), tracks, alerts, detections)
+                except Exception as e:
+                    print(f"Error annotating frame {self.frame_count}: {e}")
+                    annotated_frame = frame
+        
+        METRICS.inc('frames')
+        METRICS.inc('detections', len(detections))
+        METRICS.inc('tracks', len(tracks))
+        if alerts:
+            METRICS.inc('alerts', len(alerts))
         
         return tracks, annotated_frame, alerts
     
+    def _run_detection(self, frame):
+        """Run the detector, restricted to the motion gate ROI when a gate is set"""
+        if self.motion_gate is None:
+            return self.detector.detect_array(frame)
+
+        roi = self.select_roi(frame)
+        if roi is None:
+            return Detections()
+
+        x1, y1, x2, y2 = roi
+        start = time.perf_counter()
+        detections = self.detector.detect_array(frame[y1:y2, x1:x2])
+        self.record_detect_time(time.perf_counter() - start)
+
+        return detections.offset(x1, y1)
+
+    def _summarize_tracks(self, tracks, analyses, alerts):
+        """Update per-track summaries and hand finished tracks to the history sink"""
+        now = time.time()
+        summaries = self._track_summaries
+        for track_id in tracks.ids.tolist():
+            summary = summaries.get(track_id)
+            if summary is None:
+                summary = summaries[track_id] = {
+                    'source_id': self.source_id, 'track_id': int(track_id),
+                    'start': now, 'first_frame': self.frame_count, 'frames': 0,
+                    'max_speed': 0.0, 'max_alert_level': 'NORMAL', 'alerts': 0,
+                }
+            summary['frames'] += 1
+            summary['end'] = now
+            summary['last_frame'] = self.frame_count
+        
+        for analysis in analyses:
+            summary = summaries[analysis.track_id]
+            summary['max_speed'] = max(summary['max_speed'], float(analysis.speed_value))
+            if ALERT_LEVELS.index(analysis.alert_level) > ALERT_LEVELS.index(summary['max_alert_level']):
+                summary['max_alert_level'] = analysis.alert_level
+        for alert in alerts:
+            summaries[alert['track_id']]['alerts'] += 1
+        
+        self._finish_tracks([track_id for track_id in summaries if track_id not in self.tracker.tracks])
+
+    def _finish_tracks(self, track_ids):
+        for track_id in track_ids:
+            summary = self._track_summaries.pop(track_id)
+            if self.history is not None:
+                self.history.track(summary)
+
+    def close(self):
+        """Flush the recorder and the summaries of live tracks, if any"""
+        if self.recorder is not None:
+            self.recorder.close()
+        self._finish_tracks(list(self._track_summaries))
+
+    def select_roi(self, frame):
+        """
+        Region of the frame the detector should see
+        
+        Returns:
+            (x1, y1, x2, y2), or None when the motion gate skips the frame
+        """
+        if self.motion_gate is None:
+            return (0, 0, frame.shape[1], frame.shape[0])
+
+        roi = self.motion_gate.check(frame, self.tracker.get_predicted_boxes())
+        if roi is None:
+            # Nothing moved and nothing is being tracked
+            self.frames_skipped += 1
+            self.detector_time_saved += self._avg_detect_time
+        return roi
+
+    def record_detect_time(self, elapsed):
+        """Exponential moving average of detector cost, used to estimate time saved"""
+        if self._avg_detect_time == 0.0:
+            self._avg_detect_time = elapsed
+        else:
+            self._avg_detect_time = 0.9 * self._avg_detect_time + 0.1 * elapsed
+
+    def get_gate_statistics(self):
+        """Get motion gate counters"""
+        return {
+            'gate_enabled': self.motion_gate is not None,
+            'frames_processed': self.frame_count,
+            'frames_skipped': self.frames_skipped,
+            'detector_time_saved_s': round(self.detector_time_saved, 3),
+        }
+
     def _annotate_frame(self, frame, tracks, alerts, detections=None):
         """Annotate frame with tracks and alerts"""
-        # Draw raw detections first (faint gray) structure: x1, y1, x2, y2, conf
-        if detections:
-            for x1, y1, x2, y2, conf in detections:
-                 cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (128, 128, 128), 1)
+        # Draw raw detections first (faint gray)
+        if detections is not None and len(detections):
+            for x1, y1, x2, y2 in detections.boxes.astype(np.int32).tolist():
+                 cv2.rectangle(frame, (x1, y1), (x2, y2), (128, 128, 128), 1)
+
+        # Alert level per track; later alerts for the same track take precedence
+        levels = {alert['track_id']: alert['alert_level'] for alert in alerts
+                  if alert['alert_level'] in ALERT_COLORS}
 
         # Draw tracks
-        for track_id, x1, y1, x2, y2, conf in tracks:
-            # Determine color based on alerts
-            color = (0, 255, 0)  # Green by default
-            alert_level = 'NORMAL'
-            
-            for alert in alerts:
-                if alert['track_id'] == track_id:
-                    if alert['alert_level'] == 'HIGH':
-                        color = (0, 0, 255)  # Red
-                        alert_level = 'HIGH'
-                    elif alert['alert_level'] == 'MEDIUM':
-                        color = (0, 165, 255)  # Orange
-                        alert_level = 'MEDIUM'
-                    elif alert['alert_level'] == 'LOW':
-                        color = (0, 255, 255)  # Yellow
-                        alert_level = 'LOW'
+        for track_id, x1, y1, x2, y2, conf in tracks.data.tolist():
+            track_id = int(track_id)
+            # Determine color based on alerts, green by default
+            alert_level = levels.get(track_id, 'NORMAL')
+            color = ALERT_COLORS.get(alert_level, (0, 255, 0))
             
             # Draw bounding box
             cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
@@ -86,11 +267,10 @@ class DroneDetectorTracker:
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
             
             # Draw trajectory
-            history = self.tracker.get_track_history(track_id)
+            history = self.tracker.get_track_history_array(track_id)
             if len(history) > 1:
-                points = [(int(cx), int(cy)) for _, cx, cy in history]
-                for i in range(len(points) - 1):
-                    cv2.line(frame, points[i], points[i+1], (255, 0, 0), 2)
+                points = history[:, 1:3].astype(np.int32)
+                cv2.polylines(frame, [points], False, (255, 0, 0), 2)
         
         # Draw restricted zones if any
         if hasattr(self.behavior_classifier, 'zone_checker') and self.behavior_classifier.zone_checker:
@@ -122,21 +302,23 @@ def process_video_with_tracking(model_path, video_path, output_path, restricted_
     print(f"Total frames: {total_frames}, FPS: {fps}, Size: {width}x{height}")
     
     while True:
-        ret, frame = cap.read()
+        with METRICS.stage('decode'):
+            ret, frame = cap.read()
         if not ret:
             if frame_idx == 0:
                 print("Error: Could not read the first frame. Check video format.")
             break
         
         tracks, annotated_frame, alerts = detector.process_frame(frame)
-        out.write(annotated_frame)
+        with METRICS.stage('encode'):
+            out.write(annotated_frame)
         
         total_alerts += len(alerts)
         
         frame_idx += 1
         if frame_idx % 10 == 0:
             # Print more frequently for debugging
-            print(f"Frame {frame_idx}/{total_frames}: {len(tracks)} tracks, {len(alerts)} alerts. (Raw detections: {len(detector.detector.detect(frame))})")
+            print(f"Frame {frame_idx}/{total_frames}: {len(tracks)} tracks, {len(alerts)} alerts. (Raw detections: {len(detector.detector.detect_array(frame))})")
     
     cap.release()
     out.release()
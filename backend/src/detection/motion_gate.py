@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+class MotionGate:
+    """
+    Cheap motion pre-stage for static cameras
+
+    Runs frame differencing against a running-average background on a
+    downscaled grayscale frame and decides whether the detector needs to run
+    at all. When it does, it returns a single region of interest covering the
+    moving areas plus the predicted boxes of existing tracks.
+    """
+
+    def __init__(self, process_width=320, diff_threshold=25, min_area=4,
+                 learning_rate=0.05, padding=32, full_frame_interval=30,
+                 full_frame_ratio=0.6):
+        """
+        Args:
+            process_width: Width of the downscaled frame used for differencing
+            diff_threshold: Minimum per-pixel intensity change counted as motion
+            min_area: Minimum blob area (downscaled pixels) counted as motion
+            learning_rate: Background running-average update rate
+            padding: Padding (full-res pixels) added around the region of interest
+            full_frame_interval: Force a full-frame detection every N frames (0 disables)
+            full_frame_ratio: Run on the full frame when the ROI covers more than this fraction
+        """
+        self.process_width = process_width
+        self.diff_threshold = diff_threshold
+        self.min_area = min_area
+        self.learning_rate = learning_rate
+        self.padding = padding
+        self.full_frame_interval = full_frame_interval
+        self.full_frame_ratio = full_frame_ratio
+
+        self.background = None
+        self.frame_count = 0
+        self._kernel = np.ones((3, 3), np.uint8)
+
+    def reset(self):
+        """Forget the background model (e.g. after a scene cut or source change)"""
+        self.background = None
+        self.frame_count = 0
+
+    def check(self, frame: np.ndarray,
+              track_boxes: Optional[List[Tuple[float, float, float, float]]] = None
+              ) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Decide whether to run the detector on this frame
+
+        Args:
+            frame: Input frame (BGR format)
+            track_boxes: Predicted boxes of existing tracks [(x1, y1, x2, y2), ...]
+
+        Returns:
+            (x1, y1, x2, y2) region to run the detector on, or None to skip the frame
+        """
+        self.frame_count += 1
+        height, width = frame.shape[:2]
+        scale = self.process_width / float(width)
+
+        small = cv2.resize(frame, (self.process_width, max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        # First frame has nothing to compare against
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            return (0, 0, width, height)
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        # Periodic full-frame pass so stationary new objects are not missed forever
+        if self.full_frame_interval and self.frame_count % self.full_frame_interval == 0:
+            return (0, 0, width, height)
+
+        _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, self._kernel, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        regions = []
+        for contour in contours:
+            if cv2.contourArea(contour) < self.min_area:
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            regions.append((x / scale, y / scale, (x + w) / scale, (y + h) / scale))
+
+        if track_boxes:
+            regions.extend(tuple(box[:4]) for box in track_boxes)
+
+        if not regions:
+            return None
+
+        return self._merge_regions(regions, width, height)
+
+    def _merge_regions(self, regions, width, height):
+        """Union all regions into one padded ROI clipped to the frame"""
+        boxes = np.array(regions, dtype=np.float32)
+        x1 = max(0, int(boxes[:, 0].min()) - self.padding)
+        y1 = max(0, int(boxes[:, 1].min()) - self.padding)
+        x2 = min(width, int(np.ceil(boxes[:, 2].max())) + self.padding)
+        y2 = min(height, int(np.ceil(boxes[:, 3].max())) + self.padding)
+
+        if x2 <= x1 or y2 <= y1:
+            return None
+
+        if (x2 - x1) * (y2 - y1) > self.full_frame_ratio * width * height:
+            return (0, 0, width, height)
+
+        return (x1, y1, x2, y2)
@@ -0,0 +1,138 @@
+import cv2
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+
+class LetterboxBuffer:
+    """
+    Preallocated letterbox / normalize stage for detector input
+
+    Frames are resized, padded, converted BGR -> RGB and scaled to 0-1 straight
+    into one reusable float32 NCHW buffer, so steady-state preprocessing does not
+    allocate per frame. Box coordinates are mapped back with a vectorized
+    inverse transform.
+    """
+
+    def __init__(self, imgsz: int = 640, max_batch: int = 1, stride: int = 32,
+                 auto: bool = True, pad_value: int = 114,
+                 allocator: Optional[Callable[[int], np.ndarray]] = None):
+        """
+        Args:
+            imgsz: Target size of the longest side
+            max_batch: Maximum number of frames per batch
+            stride: Model stride; padded shapes are rounded up to a multiple of it
+            auto: Pad only to the stride (rectangular input) instead of a full square.
+                  Must be False for exported models with a fixed input shape.
+            pad_value: Letterbox border intensity
+            allocator: Returns a flat float32 array of n elements (e.g. pinned memory)
+        """
+        self.imgsz = imgsz
+        self.max_batch = max_batch
+        self.stride = stride
+        self.auto = auto
+        self.pad_value = pad_value / 255.0
+
+        allocator = allocator or (lambda n: np.empty(n, dtype=np.float32))
+        self._flat = allocator(max_batch * 3 * imgsz * imgsz)
+        self._resized = {}  # (width, height) -> uint8 resize target
+        self._layout = [None] * max_batch  # per-slot geometry currently in the buffer
+
+    def geometry(self, shape: Tuple[int, ...]) -> Tuple[float, int, int]:
+        """Return (scale, new_width, new_height) for a frame of the given shape"""
+        height, width = shape[:2]
+        scale = min(self.imgsz / height, self.imgsz / width)
+        return scale, int(round(width * scale)), int(round(height * scale))
+
+    def input_shape(self, frames: List[np.ndarray]) -> Tuple[int, int]:
+        """Padded (height, width) shared by all frames of a batch"""
+        if not self.auto:
+            return self.imgsz, self.imgsz
+
+        max_h = max_w = 0
+        for frame in frames:
+            _, new_w, new_h = self.geometry(frame.shape)
+            max_h, max_w = max(max_h, new_h), max(max_w, new_w)
+
+        round_up = lambda v: min(self.imgsz, -(-v // self.stride) * self.stride)
+        return round_up(max_h), round_up(max_w)
+
+    def load(self, frames: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Letterbox frames into the shared buffer
+
+        Args:
+            frames: BGR uint8 frames (at most max_batch)
+
+        Returns:
+            batch: (N, 3, H, W) float32 view into the buffer (valid until the next load)
+            params: (N, 3) array of (scale, pad_x, pad_y) per frame for unletterbox()
+        """
+        if len(frames) > self.max_batch:
+            raise ValueError(f"Batch of {len(frames)} exceeds max_batch={self.max_batch}")
+
+        n = len(frames)
+        height, width = self.input_shape(frames)
+        batch = self._flat[:n * 3 * height * width].reshape(n, 3, height, width)
+        params = np.empty((n, 3), dtype=np.float32)
+
+        for i, frame in enumerate(frames):
+            scale, new_w, new_h = self.geometry(frame.shape)
+            left = (width - new_w) // 2
+            top = (height - new_h) // 2
+
+            # Border only needs repainting when the slot layout changes
+            layout = (height, width, new_w, new_h, left, top)
+            if self._layout[i] != layout:
+                batch[i].fill(self.pad_value)
+                self._layout[i] = layout
+
+            resized = self._resize(frame, new_w, new_h)
+            region = batch[i, :, top:top + new_h, left:left + new_w]
+            for channel in range(3):
+                # BGR -> RGB and 0-255 -> 0-1 in one pass, written in place
+                np.multiply(resized[:, :, 2 - channel], 1.0 / 255.0, out=region[channel],
+                            dtype=np.float32)
+
+            params[i] = (scale, left, top)
+
+        # Invalidate slots whose layout no longer matches the buffer view
+        for i in range(n, self.max_batch):
+            self._layout[i] = None
+
+        return batch, params
+
+    def _resize(self, frame: np.ndarray, new_w: int, new_h: int) -> np.ndarray:
+        """Resize into a cached uint8 buffer for this output size"""
+        if frame.shape[1] == new_w and frame.shape[0] == new_h:
+            return frame
+
+        target = self._resized.get((new_w, new_h))
+        if target is None:
+            # Variable-size inputs (e.g. motion-gate crops) must not grow the cache forever
+            if len(self._resized) >= 8:
+                self._resized.clear()
+            target = np.empty((new_h, new_w, 3), dtype=np.uint8)
+            self._resized[(new_w, new_h)] = target
+
+        cv2.resize(frame, (new_w, new_h), dst=target, interpolation=cv2.INTER_LINEAR)
+        return target
+
+def unletterbox(boxes: np.ndarray, params: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Map (N, 4) xyxy boxes from letterboxed input back to original frame coordinates
+
+    Args:
+        boxes: Boxes in model input space (modified in place)
+        params: (scale, pad_x, pad_y) returned by LetterboxBuffer.load for the frame
+        shape: Original frame shape
+
+    Returns:
+        The same array, in original frame coordinates
+    """
+    scale, pad_x, pad_y = params
+    xs, ys = boxes[:, 0::2], boxes[:, 1::2]
+    xs -= pad_x
+    ys -= pad_y
+    boxes /= scale
+    np.clip(xs, 0, shape[1], out=xs)
+    np.clip(ys, 0, shape[0], out=ys)
+    return boxes
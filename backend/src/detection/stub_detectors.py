@@ -0,0 +1,277 @@
+import json
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from src.behavior.zone_checker import ZoneChecker
+from src.detection.base import Detector
+from src.detection.preprocess import LetterboxBuffer
+from src.utils.boxes import Detections
+
+# Synthetic target behaviours
+PATTERNS = ('cruise', 'fast', 'hover', 'zone_entry')
+DEFAULT_PATTERN_MIX = {'cruise': 0.5, 'fast': 0.2, 'hover': 0.2, 'zone_entry': 0.1}
+
+def save_detections(path: str, frames: Sequence[Detections]) -> None:
+    """
+    Save per-frame detections for ReplayDetector
+
+    .npz stores all boxes in one (M, 6) float32 array plus (F + 1) frame
+    offsets; .ndjson writes one {"frame": i, "detections": [[...], ...]} line
+    per frame (readable, diffable, larger).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.npz':
+        lengths = np.array([len(frame) for frame in frames], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        data = Detections.concatenate(list(frames)).data
+        np.savez_compressed(path, offsets=offsets, detections=data)
+    else:
+        with open(path, 'w') as f:
+            for i, frame in enumerate(frames):
+                f.write(json.dumps({'frame': i, 'detections': frame.data.tolist()}) + '\n')
+
+def load_detections(path: str) -> List[Detections]:
+    """
+    Load per-frame detections written by save_detections (.npz or .ndjson),
+    or the raw detections of a PipelineRecorder directory
+    """
+    path = Path(path)
+    if path.is_dir():
+        from src.utils.recording import RecordingReader
+        return RecordingReader(path).detections()
+    if path.suffix == '.npz':
+        with np.load(path) as archive:
+            offsets, data = archive['offsets'], archive['detections']
+        return [Detections(data[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+
+    by_frame: Dict[int, Detections] = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                by_frame[int(record['frame'])] = Detections(record['detections'])
+    # Frames without a line had no detections
+    count = max(by_frame) + 1 if by_frame else 0
+    return [by_frame.get(i, Detections()) for i in range(count)]
+
+class ReplayDetector(Detector):
+    """
+    Feeds detections recorded from an earlier run, one frame per call
+
+    The frame passed in is ignored, so tracking / behavior / alerting can be
+    re-run on recorded footage at thousands of frames per second.
+    """
+
+    def __init__(self, path: str, loop: bool = False):
+        """
+        Args:
+            path: File written by save_detections (.npz or .ndjson) or a recording directory
+            loop: Start over at the end instead of returning empty detections
+        """
+        self.frames = load_detections(path)
+        self.loop = loop
+        self.index = 0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def exhausted(self) -> bool:
+        return not self.loop and self.index >= len(self.frames)
+
+    def detect_array(self, frame: Optional[np.ndarray] = None) -> Detections:
+        if self.loop and self.frames:
+            self.index %= len(self.frames)
+        if self.index >= len(self.frames):
+            return Detections()
+        detections = self.frames[self.index]
+        self.index += 1
+        # Callers may offset() in place, so never hand out the stored array
+        return Detections(detections.data.copy())
+
+    def reset(self):
+        self.index = 0
+
+class RecordingDetector(Detector):
+    """
+    Wraps a detector and keeps a copy of everything it returns, to save with
+    save_detections and replay later. Record without a motion gate: gated
+    frames are detected on crops, whose boxes are in crop coordinates.
+    """
+
+    def __init__(self, detector: Detector):
+        self.detector = detector
+        self.frames: List[Detections] = []
+
+    def detect_batch_arrays(self, frames: List[np.ndarray]) -> List[Detections]:
+        results = self.detector.detect_batch_arrays(frames)
+        self.frames.extend(Detections(result.data.copy()) for result in results)
+        return results
+
+    def save(self, path: str) -> None:
+        save_detections(path, self.frames)
+
+class FixedCostDetector(Detector):
+    """
+    Stands in for a batched model: each call letterboxes the frames like
+    DroneDetector, then sleeps setup_seconds + per_frame_seconds * frames
+    (a GPU-like cost where the fixed part amortizes over the batch) and
+    returns no detections. For load tests of the batching around a detector.
+    """
+
+    def __init__(self, setup_seconds: float = 0.008, per_frame_seconds: float = 0.002,
+                 imgsz: int = 640, max_batch: int = 32):
+        self.setup_seconds = setup_seconds
+        self.per_frame_seconds = per_frame_seconds
+        self.input_buffer = LetterboxBuffer(imgsz, max_batch)
+        self.calls = 0
+
+    def detect_batch_arrays(self, frames: List[np.ndarray]) -> List[Detections]:
+        self.input_buffer.load(frames)
+        time.sleep(self.setup_seconds + self.per_frame_seconds * len(frames))
+        self.calls += 1
+        return [Detections() for _ in frames]
+
+def default_zone(width: int, height: int) -> List[tuple]:
+    """Restricted zone covering the centre quarter of a frame"""
+    return [(width // 4, height // 4), (3 * width // 4, height // 4),
+            (3 * width // 4, 3 * height // 4), (width // 4, 3 * height // 4)]
+
+class SyntheticDetector(Detector):
+    """
+    Generates detections for N simulated targets, one frame per call
+
+    Each target follows one of PATTERNS:
+        cruise: straight flight below the speed threshold, bouncing off the edges
+        fast: straight flight well above the speed threshold
+        hover: stays put, jittering by a fraction of a pixel
+        zone_entry: starts outside the restricted zone and flies into it
+    Runs are deterministic for a given seed. Ground-truth target ids of the
+    last returned detections are in `last_ids` (aligned with its rows).
+    """
+
+    def __init__(self, targets: int = 10, width: int = 1280, height: int = 720,
+                 box_size: int = 24, patterns: Optional[Dict[str, float]] = None,
+                 cruise_speed: float = 1.0, fast_speed: float = 4.0,
+                 zone: Optional[List[tuple]] = None, noise: float = 0.0,
+                 miss_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+            targets: Number of simulated targets
+            width, height: Frame size the boxes live in
+            box_size: Side of each (square) target box in pixels
+            patterns: Share of targets per pattern (normalized), default DEFAULT_PATTERN_MIX
+            cruise_speed: Cruise / zone-entry speed in pixels per frame
+            fast_speed: Fast-target speed in pixels per frame
+            zone: Polygon zone_entry targets head for (default: centre quarter)
+            noise: Std-dev of per-frame box jitter in pixels (detector noise)
+            miss_rate: Probability that a target is not detected on a frame
+            seed: Random seed
+        """
+        patterns = patterns or DEFAULT_PATTERN_MIX
+        unknown = set(patterns) - set(PATTERNS)
+        if unknown:
+            raise ValueError(f"Unknown patterns {sorted(unknown)}, expected some of {PATTERNS}")
+
+        self.width = width
+        self.height = height
+        self.half = box_size / 2
+        self.zone = zone or default_zone(width, height)
+        self.noise = noise
+        self.miss_rate = miss_rate
+        self.rng = np.random.default_rng(seed)
+        self.frame_index = 0
+
+        names = list(patterns)
+        weights = np.array([patterns[name] for name in names], dtype=np.float64)
+        self.kinds = self.rng.choice(len(names), size=targets, p=weights / weights.sum())
+        self.pattern_names = names
+        self.ids = np.arange(targets)
+        self.last_ids = np.empty(0, dtype=np.int64)
+
+        self._limits = np.array([width - self.half, height - self.half])
+        self.positions = self.rng.uniform([self.half, self.half], self._limits, size=(targets, 2))
+        angle = self.rng.uniform(0, 2 * np.pi, targets)
+        direction = np.stack([np.cos(angle), np.sin(angle)], axis=1)
+        speeds = np.full(targets, cruise_speed)
+
+        self.hovering = self._is('hover')
+        speeds[self._is('fast')] = fast_speed
+        speeds[self.hovering] = 0.0
+        self.anchors = self.positions.copy()
+
+        entering = self._is('zone_entry')
+        if entering.any():
+            # Start on the frame border, aimed at the zone centre
+            centre = np.mean(np.asarray(self.zone, dtype=np.float64), axis=0)
+            side = self.rng.integers(0, 4, entering.sum())
+            starts = self.positions[entering]
+            starts[side == 0, 0] = self.half
+            starts[side == 1, 0] = self._limits[0]
+            starts[side == 2, 1] = self.half
+            starts[side == 3, 1] = self._limits[1]
+            self.positions[entering] = starts
+            heading = centre - starts
+            direction[entering] = heading / np.maximum(np.linalg.norm(heading, axis=1, keepdims=True), 1e-6)
+
+        self.velocity = direction * speeds[:, None]
+
+    def _is(self, pattern: str) -> np.ndarray:
+        if pattern not in self.pattern_names:
+            return np.zeros(len(self.kinds), dtype=bool)
+        return self.kinds == self.pattern_names.index(pattern)
+
+    def current_boxes(self) -> np.ndarray:
+        """(N, 4) xyxy boxes of all targets for the frame about to be returned"""
+        return np.concatenate([self.positions - self.half, self.positions + self.half], axis=1)
+
+    def labels(self) -> np.ndarray:
+        """
+        Ground truth for the frame about to be returned: (N, 6) rows of
+        target_id, x1, y1, x2, y2, suspicious (see src.tracking.evaluation).
+        Fast and hovering targets are suspicious, as is any target inside the zone.
+        """
+        labels = np.empty((len(self.ids), 6), dtype=np.float32)
+        labels[:, 0] = self.ids
+        labels[:, 1:5] = self.current_boxes()
+        zone = ZoneChecker([self.zone])
+        in_zone = np.array([zone.check_position(x, y)[0] for x, y in self.positions.tolist()], dtype=bool)
+        labels[:, 5] = self._is('fast') | self.hovering | in_zone
+        return labels
+
+    def render(self, frame: np.ndarray) -> np.ndarray:
+        """Draw the targets of the upcoming frame (filled squares) into frame"""
+        for x1, y1, x2, y2 in self.current_boxes().astype(np.int32).tolist():
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (30, 30, 30), -1)
+        return frame
+
+    def detect_array(self, frame: Optional[np.ndarray] = None) -> Detections:
+        boxes = self.current_boxes()
+        if self.noise:
+            boxes = boxes + self.rng.normal(0, self.noise, boxes.shape)
+        keep = self.rng.random(len(boxes)) >= self.miss_rate if self.miss_rate else slice(None)
+
+        data = np.empty((len(boxes), 6), dtype=np.float32)
+        data[:, :4] = boxes
+        data[:, 4] = 0.9
+        data[:, 5] = 0
+        self.last_ids = self.ids[keep]
+        detections = Detections(data[keep])
+
+        self._advance()
+        return detections
+
+    def _advance(self):
+        """Move every target one frame forward"""
+        self.frame_index += 1
+        self.positions += self.velocity
+        bounced = (self.positions < self.half) | (self.positions > self._limits)
+        self.velocity[bounced] *= -1
+        np.clip(self.positions, self.half, self._limits, out=self.positions)
+
+        if self.hovering.any():
+            jitter = np.clip(self.rng.normal(0, 0.3, (int(self.hovering.sum()), 2)), -1.5, 1.5)
+            self.positions[self.hovering] = self.anchors[self.hovering] + jitter
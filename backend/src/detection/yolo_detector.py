@@ -1,25 +1,64 @@
 from ultralytics import YOLO
 import torch
 import cv2
+import threading
+import time
 import numpy as np
 from pathlib import Path
 from typing import List, Tuple, Optional
 import yaml
+from src.detection.base import Detector
+from src.detection.preprocess import LetterboxBuffer, unletterbox
+from src.utils.boxes import Detections
 
-class DroneDetector:
+# Inference backends -> ultralytics export format (None = native PyTorch weights)
+BACKEND_FORMATS = {
+    'pytorch': None,
+    'onnx': 'onnx',
+    'torchscript': 'torchscript',
+    'openvino': 'openvino',
+}
+
+# Suffixes of already-exported weights, so they are loaded as-is instead of re-exported
+EXPORTED_SUFFIXES = ('.onnx', '.torchscript', '_openvino_model')
+
+# Marks exports with a dynamic batch axis; other exported models are run one frame per call
+DYNAMIC_TAG = '_dynamic'
+
+class DroneDetector(Detector):
     """YOLOv8-based drone detector"""
     
-    def __init__(self, model_path: str, conf_threshold: float = 0.5, device: str = 'auto'):
+    def __init__(self, model_path: str, conf_threshold: float = 0.5, device: str = 'auto',
+                 backend: str = 'pytorch', imgsz: int = 640, int8: bool = False,
+                 preallocated: bool = True, max_batch: int = 1):
         """
         Initialize drone detector
         
         Args:
-            model_path: Path to YOLO model weights
+            model_path: Path to YOLO model weights (.pt, or an already exported model)
             conf_threshold: Confidence threshold for detections
             device: Device to run inference on ('auto', 'cpu', 'cuda:0')
+            backend: Inference backend ('pytorch', 'onnx', 'torchscript', 'openvino')
+            imgsz: Inference image size (exported models are fixed to this size)
+            int8: Use INT8-quantized weights (onnx and openvino backends only)
+            preallocated: Letterbox frames into a reusable input buffer instead of
+                          the library's per-call preprocessing
+            max_batch: Largest batch passed to detect_batch (sizes the input buffer;
+                       above 1, ONNX / OpenVINO exports get a dynamic batch axis)
         """
+        if backend not in BACKEND_FORMATS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {list(BACKEND_FORMATS)}")
+        if int8 and backend not in ('onnx', 'openvino'):
+            raise ValueError(f"INT8 weights are not supported for the '{backend}' backend")
+
         self.model_path = model_path
         self.conf_threshold = conf_threshold
+        self.backend = backend
+        self.imgsz = imgsz
+        self.int8 = int8
+        self.max_batch = max_batch
+        # Frames per model call the loaded weights accept (None: any)
+        self.model_batch = None
         
         # Auto-detect device
         if device == 'auto':
@@ -27,49 +66,120 @@ class DroneDetector:
         else:
             self.device = device
         
+        # Preallocated input buffer; exported models need the fixed square input
+        self.input_buffer = None
+        if preallocated:
+            self.input_buffer = LetterboxBuffer(imgsz, max_batch, auto=backend == 'pytorch',
+                                                allocator=self._buffer_allocator())
+        self.preprocess_time = 0.0
+        self.frames_preprocessed = 0
+        # The input buffer and model are shared when several pipelines use one detector
+        self._lock = threading.Lock()
+        
         # Load model
         self.model = self._load_model()
         
         print(f"✓ DroneDetector initialized")
         print(f"  Model: {model_path}")
+        print(f"  Backend: {backend}{' (int8)' if int8 else ''}")
         print(f"  Device: {self.device}")
         print(f"  Confidence threshold: {conf_threshold}")
     
     def _load_model(self) -> YOLO:
-        """Load YOLO model"""
+        """Load YOLO model for the configured backend and warm it up"""
         try:
-            model = YOLO(self.model_path)
-            # Warm up model
-            dummy_input = torch.zeros(1, 3, 640, 640)
-            if self.device.startswith('cuda'):
-                dummy_input = dummy_input.cuda()
-            return model
+            weights = self._resolve_weights()
+            model = YOLO(weights, task='detect')
+            if BACKEND_FORMATS[self.backend] is not None and DYNAMIC_TAG not in Path(weights).name:
+                # Static-shape export (e.g. TorchScript traced at batch 1)
+                self.model_batch = 1
         except Exception as e:
             print(f"Error loading model: {e}")
             print("Falling back to pre-trained YOLOv8s...")
-            return YOLO('yolov8s.pt')
+            model = YOLO('yolov8s.pt')
+
+        self._warm_up(model)
+        return model
+
+    def _buffer_allocator(self):
+        """Allocate the host input buffer in pinned memory when feeding a GPU"""
+        if self.device.startswith('cuda'):
+            return lambda n: torch.empty(n, dtype=torch.float32).pin_memory().numpy()
+        return None
+
+    def _resolve_weights(self) -> str:
+        """Return the weights path for the backend, exporting the .pt model if needed"""
+        if BACKEND_FORMATS[self.backend] is None:
+            return self.model_path
+
+        if self.model_path.rstrip('/').endswith(EXPORTED_SUFFIXES):
+            if self.backend == 'onnx' and self.int8 and not self.model_path.endswith('.int8.onnx'):
+                return quantize_onnx(self.model_path)
+            return self.model_path
+
+        return export_model(self.model_path, self.backend, imgsz=self.imgsz, int8=self.int8,
+                            batch=self.max_batch)
+
+    def _warm_up(self, model: YOLO) -> None:
+        """Run one real inference pass so the first live frame doesn't pay for lazy init"""
+        try:
+            dummy_frame = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+            inputs = dummy_frame
+            if self.input_buffer is not None:
+                batch, _ = self.input_buffer.load([dummy_frame])
+                inputs = torch.from_numpy(batch).to(self.device)
+            model(inputs, conf=self.conf_threshold, imgsz=self.imgsz, verbose=False)
+        except Exception as e:
+            print(f"Warning: model warm-up failed: {e}")
     
-    def detect(self, frame: np.ndarray) -> List[Tuple[float, float, float, float, float]]:
+    def detect_batch_arrays(self, frames: List[np.ndarray]) -> List[Detections]:
         """
-        Detect drones in frame
-        
-        Args:
-            frame: Input frame (BGR format)
-        
+        Detect drones in a batch of frames with a single model call
+
         Returns:
-            List of detections: [(x1, y1, x2, y2, confidence), ...]
+            Per-frame Detections
         """
-        results = self.model(frame, conf=self.conf_threshold, verbose=False)
-        
-        detections = []
-        if len(results[0].boxes) > 0:
-            boxes = results[0].boxes.xyxy.cpu().numpy()  # x1, y1, x2, y2
-            confs = results[0].boxes.conf.cpu().numpy()
-            
-            for box, conf in zip(boxes, confs):
-                detections.append((*box, conf))
-        
-        return detections
+        with self._lock:
+            return self._detect_batch_arrays(frames)
+
+    def _detect_batch_arrays(self, frames: List[np.ndarray]) -> List[Detections]:
+        params = None
+        if self.input_buffer is None:
+            results = self._run_model(frames)
+        else:
+            start = time.perf_counter()
+            batch, params = self.input_buffer.load(frames)
+            inputs = torch.from_numpy(batch)  # shares memory with the buffer
+            if self.device.startswith('cuda'):
+                inputs = inputs.to(self.device, non_blocking=True)
+            self.preprocess_time += time.perf_counter() - start
+            self.frames_preprocessed += len(frames)
+
+            results = self._run_model(inputs)
+
+        batch_detections = []
+        for i, result in enumerate(results):
+            if len(result.boxes) == 0:
+                batch_detections.append(Detections())
+                continue
+
+            # boxes.data is (N, 6): x1, y1, x2, y2, conf, cls
+            data = result.boxes.data.cpu().numpy().astype(np.float32)
+            if params is not None:
+                unletterbox(data[:, :4], params[i], frames[i].shape)
+            batch_detections.append(Detections(data))
+
+        return batch_detections
+
+    def _run_model(self, inputs) -> list:
+        """One model call per batch, or per frame for static-shape exports"""
+        if self.model_batch is None or len(inputs) <= self.model_batch:
+            return self.model(inputs, conf=self.conf_threshold, imgsz=self.imgsz, verbose=False)
+        results = []
+        for i in range(0, len(inputs), self.model_batch):
+            results.extend(self.model(inputs[i:i + self.model_batch], conf=self.conf_threshold,
+                                      imgsz=self.imgsz, verbose=False))
+        return results
     
     def detect_and_visualize(self, frame: np.ndarray) -> Tuple[List, np.ndarray]:
         """
@@ -104,6 +214,55 @@ def load_model(model_path: str, device: str = 'auto') -> YOLO:
         print("Using pre-trained YOLOv8s instead...")
         return YOLO('yolov8s.pt')
 
+def export_model(model_path: str, backend: str, imgsz: int = 640, int8: bool = False,
+                 batch: int = 1) -> str:
+    """
+    Export PyTorch weights to an optimized inference backend
+
+    Exports are cached next to the source weights and reused on later runs.
+    For batch > 1, ONNX and OpenVINO models are exported with a dynamic batch
+    axis (named with DYNAMIC_TAG, so an older fixed batch-1 export is not
+    picked up); TorchScript stays traced at batch 1 and is run frame by frame.
+
+    Returns:
+        Path to the exported model
+    """
+    export_format = BACKEND_FORMATS[backend]
+    stem = Path(model_path).with_suffix('')
+    dynamic = batch > 1 and backend != 'torchscript'
+    tag = DYNAMIC_TAG if dynamic else ''
+
+    if backend == 'onnx':
+        exported = f"{stem}{tag}.onnx"
+    elif backend == 'torchscript':
+        exported = f"{stem}.torchscript"
+    else:
+        exported = f"{stem}{tag}{'_int8' if int8 else ''}_openvino_model"
+
+    if not Path(exported).exists():
+        print(f"Exporting {model_path} to {backend}{' (dynamic batch)' if dynamic else ''}...")
+        # OpenVINO quantizes during export; ONNX is quantized separately below
+        output = YOLO(model_path).export(format=export_format, imgsz=imgsz, dynamic=dynamic,
+                                         batch=batch if dynamic else 1,
+                                         int8=int8 and backend == 'openvino')
+        if Path(output) != Path(exported):
+            Path(output).rename(exported)
+
+    if backend == 'onnx' and int8:
+        exported = quantize_onnx(exported)
+
+    return str(exported)
+
+def quantize_onnx(onnx_path: str) -> str:
+    """Dynamically quantize ONNX weights to INT8 for CPU inference"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized = str(Path(onnx_path).with_suffix('')) + '.int8.onnx'
+    if not Path(quantized).exists():
+        print(f"Quantizing {onnx_path} to INT8...")
+        quantize_dynamic(onnx_path, quantized, weight_type=QuantType.QUInt8)
+    return quantized
+
 def prepare_dataset(dataset_path: str, output_format: str = 'yolo') -> None:
     """Prepare dataset for training (placeholder)"""
     print(f"Dataset preparation for {dataset_path} -> {output_format}")
@@ -0,0 +1,271 @@
+import asyncio
+import json
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from src.db.mongo import AsyncCollection
+from src.llm.cache import ResponseCache, cache_key
+from src.llm.client import LLMClient, LLMError, LLMTimeout
+from src.llm.risk_scorer import RiskScorer
+from src.utils.metrics import METRICS
+
+RISK_SCORE = re.compile(r"Risk Score:\s*([0-9]*\.?[0-9]+)")
+
+# Appended to the caller's prompt when several records share one LLM call
+BATCH_INSTRUCTIONS = (
+    "Assess each record below independently. Instead of the two-line format, reply ONLY with a JSON "
+    "array holding one object per record, in any order:\n"
+    '{"id": <record number>, "analysis": "<one sentence summary>", "risk_score": <0.0 - 1.0>}'
+)
+
+def parse_records(body: bytes, ndjson: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    RF records from a JSON array or NDJSON body (one object per line);
+    ndjson=None sniffs the format. Raises ValueError on malformed input.
+    """
+    text = body.decode('utf-8')
+    if ndjson is None:
+        ndjson = not text.lstrip().startswith('[')
+
+    if ndjson:
+        records = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    raise ValueError(f"Line {number}: {e}")
+    else:
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of records")
+
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f"Record {index} is not a JSON object")
+    return records
+
+def single_prompt(prompt: str, record: Dict[str, Any]) -> str:
+    """Same prompt /analyze-json sends for one record"""
+    return f"{prompt}\n\nData:\n{record}"
+
+def batch_prompt(prompt: str, batch: Sequence[Tuple[int, Dict[str, Any]]]) -> str:
+    lines = [f"Record {index}: {json.dumps(record, separators=(',', ':'), default=str)}" for index, record in batch]
+    return f"{prompt}\n\n{BATCH_INSTRUCTIONS}\n\n" + "\n".join(lines)
+
+def parse_batch_reply(text: str, ids: Set[int]) -> Dict[int, Tuple[str, float]]:
+    """{record id: (analysis, risk_score)} for the well-formed entries of a batched reply"""
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end < start:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+
+    results = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            record_id = int(item['id'])
+            risk = min(max(float(item['risk_score']), 0.0), 1.0)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if record_id in ids:
+            results[record_id] = (str(item.get('analysis', '')).strip(), risk)
+    return results
+
+def parse_risk_score(text: str) -> float:
+    match = RISK_SCORE.search(text)
+    return float(match.group(1)) if match else 0.0
+
+class BulkAnalyzer:
+    """
+    Risk analysis of many RF records in one request
+
+    Records the local scorer answers or the cache holds never reach the LLM.
+    The rest are packed batch_size to a prompt asking for a JSON array of
+    per-record results; records missing from a batched reply fall back to a
+    single-record call. Results are yielded as each batch finishes, and the
+    batch's documents are written to analysis_logs with one insert_many.
+    """
+
+    def __init__(self, llm: Optional[LLMClient], model: str, cache: Optional[ResponseCache] = None,
+                 scorer: Optional[RiskScorer] = None, collection: Optional[AsyncCollection] = None,
+                 batch_size: int = 10, digits: int = 3):
+        """
+        Args:
+            llm: Client for escalated records (None: they fail with LLM_UNAVAILABLE)
+            model: Model name recorded with LLM answers and used in cache keys
+            cache: Optional response cache shared with /analyze-json
+            scorer: Optional local fast path
+            collection: analysis_logs, or None to skip persistence
+            batch_size: Records per LLM prompt
+            digits: Cache key rounding (LLM_CACHE_DIGITS)
+        """
+        self.llm = llm
+        self.model = model
+        self.cache = cache
+        self.scorer = scorer
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.digits = digits
+
+        self.bulk_id = str(uuid.uuid4())
+        self.llm_calls = 0
+        self.llm_records = 0
+        self.failed = 0
+        self.usage: Dict[str, int] = {}
+        self.answered: Dict[str, int] = {}
+
+    def _result(self, index: int, text: str, risk: float, answered_by: str, cached: bool = False) -> Dict:
+        self.answered[answered_by] = self.answered.get(answered_by, 0) + 1
+        METRICS.inc('bulk_records', answered_by=answered_by)
+        return {'index': index, 'success': True, 'request_id': str(uuid.uuid4()), 'answered_by': answered_by,
+                'cached': cached, 'risk_score': risk, 'analysis': text, 'error': None}
+
+    def _failure(self, index: int, code: str, message: str) -> Dict:
+        self.failed += 1
+        METRICS.inc('bulk_records', answered_by='failed')
+        return {'index': index, 'success': False, 'error': {'code': code, 'message': message}}
+
+    def _count_usage(self, usage: Dict, prompt: str, reply: str):
+        # Backends without usage metadata: about 4 characters per token
+        self.usage['prompt_tokens'] = self.usage.get('prompt_tokens', 0) + usage.get('prompt_tokens', len(prompt) // 4)
+        self.usage['output_tokens'] = self.usage.get('output_tokens', 0) + usage.get('output_tokens', len(reply) // 4)
+
+    async def _generate(self, prompt: str) -> str:
+        usage: Dict = {}
+        self.llm_calls += 1
+        reply = await self.llm.generate(prompt, usage=usage)
+        self._count_usage(usage, prompt, reply)
+        return reply
+
+    async def _remember(self, prompt: str, record: Dict, text: str, latency: float):
+        if self.cache is not None:
+            await self.cache.put(cache_key(prompt, record, self.model, self.digits), text, latency, self.model)
+
+    async def _analyze_one(self, index: int, record: Dict, prompt: str) -> Dict:
+        start = time.perf_counter()
+        try:
+            text = await self._generate(single_prompt(prompt, record))
+        except LLMTimeout as e:
+            return self._failure(index, 'LLM_TIMEOUT', str(e))
+        except LLMError as e:
+            return self._failure(index, 'GEMINI_ANALYSIS_FAILED', str(e))
+        await self._remember(prompt, record, text, time.perf_counter() - start)
+        return self._result(index, text, parse_risk_score(text), 'llm')
+
+    async def _analyze_batch(self, batch: List[Tuple[int, Dict]], prompt: str) -> List[Dict]:
+        self.llm_records += len(batch)
+        if len(batch) == 1:
+            return [await self._analyze_one(*batch[0], prompt)]
+
+        start = time.perf_counter()
+        try:
+            reply = await self._generate(batch_prompt(prompt, batch))
+        except LLMTimeout as e:
+            return [self._failure(index, 'LLM_TIMEOUT', str(e)) for index, _ in batch]
+        except LLMError as e:
+            return [self._failure(index, 'GEMINI_ANALYSIS_FAILED', str(e)) for index, _ in batch]
+        latency = (time.perf_counter() - start) / len(batch)
+
+        parsed = parse_batch_reply(reply, {index for index, _ in batch})
+        results, missing = [], []
+        for index, record in batch:
+            if index not in parsed:
+                missing.append((index, record))
+                continue
+            analysis, risk = parsed[index]
+            text = f"Analysis: {analysis}\nRisk Score: {risk:.2f}"
+            await self._remember(prompt, record, text, latency)
+            results.append(self._result(index, text, risk, 'llm'))
+        if missing:
+            results += await asyncio.gather(*(self._analyze_one(index, record, prompt) for index, record in missing))
+        return results
+
+    async def _store(self, results: List[Dict], records: Sequence[Dict], prompt: str):
+        if self.collection is None:
+            return
+        now = datetime.utcnow()
+        documents = [{
+            'success': True,
+            'status': 200,
+            'model': self.model if result['answered_by'] == 'llm' else 'local-risk-scorer',
+            'timestamp': now,
+            'request_id': result['request_id'],
+            'bulk_id': self.bulk_id,
+            'cached': result['cached'],
+            'answered_by': result['answered_by'],
+            'data': {
+                'input': {'prompt': prompt, 'rf_data': records[result['index']]},
+                'output': {'analysis': result['analysis'], 'risk_score': result['risk_score']},
+            },
+            'error': None,
+            'risk_score': result['risk_score'],
+        } for result in results if result['success']]
+        if documents:
+            try:
+                await self.collection.insert_many(documents)
+            except Exception as e:
+                print(f"Error saving bulk analyses to MongoDB: {e}")
+
+    async def run(self, records: Sequence[Dict[str, Any]], prompt: str) -> AsyncIterator[Dict]:
+        """Yields one result per record (with its index) as it finishes, then a {'summary': ...}"""
+        start = time.perf_counter()
+
+        immediate, pending = [], []
+        for index, record in enumerate(records):
+            local = self.scorer.assess(record) if self.scorer is not None else None
+            if local is not None:
+                risk, answered_by, text = local
+                immediate.append(self._result(index, text, risk, answered_by))
+                continue
+            if self.cache is not None:
+                text = await self.cache.lookup(cache_key(prompt, record, self.model, self.digits))
+                if text is not None:
+                    immediate.append(self._result(index, text, parse_risk_score(text), 'llm', cached=True))
+                    continue
+            if self.llm is None:
+                immediate.append(self._failure(index, 'LLM_UNAVAILABLE', "LLM Client not initialized"))
+                continue
+            pending.append((index, record))
+
+        await self._store(immediate, records, prompt)
+        for result in immediate:
+            yield result
+
+        tasks = [asyncio.ensure_future(self._analyze_batch(pending[i:i + self.batch_size], prompt))
+                 for i in range(0, len(pending), self.batch_size)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                results = await finished
+                await self._store(results, records, prompt)
+                for result in results:
+                    yield result
+        finally:
+            # Client went away: stop the remaining LLM calls
+            for task in tasks:
+                task.cancel()
+
+        yield {'summary': self.get_statistics(len(records), time.perf_counter() - start)}
+
+    def get_statistics(self, records: int, elapsed: float) -> Dict:
+        tokens = self.usage.get('prompt_tokens', 0) + self.usage.get('output_tokens', 0)
+        return {
+            'bulk_id': self.bulk_id,
+            'records': records,
+            'failed': self.failed,
+            'answered_by': self.answered,
+            'elapsed_seconds': round(elapsed, 3),
+            'records_per_second': round(records / elapsed, 1) if elapsed > 0 else None,
+            'llm_calls': self.llm_calls,
+            'llm_records': self.llm_records,
+            'prompt_tokens': self.usage.get('prompt_tokens', 0),
+            'output_tokens': self.usage.get('output_tokens', 0),
+            'tokens_per_record': round(tokens / self.llm_records, 1) if self.llm_records else None,
+        }
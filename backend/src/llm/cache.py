@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.db.mongo import AsyncCollection
+from src.utils.metrics import METRICS
+
+CACHE_COLLECTION = "llm_cache"
+
+def canonicalize(value: Any, digits: int = 3) -> Any:
+    """
+    JSON-able copy of value with floats rounded to `digits` significant
+    digits, so near-identical RF feature vectors map to the same key
+    (dict keys are sorted when the result is serialized)
+    """
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(f"{value:.{digits}g}")
+    if isinstance(value, dict):
+        return {str(key): canonicalize(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(item, digits) for item in value]
+    return str(value)
+
+def cache_key(prompt: str, data: Any, model: str, digits: int = 3) -> str:
+    """Stable hash of (model, normalized prompt, canonicalized data)"""
+    payload = json.dumps([model, " ".join(prompt.split()), canonicalize(data, digits)],
+                         sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResponseCache:
+    """
+    LLM response cache: in-memory LRU in front of a MongoDB collection
+
+    Entries expire after ttl seconds (a TTL index removes them from MongoDB);
+    the LRU holds at most max_entries and the collection at most
+    max_documents (oldest trimmed). Concurrent misses for the same key share
+    one LLM call. Hit rate and the latency saved (the original call's latency
+    per hit) are tracked.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, collection: Optional[AsyncCollection] = None,
+                 max_documents: int = 100000, trim_every: int = 100):
+        """
+        Args:
+            max_entries: LRU size
+            ttl: Seconds an entry stays valid
+            collection: Optional persistent tier shared across workers and restarts
+            max_documents: Size cap of the persistent tier
+            trim_every: Check the persistent tier's size every this many writes
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.collection = collection
+        self.max_documents = max_documents
+        self.trim_every = trim_every
+
+        self._entries: 'OrderedDict[str, Tuple[str, float, float]]' = OrderedDict()  # key -> (text, expires, latency)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._writes = 0
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index([('expires_at', 1)], expireAfterSeconds=0)
+            await self.collection.create_index([('created_at', -1)])
+
+    def _remember(self, key: str, text: str, expires: float, latency: float):
+        self._entries[key] = (text, expires, latency)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(text, original latency) of a live entry, or None"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0], entry[2]
+            del self._entries[key]
+
+        if self.collection is not None:
+            try:
+                document = await self.collection.find_one({'_id': key, 'expires_at': {'$gt': datetime.utcnow()}})
+            except Exception as e:
+                print(f"Error reading LLM cache: {e}")
+                document = None
+            if document is not None:
+                expires = now + (document['expires_at'] - datetime.utcnow()).total_seconds()
+                self._remember(key, document['text'], expires, document['latency'])
+                self.persistent_hits += 1
+                return document['text'], document['latency']
+        return None
+
+    async def lookup(self, key: str) -> Optional[str]:
+        """Cached text for key, counted as a hit or miss (callers computing misses themselves)"""
+        hit = await self.get(key)
+        if hit is None:
+            self.misses += 1
+            METRICS.inc('llm_cache', result='miss')
+            return None
+        self.saved_seconds += hit[1]
+        METRICS.inc('llm_cache', result='hit')
+        return hit[0]
+
+    async def put(self, key: str, text: str, latency: float, model: Optional[str] = None):
+        self._remember(key, text, time.time() + self.ttl, latency)
+        if self.collection is None:
+            return
+        created = datetime.utcnow()
+        try:
+            await self.collection.replace_one({'_id': key}, {
+                'text': text, 'latency': latency, 'model': model,
+                'created_at': created, 'expires_at': created + timedelta(seconds=self.ttl),
+            }, upsert=True)
+            self._writes += 1
+            if self._writes % self.trim_every == 0:
+                await self._trim()
+        except Exception as e:
+            print(f"Error writing LLM cache: {e}")
+
+    async def _trim(self):
+        """Drop the oldest persistent entries beyond max_documents"""
+        beyond = await self.collection.find({}, {'created_at': 1}, sort=[('created_at', -1)],
+                                            skip=self.max_documents, limit=1)
+        if beyond:
+            await self.collection.delete_many({'created_at': {'$lte': beyond[0]['created_at']}})
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]],
+                             model: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Cached text for key, or the result of compute() (stored). Callers
+        missing on a key that is already being computed wait for that call.
+
+        Returns:
+            (text, cached)
+        """
+        hit = await self.get(key)
+        if hit is not None:
+            self.saved_seconds += hit[1]
+            METRICS.inc('llm_cache', result='hit')
+            return hit[0], True
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            text, latency = await asyncio.shield(pending)
+            self.memory_hits += 1
+            self.saved_seconds += latency
+            METRICS.inc('llm_cache', result='hit')
+            return text, True
+
+        self.misses += 1
+        METRICS.inc('llm_cache', result='miss')
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            start = time.perf_counter()
+            text = await compute()
+            latency = time.perf_counter() - start
+            await self.put(key, text, latency, model)
+            future.set_result((text, latency))
+            return text, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an error nobody else awaited is not logged as unhandled
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    def get_statistics(self) -> Dict:
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': hits,
+            'memory_hits': self.memory_hits,
+            'persistent_hits': self.persistent_hits,
+            'misses': self.misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else None,
+            'saved_latency_seconds': round(self.saved_seconds, 3),
+        }
@@ -0,0 +1,199 @@
+import asyncio
+import random
+from typing import Dict, Optional
+
+from src.utils.metrics import METRICS
+
+# HTTP statuses worth retrying: rate limited, overloaded or failing upstream
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    """LLM call failure; retryable for timeouts, rate limits and 5xx"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+class LLMTimeout(LLMError):
+    def __init__(self, message: str):
+        super().__init__(message, status=504, retryable=True)
+
+def add_usage(usage: Optional[Dict], prompt_tokens: int, output_tokens: int):
+    """Accumulate token counts into a caller's usage dict (no-op when None)"""
+    if usage is not None:
+        usage['prompt_tokens'] = usage.get('prompt_tokens', 0) + (prompt_tokens or 0)
+        usage['output_tokens'] = usage.get('output_tokens', 0) + (output_tokens or 0)
+
+class GeminiBackend:
+    """google-generativeai GenerativeModel, called through its async API"""
+
+    def __init__(self, model):
+        self.model = model
+
+    async def generate(self, prompt: str, usage: Optional[Dict] = None) -> str:
+        try:
+            response = await self.model.generate_content_async(prompt)
+        except Exception as e:
+            # google.api_core exceptions carry the HTTP status as .code
+            status = getattr(e, 'code', None)
+            status = status if isinstance(status, int) else None
+            raise LLMError(str(e), status=status, retryable=status in RETRYABLE_STATUSES)
+        metadata = getattr(response, 'usage_metadata', None)
+        if metadata is not None:
+            add_usage(usage, getattr(metadata, 'prompt_token_count', 0), getattr(metadata, 'candidates_token_count', 0))
+        return response.text
+
+    async def close(self):
+        pass
+
+class HTTPBackend:
+    """
+    Gemini REST generateContent over a pooled httpx client
+
+    Also talks to the local fake server (src.llm.fake_server) for tests and
+    load runs: point base_url at it.
+    """
+
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None,
+                 system_instruction: Optional[str] = None, max_connections: int = 16,
+                 transport=None):
+        """
+        Args:
+            base_url: API root, e.g. https://generativelanguage.googleapis.com or http://localhost:8090
+            model: Model name (e.g. gemini-2.0-flash)
+            api_key: Sent as x-goog-api-key when set
+            system_instruction: System prompt sent with every request
+            max_connections: Connection pool size
+            transport: Optional httpx transport (e.g. httpx.ASGITransport(app) for in-process tests)
+        """
+        import httpx
+        self.model = model
+        self.system_instruction = system_instruction
+        headers = {'x-goog-api-key': api_key} if api_key else {}
+        self.client = httpx.AsyncClient(base_url=base_url.rstrip('/'), headers=headers, transport=transport,
+                                        limits=httpx.Limits(max_connections=max_connections),
+                                        timeout=None)  # LLMClient enforces the per-call timeout
+        self._httpx = httpx
+
+    async def generate(self, prompt: str, usage: Optional[Dict] = None) -> str:
+        body = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+        if self.system_instruction:
+            body['systemInstruction'] = {'parts': [{'text': self.system_instruction}]}
+
+        try:
+            response = await self.client.post(f"/v1beta/models/{self.model}:generateContent", json=body)
+        except self._httpx.TransportError as e:
+            raise LLMError(f"{type(e).__name__}: {e}", retryable=True)
+
+        if response.status_code != 200:
+            raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}", status=response.status_code,
+                           retryable=response.status_code in RETRYABLE_STATUSES)
+        try:
+            payload = response.json()
+            text = payload['candidates'][0]['content']['parts'][0]['text']
+        except (KeyError, IndexError, ValueError) as e:
+            raise LLMError(f"Malformed response: {e}")
+        metadata = payload.get('usageMetadata') or {}
+        add_usage(usage, metadata.get('promptTokenCount', 0), metadata.get('candidatesTokenCount', 0))
+        return text
+
+    async def close(self):
+        await self.client.aclose()
+
+class LLMClient:
+    """
+    Non-blocking LLM calls with bounded concurrency
+
+    At most max_concurrency calls are in flight; the rest wait on a semaphore
+    (their number is the llm_queue_depth gauge). Each attempt is cut off
+    after timeout seconds, and timeouts / retryable errors are retried with
+    full-jitter exponential backoff, without holding a concurrency slot.
+    """
+
+    def __init__(self, backend, max_concurrency: int = 8, timeout: float = 30.0,
+                 retries: int = 2, backoff: float = 0.5, max_backoff: float = 8.0):
+        """
+        Args:
+            backend: GeminiBackend, HTTPBackend or anything with async generate(prompt) -> str
+                (backends taking a usage dict report token counts through it)
+            max_concurrency: Calls in flight at once
+            timeout: Seconds per attempt
+            retries: Extra attempts after a retryable failure
+            backoff: Backoff base in seconds (attempt n sleeps up to backoff * 2**n)
+            max_backoff: Cap on a single backoff sleep
+        """
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retried = 0
+
+    def _update_gauges(self):
+        METRICS.set_gauge('llm_queue_depth', self.waiting)
+        METRICS.set_gauge('llm_in_flight', self.in_flight)
+
+    async def _attempt(self, prompt: str, usage: Optional[Dict]) -> str:
+        self.waiting += 1
+        self._update_gauges()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self._update_gauges()
+        try:
+            with METRICS.stage('llm'):
+                call = self.backend.generate(prompt) if usage is None else self.backend.generate(prompt, usage=usage)
+                return await asyncio.wait_for(call, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeout(f"LLM call exceeded {self.timeout:g}s")
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self._update_gauges()
+
+    async def generate(self, prompt: str, usage: Optional[Dict] = None) -> str:
+        """
+        Model output text for prompt; raises LLMError once retries are exhausted.
+        Token counts of every attempt are added to usage (prompt_tokens,
+        output_tokens) when given and the backend reports them.
+        """
+        self.requests += 1
+        for attempt in range(self.retries + 1):
+            try:
+                text = await self._attempt(prompt, usage)
+                METRICS.inc('llm_requests', outcome='ok')
+                return text
+            except LLMError as e:
+                if not e.retryable or attempt == self.retries:
+                    self.failures += 1
+                    METRICS.inc('llm_requests', outcome='timeout' if isinstance(e, LLMTimeout) else 'error')
+                    raise
+                self.retried += 1
+                METRICS.inc('llm_retries')
+                await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def get_statistics(self) -> Dict:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'queue_depth': self.waiting,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'retries': self.retried,
+        }
+
+    async def close(self):
+        await self.backend.close()
@@ -0,0 +1,123 @@
+"""
+Local stand-in for the Gemini generateContent API, for tests and load runs.
+
+Answers every prompt with a deterministic "Analysis: ... / Risk Score: ..."
+reply (derived from a hash of the prompt) after a configurable latency, and
+can inject errors and hung requests. Batched prompts ("Record <id>: {...}"
+lines, see src.llm.bulk) get a JSON array with one result per record, some
+of which can be left out (omit_rate). Faults can be changed while running via
+POST /_faults; GET /_stats reports calls and peak concurrency.
+
+Usage (from backend/):
+    python -m src.llm.fake_server --port 8090 --latency 0.8 --jitter 0.3 --error-rate 0.05
+    LLM_BASE_URL=http://localhost:8090 uvicorn main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+BATCH_RECORD = re.compile(r"^Record (\d+): (.*)$", re.MULTILINE)
+
+def _risk(text: str) -> float:
+    return round(hashlib.sha256(text.encode()).digest()[0] / 255, 2)
+
+def fake_reply(prompt: str, omit_rate: float = 0.0, rng: Optional[random.Random] = None) -> str:
+    """Deterministic reply in the format SYSTEM_PROMPT (or a batched prompt) asks for"""
+    records = BATCH_RECORD.findall(prompt)
+    if records:
+        rng = rng or random.Random(0)
+        return json.dumps([
+            {'id': int(record_id), 'analysis': "Synthetic assessment of the supplied RF capture.",
+             'risk_score': _risk(record)}
+            for record_id, record in records if rng.random() >= omit_rate
+        ])
+    return f"Analysis: Synthetic assessment of the supplied RF capture.\nRisk Score: {_risk(prompt):.2f}"
+
+def create_app(latency: float = 0.5, jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+               hang_rate: float = 0.0, omit_rate: float = 0.0, seed: Optional[int] = None) -> FastAPI:
+    """
+    Args:
+        latency: Mean response delay in seconds
+        jitter: Uniform +/- jitter added to the delay
+        error_rate: Fraction of calls answered with error_status
+        error_status: HTTP status of injected errors (429 / 500 / 503 ...)
+        hang_rate: Fraction of calls that never answer (until the client times out)
+        omit_rate: Fraction of records missing from batched replies
+        seed: Random seed for reproducible fault sequences
+    """
+    app = FastAPI(title="Fake LLM")
+    faults = {'latency': latency, 'jitter': jitter, 'error_rate': error_rate,
+              'error_status': error_status, 'hang_rate': hang_rate, 'omit_rate': omit_rate}
+    stats = {'calls': 0, 'errors': 0, 'hangs': 0, 'in_flight': 0, 'max_in_flight': 0}
+    rng = random.Random(seed)
+    app.state.faults = faults
+    app.state.stats = stats
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        body = await request.json()
+        prompt = "".join(part.get('text', '') for content in body.get('contents', [])
+                         for part in content.get('parts', []))
+        stats['calls'] += 1
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+        try:
+            roll = rng.random()
+            if roll < faults['hang_rate']:
+                stats['hangs'] += 1
+                await asyncio.sleep(3600)
+            delay = faults['latency'] + rng.uniform(-faults['jitter'], faults['jitter'])
+            await asyncio.sleep(max(0.0, delay))
+            if roll < faults['hang_rate'] + faults['error_rate']:
+                stats['errors'] += 1
+                return JSONResponse({'error': {'code': faults['error_status'], 'message': 'Injected fault'}},
+                                    status_code=faults['error_status'])
+            text = fake_reply(prompt, faults['omit_rate'], rng)
+            return {
+                'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP'}],
+                'usageMetadata': {'promptTokenCount': len(prompt) // 4, 'candidatesTokenCount': len(text) // 4},
+                'modelVersion': model,
+            }
+        finally:
+            stats['in_flight'] -= 1
+
+    @app.post("/_faults")
+    async def set_faults(update: Dict[str, float]):
+        unknown = set(update) - set(faults)
+        if unknown:
+            return JSONResponse({'error': f"Unknown faults {sorted(unknown)}"}, status_code=400)
+        faults.update(update)
+        return faults
+
+    @app.get("/_stats")
+    async def get_stats():
+        return {**stats, 'faults': faults}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini generateContent server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--omit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency, args.jitter, args.error_rate, args.error_status,
+                           args.hang_rate, args.omit_rate, args.seed), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.db.mongo import AsyncCollection
+from src.utils.metrics import METRICS
+
+# RF capture features the local scorer understands (missing ones escalate)
+RF_FEATURES = ('avg_power_db', 'burst_rate', 'active_ratio', 'bandwidth_mhz',
+               'spectral_entropy', 'persistence_score')
+
+# Answer paths reported as answered_by
+LOCAL_PATHS = ('rules', 'model')
+
+# Rules: below these there is no emitter to assess
+QUIET_POWER_DB = -95.0
+QUIET_ACTIVE_RATIO = 0.02
+QUIET_RISK = 0.02
+
+def feature_matrix(records: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """(N, len(RF_FEATURES)) float array, NaN where a feature is missing or not numeric"""
+    X = np.full((len(records), len(RF_FEATURES)), np.nan)
+    for i, record in enumerate(records):
+        for j, name in enumerate(RF_FEATURES):
+            value = record.get(name) if isinstance(record, dict) else None
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                X[i, j] = value
+    return X
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+class RiskScorer:
+    """
+    Local fast path in front of the LLM for RF risk scores
+
+    Vectorized rules catch captures with nothing to assess (quiet channel);
+    a logistic model over RF_FEATURES, refit from LLM-answered analysis_logs,
+    answers when its predicted risk is confidently low or high. Everything
+    else (ambiguous scores, missing features, no model yet) escalates to the
+    LLM. Scoring a record takes microseconds.
+    """
+
+    def __init__(self, low: float = 0.1, high: float = 0.9, min_samples: int = 200, l2: float = 1.0):
+        """
+        Args:
+            low: Predicted risk at or below which the model answers (clearly safe)
+            high: Predicted risk at or above which the model answers (clearly unsafe)
+            min_samples: LLM-labelled records needed before the model answers anything
+            l2: Ridge penalty of the logistic fit
+        """
+        self.low = low
+        self.high = high
+        self.min_samples = min_samples
+        self.l2 = l2
+
+        self.weights: Optional[np.ndarray] = None  # bias first
+        self.mean = np.zeros(len(RF_FEATURES))
+        self.scale = np.ones(len(RF_FEATURES))
+        self.trained_on = 0
+
+        self.answered = {path: 0 for path in LOCAL_PATHS}
+        self.escalated = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.weights is not None and self.trained_on >= self.min_samples
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Model risk in [0, 1] per row (NaN when untrained or a feature is missing)"""
+        if self.weights is None:
+            return np.full(len(X), np.nan)
+        Z = (X - self.mean) / self.scale
+        risk = _sigmoid(self.weights[0] + Z @ self.weights[1:])
+        risk[np.isnan(X).any(axis=1)] = np.nan
+        return risk
+
+    def score(self, records: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """
+        Batch decision
+
+        Returns:
+            risk: (N,) local risk score (NaN where escalated)
+            paths: 'rules' / 'model' per record, None to escalate
+        """
+        X = feature_matrix(records)
+        risk = np.full(len(X), np.nan)
+        paths: List[Optional[str]] = [None] * len(X)
+
+        quiet = (X[:, RF_FEATURES.index('avg_power_db')] < QUIET_POWER_DB) | \
+                (X[:, RF_FEATURES.index('active_ratio')] < QUIET_ACTIVE_RATIO)
+        risk[quiet] = QUIET_RISK
+
+        if self.ready:
+            predicted = self.predict(X)
+            confident = ~quiet & ((predicted <= self.low) | (predicted >= self.high))
+            risk[confident] = predicted[confident]
+            for i in np.flatnonzero(confident):
+                paths[i] = 'model'
+        for i in np.flatnonzero(quiet):
+            paths[i] = 'rules'
+        return risk, paths
+
+    def assess(self, record: Dict[str, Any]) -> Optional[Tuple[float, str, str]]:
+        """(risk_score, answered_by, analysis text) when answered locally, None to escalate"""
+        risk, paths = self.score([record])
+        path = paths[0]
+        if path is None:
+            self.escalated += 1
+            METRICS.inc('risk_scorer', path='llm')
+            return None
+
+        self.answered[path] += 1
+        METRICS.inc('risk_scorer', path=path)
+        score = round(float(risk[0]), 2)
+        if path == 'rules':
+            summary = "No meaningful RF activity in the capture (quiet channel)."
+        elif score >= self.high:
+            summary = "RF features closely match previously assessed high-risk emitters."
+        else:
+            summary = "RF features closely match previously assessed benign emitters."
+        return score, path, f"Analysis: {summary}\nRisk Score: {score:.2f}"
+
+    def fit(self, X: np.ndarray, y: np.ndarray, iterations: int = 25) -> Dict:
+        """
+        Fit the logistic model to LLM risk scores (soft labels in [0, 1]) by
+        Newton / IRLS; rows with missing features are dropped
+        """
+        keep = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+        X, y = X[keep], np.clip(y[keep], 0.0, 1.0)
+        if len(X) == 0:
+            return {'samples': 0}
+
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        A = np.hstack([np.ones((len(X), 1)), (X - mean) / scale])
+        penalty = self.l2 * np.eye(A.shape[1])
+        penalty[0, 0] = 0.0  # bias is not regularized
+
+        w = np.zeros(A.shape[1])
+        for _ in range(iterations):
+            p = _sigmoid(A @ w)
+            gradient = A.T @ (p - y) + penalty @ w
+            hessian = (A * (p * (1 - p))[:, None]).T @ A + penalty
+            step = np.linalg.solve(hessian, gradient)
+            w -= step
+            if np.abs(step).max() < 1e-6:
+                break
+
+        self.weights, self.mean, self.scale, self.trained_on = w, mean, scale, len(X)
+        predicted = self.predict(X)
+        confident = (predicted <= self.low) | (predicted >= self.high)
+        agreement = float(np.mean((predicted[confident] >= 0.5) == (y[confident] >= 0.5))) if confident.any() else None
+        return {
+            'samples': len(X),
+            'mean_abs_error': round(float(np.mean(np.abs(predicted - y))), 4),
+            'confident_share': round(float(confident.mean()), 4),
+            'confident_agreement': agreement,
+        }
+
+    async def refit_from(self, collection: AsyncCollection, limit: int = 50000) -> Dict:
+        """Refit on the newest LLM-answered analyses in analysis_logs"""
+        documents = await collection.find(
+            {'answered_by': {'$nin': list(LOCAL_PATHS)}, 'risk_score': {'$exists': True}},
+            {'data.input.rf_data': 1, 'risk_score': 1, '_id': 0},
+            sort=[('timestamp', -1)], limit=limit)
+        records = [document.get('data', {}).get('input', {}).get('rf_data') or {} for document in documents]
+        y = np.array([document.get('risk_score', np.nan) for document in documents], dtype=np.float64)
+        return self.fit(feature_matrix(records), y)
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump({'features': RF_FEATURES, 'weights': None if self.weights is None else self.weights.tolist(),
+                       'mean': self.mean.tolist(), 'scale': self.scale.tolist(),
+                       'trained_on': self.trained_on}, f, indent=2)
+
+    def load(self, path: str):
+        with open(path) as f:
+            model = json.load(f)
+        if tuple(model['features']) != RF_FEATURES:
+            raise ValueError(f"Model features {model['features']} do not match {RF_FEATURES}")
+        self.weights = None if model['weights'] is None else np.array(model['weights'])
+        self.mean, self.scale = np.array(model['mean']), np.array(model['scale'])
+        self.trained_on = model['trained_on']
+
+    def get_statistics(self) -> Dict:
+        local = sum(self.answered.values())
+        total = local + self.escalated
+        return {
+            'ready': self.ready,
+            'trained_on': self.trained_on,
+            'answered_rules': self.answered['rules'],
+            'answered_model': self.answered['model'],
+            'escalated': self.escalated,
+            'escalation_rate': round(self.escalated / total, 4) if total else None,
+        }
@@ -0,0 +1,375 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Tuple
+
+# URL scheme of the in-process backend (single worker, tests)
+MEMORY_URL = "memory://"
+
+class MemoryBackend:
+    """
+    In-process state: fine for one worker, invisible to any other
+
+    Every backend offers the same small set of thread-safe, blocking calls:
+    hash counters / values (incr, hset, hget, hgetall, hdel), an append-only message log
+    per channel read by cursor (publish, read, recent, cursor) that doubles as
+    pub/sub and as the recent-items list, and expiring leases naming one
+    owner (lease, release). write and snapshot do several of those as one
+    atomic step, so a reader never sees counters that disagree with the
+    message log they were written with.
+    """
+
+    def __init__(self, max_messages: int = 1000):
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        self._channels: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.max_messages))
+        self._ids: Dict[str, int] = defaultdict(int)
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    def incr(self, key: str, amounts: Dict[str, int]):
+        with self._lock:
+            values = self._hashes[key]
+            for field, amount in amounts.items():
+                values[field] = values.get(field, 0) + amount
+
+    def hset(self, key: str, values: Dict[str, Any]):
+        with self._lock:
+            self._hashes[key].update(values)
+
+    def hget(self, key: str, field: str) -> Any:
+        """One field of a hash, None if unset"""
+        with self._lock:
+            return self._hashes.get(key, {}).get(field)
+
+    def hgetall(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._hashes.get(key, {}))
+
+    def hdel(self, key: str, fields: List[str]):
+        with self._lock:
+            values = self._hashes.get(key, {})
+            for field in fields:
+                values.pop(field, None)
+
+    def publish(self, channel: str, messages: List[Any]):
+        self.write(publish={channel: messages})
+
+    def write(self, incr: Dict[str, Dict[str, int]] = None, hset: Dict[str, Dict[str, Any]] = None,
+              publish: Dict[str, List[Any]] = None):
+        """incr / hset / publish on several keys and channels at once, atomically"""
+        with self._lock:
+            for key, amounts in (incr or {}).items():
+                values = self._hashes[key]
+                for field, amount in amounts.items():
+                    values[field] = values.get(field, 0) + amount
+            for key, values in (hset or {}).items():
+                self._hashes[key].update(values)
+            for channel, messages in (publish or {}).items():
+                log = self._channels[channel]
+                for message in messages:
+                    self._ids[channel] += 1
+                    log.append((self._ids[channel], message))
+
+    def snapshot(self, keys: List[str], channels: List[str], recent: int
+                 ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any], Dict[str, List[Any]]]:
+        """
+        Hashes, channel cursors and each channel's newest recent messages, read
+        atomically: reading the channels after these cursors sees exactly the
+        writes the hashes don't include yet
+        """
+        with self._lock:
+            hashes = {key: dict(self._hashes.get(key, {})) for key in keys}
+            cursors = {channel: self._ids[channel] for channel in channels}
+            messages = {channel: [message for _, message in list(self._channels[channel])[-recent:]] if recent else []
+                        for channel in channels}
+        return hashes, cursors, messages
+
+    def cursor(self, channel: str) -> int:
+        """Cursor just after the newest message (read() from here sees only new ones)"""
+        with self._lock:
+            return self._ids[channel]
+
+    def read(self, channel: str, after: int, limit: int = 1000) -> List[Tuple[int, Any]]:
+        """Messages after a cursor, oldest first, as (cursor, message)"""
+        with self._lock:
+            return [(id_, message) for id_, message in self._channels[channel] if id_ > after][:limit]
+
+    def recent(self, channel: str, count: int) -> List[Any]:
+        """Newest count messages, oldest first"""
+        with self._lock:
+            log = self._channels[channel]
+            return [message for _, message in list(log)[max(0, len(log) - count):]]
+
+    def lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease; False while another owner holds an unexpired one"""
+        now = time.time()
+        with self._lock:
+            holder = self._leases.get(name)
+            if holder is not None and holder[0] != owner and holder[1] > now:
+                return False
+            self._leases[name] = (owner, now + ttl)
+            return True
+
+    def release(self, name: str, owner: str):
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+    def close(self):
+        pass
+
+class SQLiteBackend:
+    """
+    State in a SQLite file shared by the worker processes of one host
+
+    WAL mode lets readers proceed while a worker writes; every call is its
+    own short transaction.
+    """
+
+    def __init__(self, path: str, max_messages: int = 1000, timeout: float = 5.0):
+        self.path = path
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS hashes (key TEXT, field TEXT, value TEXT, PRIMARY KEY (key, field));
+            CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, message TEXT);
+            CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, id);
+            CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires REAL);
+        """)
+
+    def _transaction(self, statements: List[Tuple[str, tuple]]):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._db.execute(sql, params)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def incr(self, key: str, amounts: Dict[str, int]):
+        self._transaction([
+            ("INSERT INTO hashes VALUES (?, ?, ?) ON CONFLICT (key, field) "
+             "DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value", (key, field, amount))
+            for field, amount in amounts.items()
+        ])
+
+    def hset(self, key: str, values: Dict[str, Any]):
+        self._transaction([
+            ("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?)", (key, field, json.dumps(value)))
+            for field, value in values.items()
+        ])
+
+    def hget(self, key: str, field: str) -> Any:
+        rows = self._query("SELECT value FROM hashes WHERE key = ? AND field = ?", (key, field))
+        return json.loads(rows[0][0]) if rows else None
+
+    def hgetall(self, key: str) -> Dict[str, Any]:
+        return {field: json.loads(value)
+                for field, value in self._query("SELECT field, value FROM hashes WHERE key = ?", (key,))}
+
+    def hdel(self, key: str, fields: List[str]):
+        self._transaction([("DELETE FROM hashes WHERE key = ? AND field = ?", (key, field)) for field in fields])
+
+    def publish(self, channel: str, messages: List[Any]):
+        self.write(publish={channel: messages})
+
+    def write(self, incr: Dict[str, Dict[str, int]] = None, hset: Dict[str, Dict[str, Any]] = None,
+              publish: Dict[str, List[Any]] = None):
+        statements = []
+        for key, amounts in (incr or {}).items():
+            statements.extend(("INSERT INTO hashes VALUES (?, ?, ?) ON CONFLICT (key, field) "
+                               "DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value", (key, field, amount))
+                              for field, amount in amounts.items())
+        for key, values in (hset or {}).items():
+            statements.extend(("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?)", (key, field, json.dumps(value)))
+                              for field, value in values.items())
+        for channel, messages in (publish or {}).items():
+            if not messages:
+                continue
+            statements.extend(("INSERT INTO messages (channel, message) VALUES (?, ?)", (channel, json.dumps(message)))
+                              for message in messages)
+            statements.append(("DELETE FROM messages WHERE channel = ? AND id <= "
+                               "(SELECT id FROM messages WHERE channel = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                               (channel, channel, self.max_messages)))
+        if statements:
+            self._transaction(statements)
+
+    def snapshot(self, keys: List[str], channels: List[str], recent: int
+                 ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any], Dict[str, List[Any]]]:
+        # One read transaction sees a single version of the database (WAL)
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                hashes = {key: {field: json.loads(value) for field, value in self._db.execute(
+                    "SELECT field, value FROM hashes WHERE key = ?", (key,)).fetchall()} for key in keys}
+                cursors, messages = {}, {}
+                for channel in channels:
+                    cursors[channel] = self._db.execute("SELECT MAX(id) FROM messages WHERE channel = ?",
+                                                        (channel,)).fetchone()[0] or 0
+                    rows = self._db.execute("SELECT message FROM messages WHERE channel = ? ORDER BY id DESC LIMIT ?",
+                                            (channel, recent)).fetchall()
+                    messages[channel] = [json.loads(message) for message, in reversed(rows)]
+            finally:
+                self._db.execute("COMMIT")
+        return hashes, cursors, messages
+
+    def cursor(self, channel: str) -> int:
+        rows = self._query("SELECT MAX(id) FROM messages WHERE channel = ?", (channel,))
+        return rows[0][0] or 0
+
+    def read(self, channel: str, after: int, limit: int = 1000) -> List[Tuple[int, Any]]:
+        rows = self._query("SELECT id, message FROM messages WHERE channel = ? AND id > ? ORDER BY id LIMIT ?",
+                           (channel, after, limit))
+        return [(id_, json.loads(message)) for id_, message in rows]
+
+    def recent(self, channel: str, count: int) -> List[Any]:
+        rows = self._query("SELECT message FROM messages WHERE channel = ? ORDER BY id DESC LIMIT ?",
+                           (channel, count))
+        return [json.loads(message) for message, in reversed(rows)]
+
+    def lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        self._transaction([
+            ("INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT (name) DO UPDATE "
+             "SET owner = excluded.owner, expires = excluded.expires "
+             "WHERE leases.owner = excluded.owner OR leases.expires < ?", (name, owner, now + ttl, now)),
+        ])
+        return self._query("SELECT owner FROM leases WHERE name = ?", (name,)) == [(owner,)]
+
+    def release(self, name: str, owner: str):
+        self._transaction([("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# Lease compare-and-set on the server, so an expiry between the check and the
+# PEXPIRE / DEL cannot hand another owner's lease to us or delete it
+_REDIS_LEASE = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then return 1 end
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('PEXPIRE', KEYS[1], ARGV[2]) end
+return 0
+"""
+_REDIS_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+class RedisBackend:
+    """
+    State in Redis (or a Redis-compatible server such as Valkey / KeyDB),
+    shared by workers on any host
+
+    Message logs are capped streams (XADD MAXLEN ~), so cursors are stream ids.
+    """
+
+    def __init__(self, url: str, max_messages: int = 1000, prefix: str = "uav:"):
+        import redis  # optional dependency, only needed for STATE_URL=redis://
+
+        self.max_messages = max_messages
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._lease = self._redis.register_script(_REDIS_LEASE)
+        self._release = self._redis.register_script(_REDIS_RELEASE)
+
+    def incr(self, key: str, amounts: Dict[str, int]):
+        pipe = self._redis.pipeline()
+        for field, amount in amounts.items():
+            pipe.hincrby(self.prefix + key, field, amount)
+        pipe.execute()
+
+    def hset(self, key: str, values: Dict[str, Any]):
+        if values:
+            self._redis.hset(self.prefix + key, mapping={field: json.dumps(value) for field, value in values.items()})
+
+    def hget(self, key: str, field: str) -> Any:
+        value = self._redis.hget(self.prefix + key, field)
+        return None if value is None else json.loads(value)
+
+    def hgetall(self, key: str) -> Dict[str, Any]:
+        return {field: json.loads(value) for field, value in self._redis.hgetall(self.prefix + key).items()}
+
+    def hdel(self, key: str, fields: List[str]):
+        if fields:
+            self._redis.hdel(self.prefix + key, *fields)
+
+    def publish(self, channel: str, messages: List[Any]):
+        self.write(publish={channel: messages})
+
+    def write(self, incr: Dict[str, Dict[str, int]] = None, hset: Dict[str, Dict[str, Any]] = None,
+              publish: Dict[str, List[Any]] = None):
+        pipe = self._redis.pipeline()  # MULTI / EXEC
+        for key, amounts in (incr or {}).items():
+            for field, amount in amounts.items():
+                pipe.hincrby(self.prefix + key, field, amount)
+        for key, values in (hset or {}).items():
+            if values:
+                pipe.hset(self.prefix + key, mapping={field: json.dumps(value) for field, value in values.items()})
+        for channel, messages in (publish or {}).items():
+            for message in messages:
+                pipe.xadd(self.prefix + channel, {'m': json.dumps(message)}, maxlen=self.max_messages,
+                          approximate=True)
+        pipe.execute()
+
+    def snapshot(self, keys: List[str], channels: List[str], recent: int
+                 ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any], Dict[str, List[Any]]]:
+        pipe = self._redis.pipeline()  # MULTI / EXEC
+        for key in keys:
+            pipe.hgetall(self.prefix + key)
+        for channel in channels:
+            pipe.xrevrange(self.prefix + channel, count=max(recent, 1))
+        results = pipe.execute()
+        hashes = {key: {field: json.loads(value) for field, value in values.items()}
+                  for key, values in zip(keys, results)}
+        cursors, messages = {}, {}
+        for channel, entries in zip(channels, results[len(keys):]):
+            cursors[channel] = entries[0][0] if entries else '0-0'
+            messages[channel] = [json.loads(fields['m']) for _, fields in reversed(entries[:recent])]
+        return hashes, cursors, messages
+
+    def cursor(self, channel: str) -> str:
+        newest = self._redis.xrevrange(self.prefix + channel, count=1)
+        return newest[0][0] if newest else '0-0'
+
+    def read(self, channel: str, after: str, limit: int = 1000) -> List[Tuple[str, Any]]:
+        streams = self._redis.xread({self.prefix + channel: after}, count=limit)
+        return [(id_, json.loads(fields['m'])) for _, entries in streams for id_, fields in entries]
+
+    def recent(self, channel: str, count: int) -> List[Any]:
+        entries = self._redis.xrevrange(self.prefix + channel, count=count)
+        return [json.loads(fields['m']) for _, fields in reversed(entries)]
+
+    def lease(self, name: str, owner: str, ttl: float) -> bool:
+        return bool(self._lease(keys=[self.prefix + 'lease:' + name], args=[owner, int(ttl * 1000)]))
+
+    def release(self, name: str, owner: str):
+        self._release(keys=[self.prefix + 'lease:' + name], args=[owner])
+
+    def close(self):
+        self._redis.close()
+
+def create_backend(url: str, max_messages: int = 1000):
+    """
+    Backend for STATE_URL: memory:// (default, one worker),
+    sqlite:///path/to/state.db (workers on one host) or redis://host:6379/0
+    """
+    if url.startswith(MEMORY_URL):
+        return MemoryBackend(max_messages)
+    if url.startswith("sqlite://"):
+        path = url[len("sqlite://"):]
+        return SQLiteBackend(path[1:] if path.startswith("/") else path, max_messages)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url, max_messages)
+    raise ValueError(f"Unsupported STATE_URL '{url}' (expected memory://, sqlite:///<path> or redis://)")
@@ -0,0 +1,336 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Keys and channels in the backend
+ALERT_COUNTERS = 'alert_counters'
+ALERTS_CHANNEL = 'alerts'
+TRACKS_CHANNEL = 'tracks'  # {source_id, entered, exited} whenever a source's live tracks change
+OCCUPANCY = 'occupancy'  # source_id -> live track ids
+JOBS = 'jobs'  # job_id -> status
+FINISHED_JOB_STATUSES = ('complete', 'failed')
+# Recent alerts kept in the snapshot the relay starts from
+SNAPSHOT_RECENT = 50
+
+ALERT_COUNTER_FIELDS = ('total_alerts', 'high_alerts', 'medium_alerts', 'low_alerts',
+                        'speed_violations', 'hover_detections', 'zone_violations')
+
+def alert_counts(alert: Dict) -> Dict[str, int]:
+    """Counter increments for one alert (the fields of AlertManager.get_statistics)"""
+    level = alert.get('alert_level')
+    return {
+        'total_alerts': 1,
+        'high_alerts': int(level == 'HIGH'),
+        'medium_alerts': int(level == 'MEDIUM'),
+        'low_alerts': int(level == 'LOW'),
+        'speed_violations': int(bool(alert.get('speed_flag'))),
+        'hover_detections': int(bool(alert.get('hover_flag'))),
+        'zone_violations': int(bool(alert.get('zone_flag'))),
+    }
+
+def track_ids(tracks) -> List[int]:
+    return [] if tracks is None else tracks.ids.tolist()
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class SharedState:
+    """
+    Runtime state every API worker process sees the same way
+
+    Alert counters, recent alerts, per-source live tracks and job status
+    live in a pluggable backend (see create_backend), so any worker can
+    answer /stats or stream /ws/alerts. Each video source is run by one
+    worker only, the holder of its lease: that worker's inference thread
+    records alerts and track enter / exit here (on_frame), they are written
+    every flush_interval in a few batched calls, and every worker relays the
+    alerts and tracks channels to its own subscribers. Leases are renewed by
+    a task of their own, so a slow subscriber never delays them; a source
+    whose owner stops renewing is taken over by another worker.
+    """
+
+    def __init__(self, backend, worker_id: Optional[str] = None, lease_ttl: float = 10.0,
+                 flush_interval: float = 0.1, max_pending: int = 10000, job_ttl: float = 3600.0):
+        """
+        Args:
+            backend: MemoryBackend, SQLiteBackend or RedisBackend
+            worker_id: Lease owner name (default host-pid)
+            lease_ttl: Seconds a lease lasts without renewal
+            flush_interval: Seconds between writes of pending updates / reads of the alerts channel
+            max_pending: Alerts (and track events) waiting to be written; beyond it the
+                         oldest are dropped (counters are always kept)
+            job_ttl: Seconds a job's status is kept after its last update
+        """
+        self.backend = backend
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_ttl = lease_ttl
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._alerts: List[Dict] = []
+        self._track_events: List[Dict] = []
+        self._live: Dict[str, set] = {}  # source_id -> live track ids
+        self._live_changed = set()
+
+        # lease name -> (on_acquire, on_lose), called from a worker thread
+        self._leases: Dict[str, tuple] = {}
+        self._held = set()
+        self._task: Optional[asyncio.Task] = None
+        self._renewal_task: Optional[asyncio.Task] = None
+        self._subscribers: Dict[str, List[Callable[[Dict], Awaitable]]] = {ALERTS_CHANNEL: [], TRACKS_CHANNEL: []}
+        self._initial: Optional[Dict] = None  # snapshot the relay started from
+        self._loaded = asyncio.Event()
+
+        self.alerts_recorded = 0
+        self.alerts_relayed = 0
+        self.flush_errors = 0
+        self.dropped = 0
+
+    # --- Inference side (scheduler thread) ---
+    def on_frame(self, source_id: str, tracks, alerts: List[Dict], capture_time: float = None):
+        """InferenceScheduler listener: queue a processed frame's alerts and track changes"""
+        with self._lock:
+            for alert in alerts:
+                for field, amount in alert_counts(alert).items():
+                    self._counts[field] = self._counts.get(field, 0) + amount
+            self._alerts.extend(alerts)
+            self._update_live(source_id, set(track_ids(tracks)))
+            self._trim_pending()
+        self.alerts_recorded += len(alerts)
+
+    def _update_live(self, source_id: str, live: set):
+        previous = self._live.get(source_id, set())
+        if live == previous:
+            return
+        self._track_events.append({'source_id': source_id, 'entered': sorted(live - previous),
+                                   'exited': sorted(previous - live)})
+        self._live[source_id] = live
+        self._live_changed.add(source_id)
+
+    def forget_source(self, source_id: str):
+        """A removed source's tracks all exit"""
+        with self._lock:
+            self._update_live(source_id, set())
+            self._trim_pending()
+
+    def flush(self):
+        """
+        Write pending counters, alerts and track changes (blocking); whatever
+        was not written is put back and tried again on the next flush
+        """
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            alerts, self._alerts = self._alerts, []
+            track_events, self._track_events = self._track_events, []
+            changed, self._live_changed = self._live_changed, set()
+            live = {source_id: sorted(self._live[source_id]) for source_id in changed}
+        if not (counts or alerts or live or track_events):
+            return
+        # One atomic write: counters always match the alerts channel (see snapshot)
+        try:
+            self.backend.write(incr={ALERT_COUNTERS: counts} if counts else None,
+                               hset={OCCUPANCY: live} if live else None,
+                               publish={ALERTS_CHANNEL: alerts, TRACKS_CHANNEL: track_events})
+        except Exception as e:
+            print(f"Error writing shared state: {e}")
+            self.flush_errors += 1
+            self._put_back(counts, alerts, changed, track_events)
+
+    def _put_back(self, counts: Dict[str, int], alerts: List[Dict], changed: set, track_events: List[Dict]):
+        with self._lock:
+            for field, amount in counts.items():
+                self._counts[field] = self._counts.get(field, 0) + amount
+            self._alerts[:0] = alerts
+            self._track_events[:0] = track_events
+            # Occupancy is rewritten from the current live tracks
+            self._live_changed |= changed
+            self._trim_pending()
+
+    def _trim_pending(self):
+        """Drop the oldest alerts / track events beyond max_pending (holding _lock)"""
+        for pending in (self._alerts, self._track_events):
+            overflow = len(pending) - self.max_pending
+            if overflow > 0:
+                del pending[:overflow]
+                self.dropped += overflow
+
+    # --- Reads (any worker, blocking) ---
+    def snapshot(self, recent: int = SNAPSHOT_RECENT) -> Dict:
+        """
+        Alert counters, recent alerts and live tracks, with the alerts / tracks
+        channel cursors they are current to, read in one atomic step
+        """
+        hashes, cursors, messages = self.backend.snapshot([ALERT_COUNTERS, OCCUPANCY],
+                                                          [ALERTS_CHANNEL, TRACKS_CHANNEL], recent)
+        counters = hashes[ALERT_COUNTERS]
+        return {
+            'counters': {field: int(counters.get(field, 0)) for field in ALERT_COUNTER_FIELDS},
+            'recent_alerts': messages[ALERTS_CHANNEL],
+            'live_tracks': hashes[OCCUPANCY],
+            'cursors': cursors,
+        }
+
+    def alert_statistics(self) -> Dict[str, int]:
+        counters = self.backend.hgetall(ALERT_COUNTERS)
+        return {field: int(counters.get(field, 0)) for field in ALERT_COUNTER_FIELDS}
+
+    def recent_alerts(self, count: int = 10) -> List[Dict]:
+        return self.backend.recent(ALERTS_CHANNEL, count)
+
+    def live_tracks(self) -> Dict[str, List[int]]:
+        """Live track ids per source"""
+        return self.backend.hgetall(OCCUPANCY)
+
+    def occupancy(self) -> Dict[str, int]:
+        return {source_id: len(ids) for source_id, ids in self.live_tracks().items()}
+
+    def set_job(self, job_id: str, status: Dict):
+        self.backend.hset(JOBS, {job_id: {**status, 'worker_id': self.worker_id, 'updated_at': time.time()}})
+        if status.get('status') in FINISHED_JOB_STATUSES:
+            self.prune_jobs()
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        return self.backend.hget(JOBS, job_id)
+
+    def prune_jobs(self) -> int:
+        """Forget jobs not updated for job_ttl seconds (finished, or their worker died); the number removed"""
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self.backend.hgetall(JOBS).items() if job.get('updated_at', 0) < cutoff]
+        if expired:
+            self.backend.hdel(JOBS, expired)
+        return len(expired)
+
+    # --- Source ownership ---
+    def own(self, name: str, on_acquire: Optional[Callable] = None, on_lose: Optional[Callable] = None) -> bool:
+        """
+        Compete for a lease from now on (blocking); True if this worker holds it
+        now. on_acquire / on_lose run when ownership changes later on (a worker
+        thread).
+        """
+        self._leases[name] = (on_acquire, on_lose)
+        if self.backend.lease(name, self.worker_id, self.lease_ttl):
+            self._held.add(name)
+            return True
+        return False
+
+    def disown(self, name: str):
+        """Stop competing for a lease and release it (blocking)"""
+        self._leases.pop(name, None)
+        if name in self._held:
+            self._held.discard(name)
+            self.backend.release(name, self.worker_id)
+
+    def owns(self, name: str) -> bool:
+        return name in self._held
+
+    def _renew(self):
+        for name, (on_acquire, on_lose) in list(self._leases.items()):
+            try:
+                held = self.backend.lease(name, self.worker_id, self.lease_ttl)
+            except Exception as e:
+                print(f"Error renewing lease '{name}': {e}")
+                continue
+            if held == (name in self._held):
+                continue
+            if held:
+                self._held.add(name)
+                print(f"Acquired '{name}'")
+            else:
+                self._held.discard(name)
+                print(f"Lost '{name}' to another worker")
+            callback = on_acquire if held else on_lose
+            try:
+                if callback:
+                    callback()
+            except Exception as e:
+                print(f"Error handling change of '{name}': {e}")
+
+    # --- Background task ---
+    def subscribe(self, callback: Callable[[Dict], Awaitable], channel: str = ALERTS_CHANNEL):
+        """Await callback(message) for every alert (or track change) any worker records"""
+        self._subscribers[channel].append(callback)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+        if self._renewal_task is None:
+            self._renewal_task = loop.create_task(self._renew_leases())
+
+    async def initial_snapshot(self) -> Dict:
+        """
+        The snapshot the relay started from: subscribers get exactly the
+        messages written after it, so it plus what they receive is the current state
+        """
+        await self._loaded.wait()
+        return self._initial
+
+    async def _run(self):
+        while self._initial is None:
+            try:
+                self._initial = await asyncio.to_thread(self.snapshot)
+            except Exception as e:
+                print(f"Error reading shared state: {e}")
+                await asyncio.sleep(self.flush_interval)
+        self._loaded.set()
+        cursors = dict(self._initial['cursors'])
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.flush)
+            for channel, callbacks in self._subscribers.items():
+                if callbacks:
+                    cursors[channel] = await self._relay(channel, cursors[channel], callbacks)
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            await asyncio.to_thread(self._renew)
+
+    async def _relay(self, channel: str, cursor, callbacks: List[Callable[[Dict], Awaitable]]):
+        """Hand messages after cursor to the callbacks; returns the new cursor"""
+        try:
+            messages = await asyncio.to_thread(self.backend.read, channel, cursor)
+        except Exception as e:
+            print(f"Error reading shared {channel}: {e}")
+            return cursor
+        for cursor, message in messages:
+            if channel == ALERTS_CHANNEL:
+                self.alerts_relayed += 1
+            for callback in callbacks:
+                try:
+                    await callback(message)
+                except Exception as e:
+                    print(f"Error relaying {channel}: {e}")
+        return cursor
+
+    async def close(self):
+        """Stop the background tasks, write what is pending and release held leases"""
+        for task in (self._task, self._renewal_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._renewal_task = None
+        await asyncio.to_thread(self.flush)
+        for name in list(self._held):
+            self.disown(name)
+        self.backend.close()
+
+    def get_statistics(self) -> Dict:
+        return {
+            'backend': type(self.backend).__name__,
+            'worker_id': self.worker_id,
+            'leases_held': sorted(self._held),
+            'alerts_recorded': self.alerts_recorded,
+            'alerts_relayed': self.alerts_relayed,
+            'flush_errors': self.flush_errors,
+            'dropped': self.dropped,
+        }
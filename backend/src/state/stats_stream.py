@@ -0,0 +1,219 @@
+import asyncio
+import json
+from collections import deque
+from typing import Dict, Optional, Set
+
+from src.state.shared import ALERT_COUNTER_FIELDS, ALERTS_CHANNEL, TRACKS_CHANNEL, SharedState, alert_counts
+from src.utils.websockets import send_queued
+
+def _dumps(message: Dict) -> str:
+    return json.dumps(message, separators=(',', ':'))
+
+class StatsStream:
+    """
+    Push-based dashboard stats for /ws/stats
+
+    A client first receives a snapshot (alert counters, recent alerts, live
+    track ids per source), then deltas: counter increments, new alerts and
+    track enter / exit, coalesced over interval seconds. Nothing is sent
+    while nothing changes, and each delta is serialized once for every
+    client, so cost follows the rate of change rather than viewers times
+    poll rate. Messages carry a sequence number; a delta applies to the
+    state of the message before it.
+
+    The model starts from the snapshot SharedState's relay started from and
+    is then fed by the relay (alerts and track changes of every worker), so
+    no change is missed or counted twice. Pending changes are folded into it only when a delta
+    goes out, so a snapshot always matches the deltas that follow it. Each
+    client has a bounded queue; one that falls behind gets its backlog
+    replaced by a fresh snapshot.
+    """
+
+    def __init__(self, shared: SharedState, interval: float = 1.0, recent_size: int = 10, max_queue: int = 64):
+        """
+        Args:
+            shared: SharedState whose alerts / tracks channels are streamed
+            interval: Seconds over which changes are coalesced into one delta
+            recent_size: Recent alerts in a snapshot, and most new alerts in one delta
+            max_queue: Messages queued for a client before it is resynced
+        """
+        self.shared = shared
+        self.interval = interval
+        self.recent_size = recent_size
+        self.max_queue = max_queue
+
+        # State as of the last sent message (seq)
+        self.seq = 0
+        self.counters = {field: 0 for field in ALERT_COUNTER_FIELDS}
+        self.recent = deque(maxlen=recent_size)
+        self.live: Dict[str, Set[int]] = {}
+        self._snapshot: Optional[str] = None
+
+        # Changes since then
+        self._counts: Dict[str, int] = {}
+        self._alerts = deque(maxlen=recent_size)
+        self._alerts_skipped = 0
+        self._entered: Dict[str, Set[int]] = {}
+        self._exited: Dict[str, Set[int]] = {}
+
+        self._clients: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.deltas_sent = 0
+        self.snapshots_sent = 0
+        self.bytes_sent = 0
+        self.resyncs = 0
+
+        shared.subscribe(self._on_alert, ALERTS_CHANNEL)
+        shared.subscribe(self._on_tracks, TRACKS_CHANNEL)
+
+    async def _on_alert(self, alert: Dict):
+        for field, amount in alert_counts(alert).items():
+            if amount:
+                self._counts[field] = self._counts.get(field, 0) + amount
+        if len(self._alerts) == self.recent_size:
+            self._alerts_skipped += 1
+        self._alerts.append(alert)
+
+    async def _on_tracks(self, event: Dict):
+        source_id = event['source_id']
+        entered = self._entered.setdefault(source_id, set())
+        exited = self._exited.setdefault(source_id, set())
+        # A track that enters and exits within one interval cancels out
+        for track_id in event['entered']:
+            if track_id in exited:
+                exited.discard(track_id)
+            else:
+                entered.add(track_id)
+        for track_id in event['exited']:
+            if track_id in entered:
+                entered.discard(track_id)
+            else:
+                exited.add(track_id)
+
+    def _load(self, snapshot: Dict):
+        """Initial model from SharedState.initial_snapshot; clients connected before it are resynced"""
+        self.counters = dict(snapshot['counters'])
+        self.recent.extend(snapshot['recent_alerts'][-self.recent_size:])
+        self.live = {source_id: set(ids) for source_id, ids in snapshot['live_tracks'].items()}
+        self.seq += 1
+        self._snapshot = None
+        for queue in list(self._clients):
+            self._resync(queue)
+
+    def snapshot(self) -> Dict:
+        return {
+            'type': 'snapshot',
+            'seq': self.seq,
+            'interval': self.interval,
+            'counters': dict(self.counters),
+            'recent_alerts': list(self.recent),
+            'tracks': {source_id: sorted(ids) for source_id, ids in self.live.items()},
+            'total_detections': sum(len(ids) for ids in self.live.values()),
+        }
+
+    def _snapshot_message(self) -> str:
+        if self._snapshot is None:
+            self._snapshot = _dumps(self.snapshot())
+        return self._snapshot
+
+    def _next_delta(self) -> Optional[Dict]:
+        """Fold pending changes into the model; the delta describing them, None if nothing changed"""
+        delta = {}
+        if self._counts:
+            for field, amount in self._counts.items():
+                self.counters[field] = self.counters.get(field, 0) + amount
+            delta['counters'] = self._counts
+            self._counts = {}
+        if self._alerts:
+            self.recent.extend(self._alerts)
+            delta['alerts'] = list(self._alerts)
+            if self._alerts_skipped:
+                delta['alerts_skipped'] = self._alerts_skipped
+            self._alerts.clear()
+            self._alerts_skipped = 0
+
+        tracks = {}
+        for source_id in set(self._entered) | set(self._exited):
+            entered = self._entered.pop(source_id, set())
+            exited = self._exited.pop(source_id, set())
+            if not entered and not exited:
+                continue
+            live = self.live.setdefault(source_id, set())
+            live |= entered
+            live -= exited
+            tracks[source_id] = {key: sorted(ids) for key, ids in (('entered', entered), ('exited', exited)) if ids}
+        if tracks:
+            delta['tracks'] = tracks
+            delta['total_detections'] = sum(len(ids) for ids in self.live.values())
+
+        if not delta:
+            return None
+        self.seq += 1
+        self._snapshot = None
+        return {'type': 'delta', 'seq': self.seq, **delta}
+
+    def publish(self):
+        """Send the changes of the last interval to every client (no-op when nothing changed)"""
+        delta = self._next_delta()
+        if delta is None or not self._clients:
+            return
+        message = _dumps(delta)
+        self.deltas_sent += 1
+        for queue in list(self._clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too slow for deltas: replace its backlog with the current state
+                self._resync(queue)
+                self.resyncs += 1
+
+    def _resync(self, queue: asyncio.Queue):
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(self._snapshot_message())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        self._load(await self.shared.initial_snapshot())
+        while True:
+            await asyncio.sleep(self.interval)
+            self.publish()
+
+    async def serve(self, websocket):
+        """Stream to one accepted WebSocket until it disconnects"""
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        queue.put_nowait(self._snapshot_message())
+        self._clients.add(queue)
+        try:
+            await send_queued(websocket, queue, websocket.send_text, self._sent)
+        finally:
+            self._clients.discard(queue)
+
+    def _sent(self, message: str):
+        self.bytes_sent += len(message)
+        if message.startswith('{"type":"snapshot"'):
+            self.snapshots_sent += 1
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_statistics(self) -> Dict:
+        return {
+            'clients': len(self._clients),
+            'interval_seconds': self.interval,
+            'seq': self.seq,
+            'deltas_sent': self.deltas_sent,
+            'snapshots_sent': self.snapshots_sent,
+            'bytes_sent': self.bytes_sent,
+            'resyncs': self.resyncs,
+        }
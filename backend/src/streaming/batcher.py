@@ -0,0 +1,140 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from src.utils.boxes import Detections
+from src.utils.metrics import METRICS
+
+def decode_image(data: bytes) -> np.ndarray:
+    """
+    BGR uint8 frame from encoded image bytes (JPEG, PNG, ...)
+
+    The bytes are wrapped without copying, but cv2.imdecode allocates a new
+    frame per image; LetterboxBuffer then resizes it into its reusable input.
+    No PIL image or RGB copy is made on the way.
+    """
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Not a decodable image")
+    return frame
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching for request / response inference (/predict)
+
+    Concurrent requests put their frames on one queue; a worker coalesces
+    them into detector calls of up to max_batch frames, waiting at most
+    max_wait seconds after the first frame of a batch for it to fill. Frames
+    arriving while the detector runs form the next batch, so the batch size
+    grows with load. After a single-frame batch nothing is waited for (a lone
+    client pays no added latency) until batches of several frames show there
+    is concurrent load again. Detector calls run on a single worker thread,
+    off the event loop.
+    """
+
+    def __init__(self, detector, max_batch: int = 4, max_wait: float = 0.005, max_pending: int = 256):
+        """
+        Args:
+            detector: Detector with detect_batch_arrays (its max_batch should be >= max_batch)
+            max_batch: Maximum frames per detector call
+            max_wait: Seconds a partial batch waits for more frames
+            max_pending: Queued frames before submitters wait (backpressure)
+        """
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict-batcher")
+
+        self._last_batch = 0
+        self.batches_run = 0
+        self.frames_batched = 0
+        self.failed_batches = 0
+
+    def start(self):
+        """Start the batching task on the running event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def detect(self, frames: List[np.ndarray]) -> List[Detections]:
+        """Per-frame Detections; the frames may be spread over several batches"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for frame in frames:
+            future = loop.create_future()
+            await self._queue.put((frame, future))
+            futures.append(future)
+        METRICS.set_gauge('predict_queue_depth', self._queue.qsize())
+        return list(await asyncio.gather(*futures))
+
+    async def _next_batch(self) -> List:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + (self.max_wait if self._last_batch > 1 else 0.0)
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Requests that went away (client disconnected) are not run
+        return [(frame, future) for frame, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self._last_batch = len(batch)
+            METRICS.set_gauge('predict_queue_depth', self._queue.qsize())
+            if not batch:
+                continue
+            frames = [frame for frame, _ in batch]
+            try:
+                with METRICS.stage('predict'):
+                    results = await loop.run_in_executor(self._executor, self.detector.detect_batch_arrays, frames)
+            except Exception as e:
+                self.failed_batches += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.frames_batched += len(frames)
+            METRICS.inc('predict_frames', len(frames))
+            for (_, future), detections in zip(batch, results):
+                if not future.done():
+                    future.set_result(detections)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    def get_statistics(self) -> Dict:
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'batches_run': self.batches_run,
+            'frames_batched': self.frames_batched,
+            'avg_batch_size': round(self.frames_batched / self.batches_run, 2) if self.batches_run else 0.0,
+            'failed_batches': self.failed_batches,
+        }
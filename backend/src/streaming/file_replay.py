@@ -0,0 +1,143 @@
+import cv2
+import time
+from typing import Optional
+
+from src.streaming.video_source import VideoSource
+from src.utils.metrics import METRICS
+
+class FileReplaySource(VideoSource):
+    """
+    Deterministic "live" replay of a video file (demos and soak tests)
+
+    The clip is decoded once into memory (up to max_cache_bytes) so looping is
+    seamless and never re-opens the decoder; clips over the budget are streamed
+    from disk instead. Frames are paced to the source FPS times `speed` on a
+    monotonic clock, never dropped (block policy), and the first frame of every
+    pass is flagged so the scheduler resets tracking at the loop boundary.
+    Given the same clip and detector, every pass produces the same tracks.
+    """
+
+    def __init__(self, source_id: str, path: str, pipeline, speed: float = 1.0,
+                 max_cache_bytes: int = 512 * 1024 * 1024, queue_size: Optional[int] = None,
+                 loop: bool = True):
+        """
+        Args:
+            source_id: Unique name of the source
+            path: Video file to replay
+            pipeline: DroneDetectorTracker holding this source's per-source state
+            speed: Playback rate as a multiple of the source FPS (0 = as fast as possible)
+            max_cache_bytes: Memory budget for the decoded clip
+            queue_size: Maximum number of frames waiting for inference
+            loop: Restart from the first frame when the clip ends
+        """
+        super().__init__(source_id, path, pipeline, queue_size=queue_size, drop_policy='block', loop=loop)
+        self.speed = speed
+        self.max_cache_bytes = max_cache_bytes
+
+        self.frames = []  # decoded clip when it fits the budget
+        self.cached = False
+        self.source_fps = 30.0
+        self._cursor = 0
+        self._clock_start = None
+        self._emitted = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.cached or super().is_open
+
+    def open(self) -> bool:
+        """Decode the clip into the cache (or prepare streaming) and start the capture thread"""
+        capture = cv2.VideoCapture(self.uri)
+        if not capture.isOpened():
+            print(f"Warning: could not open source '{self.source_id}' ({self.uri})")
+            return False
+
+        self.source_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        cached_bytes = 0
+        while True:
+            success, frame = capture.read()
+            if not success:
+                self.cached = bool(self.frames)
+                break
+            cached_bytes += frame.nbytes
+            if cached_bytes > self.max_cache_bytes:
+                print(f"Clip for '{self.source_id}' exceeds {self.max_cache_bytes >> 20} MiB cache, streaming from disk")
+                self.frames = []
+                break
+            self.frames.append(frame)
+
+        if self.cached:
+            capture.release()
+            print(f"Cached {len(self.frames)} frames ({cached_bytes >> 20} MiB) for '{self.source_id}' "
+                  f"at {self.source_fps:.1f} fps x{self.speed:g}")
+        else:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.capture = capture
+
+        self._clock_start = None
+        self._start_capture()
+        return True
+
+    def release(self):
+        super().release()
+        self.frames = []
+        self.cached = False
+
+    def read(self) -> bool:
+        """Emit the next clip frame once its scheduled time has come"""
+        if not self.cached:
+            if not super().is_open:
+                return False
+            return self._read_streaming()
+
+        if self._cursor >= len(self.frames):
+            if not self.loop:
+                self._finish()
+                return False
+            self._cursor = 0
+            self._start_loop()
+
+        frame = self.frames[self._cursor]
+        self._cursor += 1
+        self._pace()
+        self.enqueue(self._captured(frame))
+        return True
+
+    def _read_streaming(self) -> bool:
+        """Clip too large to cache: decode from disk, seeking back to the start at the end"""
+        with METRICS.stage('decode'):
+            success, frame = self.capture.read()
+        if not success:
+            if not self.loop:
+                self._finish()
+                return False
+            self.read_failures += 1
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._start_loop()
+            return False
+
+        self._pace()
+        self.enqueue(self._captured(frame))
+        return True
+
+    def _pace(self):
+        """Sleep until frame N is due at clock_start + N / (fps * speed)"""
+        if self.speed <= 0:
+            return
+
+        now = time.perf_counter()
+        if self._clock_start is None:
+            self._clock_start = now
+        due = self._clock_start + self._emitted / (self.source_fps * self.speed)
+        self._emitted += 1
+        if due > now:
+            time.sleep(due - now)
+
+    def get_statistics(self) -> dict:
+        stats = super().get_statistics()
+        stats.update({
+            'replay_speed': self.speed,
+            'source_fps': round(self.source_fps, 2),
+            'cached_frames': len(self.frames),
+        })
+        return stats
@@ -0,0 +1,198 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.streaming.video_source import VideoSource
+from src.utils.boxes import Detections
+from src.utils.metrics import METRICS
+
+class InferenceScheduler:
+    """
+    Shares one detector between many video sources
+
+    Each source captures frames on its own thread; the scheduler thread builds
+    batches by taking at most one queued frame per source in round-robin order
+    (rotating the starting source each round so no camera is favoured), runs
+    a single detector call per batch and hands each frame's detections back to
+    its source's own tracking / behavior / alert pipeline.
+    """
+
+    def __init__(self, detector, max_batch: int = 4, idle_sleep: float = 0.005):
+        """
+        Args:
+            detector: Shared DroneDetector (its max_batch should be >= max_batch)
+            max_batch: Maximum frames per detector call
+            idle_sleep: Sleep when no source has a frame ready (seconds)
+        """
+        self.detector = detector
+        self.max_batch = max_batch
+        self.idle_sleep = idle_sleep
+
+        self.sources: Dict[str, VideoSource] = {}
+        self._sources_lock = threading.Lock()
+        self._step_lock = threading.Lock()  # sources are not released mid-batch
+        self._cursor = 0
+        self._thread = None
+        self._running = False
+        self._listeners = []
+
+        self.batches_run = 0
+        self.frames_batched = 0
+
+    def add_source(self, source: VideoSource) -> bool:
+        """Register and open a source"""
+        with self._sources_lock:
+            if source.source_id in self.sources:
+                raise ValueError(f"Source '{source.source_id}' already registered")
+            self.sources[source.source_id] = source
+        return source.open()
+
+    def remove_source(self, source_id: str) -> bool:
+        """Unregister and release a source"""
+        with self._sources_lock:
+            source = self.sources.pop(source_id, None)
+        if source is None:
+            return False
+        with self._step_lock:
+            source.release()
+            source.pipeline.close()
+        return True
+
+    def add_listener(self, listener: Callable):
+        """
+        Call listener(source_id, tracks, alerts, capture_time) for every processed
+        frame, on the scheduler thread (keep it short: it delays the next batch)
+        """
+        self._listeners.append(listener)
+
+    def get_source(self, source_id: str) -> Optional[VideoSource]:
+        return self.sources.get(source_id)
+
+    def start(self):
+        """Start the scheduling thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduling thread and release all sources"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        for source_id in list(self.sources):
+            self.remove_source(source_id)
+
+    def _run(self):
+        while self._running:
+            try:
+                busy = self.step()
+            except Exception as e:
+                # Never let one bad round stop every live source
+                print(f"Error in inference scheduler: {e}")
+                METRICS.inc('scheduler_errors')
+                busy = False
+            if not busy:
+                time.sleep(self.idle_sleep)
+
+    def _ordered_sources(self) -> List[VideoSource]:
+        """Sources in round-robin order, rotating the start each call"""
+        with self._sources_lock:
+            sources = list(self.sources.values())
+        if not sources:
+            return []
+        start = self._cursor % len(sources)
+        self._cursor += 1
+        return sources[start:] + sources[:start]
+
+    def step(self) -> bool:
+        """
+        Run one batch round
+
+        Returns:
+            True if any frame was processed
+        """
+        with self._step_lock:
+            return self._step()
+
+    def _step(self) -> bool:
+        sources = self._ordered_sources()
+
+        # One frame per source per batch keeps scheduling fair
+        batch = []
+        for source in sources:
+            if len(batch) >= self.max_batch:
+                break
+            item = source.next_frame()
+            if item is not None:
+                batch.append((source, item))
+
+        if not batch:
+            return False
+
+        self.process_batch(batch)
+        return True
+
+    def process_batch(self, batch):
+        """Detect on a batch of (source, CapturedFrame) and run each source's pipeline"""
+        crops, offsets, owners = [], [], []
+        for i, (source, item) in enumerate(batch):
+            if item.new_loop:
+                # File source wrapped around: don't carry track ids into the next pass
+                source.pipeline.reset_tracking()
+            frame = item.frame
+            try:
+                roi = source.pipeline.select_roi(frame)
+            except Exception as e:
+                print(f"Error selecting ROI for '{source.source_id}': {e}")
+                roi = (0, 0, frame.shape[1], frame.shape[0])
+            if roi is None:
+                continue
+            x1, y1, x2, y2 = roi
+            crops.append(frame[y1:y2, x1:x2])
+            offsets.append((x1, y1))
+            owners.append(i)
+
+        detections = [Detections() for _ in batch]
+        if crops:
+            start = time.perf_counter()
+            try:
+                results = self.detector.detect_batch_arrays(crops)
+            except Exception as e:
+                # e.g. a bad exported model, a shape mismatch or CUDA OOM: the batch gets no detections
+                print(f"Error running detector on a batch of {len(crops)}: {e}")
+                METRICS.inc('detect_errors')
+            else:
+                per_frame = (time.perf_counter() - start) / len(crops)
+                METRICS.observe('detect', per_frame)
+                for i, (dx, dy), result in zip(owners, offsets, results):
+                    detections[i] = result.offset(dx, dy)
+                    batch[i][0].pipeline.record_detect_time(per_frame)
+                self.batches_run += 1
+                self.frames_batched += len(crops)
+
+        for (source, item), frame_detections in zip(batch, detections):
+            # Annotation is skipped unless an MJPEG viewer wants annotated frames
+            annotate = source.annotating
+            try:
+                tracks, annotated_frame, alerts = source.pipeline.process_detections(item.frame, frame_detections,
+                                                                                      annotate=annotate)
+            except Exception as e:
+                print(f"Error processing frame from '{source.source_id}': {e}")
+                tracks, annotated_frame, alerts = None, item.frame if annotate else None, []
+            source.publish(annotated_frame, tracks, alerts, item.capture_time, frame=item.frame)
+            for listener in self._listeners:
+                try:
+                    listener(source.source_id, tracks, alerts, item.capture_time)
+                except Exception as e:
+                    print(f"Error in frame listener for '{source.source_id}': {e}")
+
+    def get_statistics(self) -> dict:
+        """Scheduler and per-source statistics"""
+        return {
+            'batches_run': self.batches_run,
+            'avg_batch_size': round(self.frames_batched / self.batches_run, 2) if self.batches_run else 0.0,
+            'sources': [source.get_statistics() for source in list(self.sources.values())],
+        }
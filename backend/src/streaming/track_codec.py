@@ -0,0 +1,91 @@
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.utils.boxes import Tracks
+from src.utils.recording import ALERT_LEVELS
+
+VERSION = 1
+
+# version, flags (reserved), track count, frame counter, capture time (epoch seconds)
+HEADER = struct.Struct('<BBHId')
+
+def _varint(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def encode_tracks(frame: int, timestamp: float, tracks: Optional[Tracks],
+                  levels: Optional[Dict[int, str]] = None) -> bytes:
+    """
+    One frame's tracks as a compact little-endian binary message
+
+    Layout after the 16-byte HEADER, tracks sorted by id (N = track count):
+        N x 4 float32  boxes x1, y1, x2, y2 in frame pixels (4-byte aligned)
+        N uint8        confidence x 255
+        N uint8        alert level, index into ALERT_LEVELS
+        N varint       track ids, delta-coded: the first id, then the gap to the previous one
+
+    About 19 bytes per track against ~90 for the same data as JSON.
+
+    Args:
+        frame: Frame counter of the stream (gaps mean frames the client missed)
+        timestamp: Capture time in epoch seconds, to line up with raw video frames
+        tracks: The frame's tracks (None for none)
+        levels: track_id -> alert level for tracks alerting in this frame; others are NORMAL
+    """
+    data = tracks.data if tracks is not None else np.empty((0, 6), dtype=np.float32)
+    ids = data[:, 0].astype(np.int64)
+    order = np.argsort(ids, kind='stable')
+    ids, data = ids[order], data[order]
+    count = len(ids)
+
+    message = bytearray(HEADER.pack(VERSION, 0, count, frame & 0xFFFFFFFF, timestamp))
+    message += np.ascontiguousarray(data[:, 1:5], dtype='<f4').tobytes()
+    message += np.clip(np.rint(data[:, 5] * 255), 0, 255).astype(np.uint8).tobytes()
+    levels = levels or {}
+    message += bytes(ALERT_LEVELS.index(levels.get(track_id, 'NORMAL')) for track_id in ids.tolist())
+    previous = 0
+    for track_id in ids.tolist():
+        _varint(track_id - previous, message)
+        previous = track_id
+    return bytes(message)
+
+def decode_tracks(message: bytes) -> Dict:
+    """Inverse of encode_tracks: {'frame', 'timestamp', 'tracks': [{track_id, bbox, conf, alert_level}]}"""
+    version, _, count, frame, timestamp = HEADER.unpack_from(message)
+    if version != VERSION:
+        raise ValueError(f"Unsupported track message version {version}")
+    offset = HEADER.size
+    boxes = np.frombuffer(message, dtype='<f4', count=count * 4, offset=offset).reshape(count, 4)
+    offset += count * 16
+    conf = np.frombuffer(message, dtype=np.uint8, count=count, offset=offset)
+    offset += count
+    levels = np.frombuffer(message, dtype=np.uint8, count=count, offset=offset)
+    offset += count
+
+    ids: List[int] = []
+    previous = 0
+    for _ in range(count):
+        value, shift = 0, 0
+        while True:
+            byte = message[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        previous += value
+        ids.append(previous)
+
+    return {
+        'frame': frame,
+        'timestamp': timestamp,
+        'tracks': [
+            {'track_id': track_id, 'bbox': boxes[i].tolist(), 'conf': round(conf[i] / 255, 3),
+             'alert_level': ALERT_LEVELS[levels[i]]}
+            for i, track_id in enumerate(ids)
+        ],
+    }
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from typing import Dict, List, Tuple
+
+from src.streaming.track_codec import encode_tracks
+from src.streaming.video_source import wall_time
+from src.utils.websockets import send_queued
+
+class TrackStream:
+    """
+    Per-frame track data of each source for /ws/tracks, for clients that draw
+    their own overlay on the raw video (/video_feed?raw=1)
+
+    An InferenceScheduler listener: every processed frame of a source with
+    viewers is encoded once (encode_tracks) on the scheduler thread and
+    handed to each viewer's queue on its event loop. Sources nobody watches
+    cost nothing. Queues hold a few frames; a slow viewer loses the oldest,
+    which the frame counter in each message makes visible.
+    """
+
+    def __init__(self, max_queue: int = 4):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._viewers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._frames: Dict[str, int] = {}
+
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.frames_dropped = 0
+
+    def on_frame(self, source_id: str, tracks, alerts: List[Dict], capture_time: float):
+        """InferenceScheduler listener (scheduler thread)"""
+        viewers = self._viewers.get(source_id)
+        if not viewers:
+            return
+        frame = self._frames[source_id] = self._frames.get(source_id, 0) + 1
+        levels = {alert['track_id']: alert['alert_level'] for alert in alerts}
+        message = encode_tracks(frame, wall_time(capture_time), tracks, levels)
+        for loop, queue in list(viewers):
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                pass  # viewer's event loop closed
+
+    def _offer(self, queue: asyncio.Queue, message: bytes):
+        if queue.full():
+            queue.get_nowait()
+            self.frames_dropped += 1
+        queue.put_nowait(message)
+
+    def _sent(self, message: bytes):
+        self.messages_sent += 1
+        self.bytes_sent += len(message)
+
+    async def serve(self, source_id: str, websocket):
+        """Stream a source's tracks to one accepted WebSocket until it disconnects"""
+        viewer = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_queue))
+        with self._lock:
+            self._viewers[source_id] = self._viewers.get(source_id, []) + [viewer]
+        try:
+            await send_queued(websocket, viewer[1], websocket.send_bytes, self._sent)
+        finally:
+            with self._lock:
+                remaining = [other for other in self._viewers.get(source_id, []) if other is not viewer]
+                if remaining:
+                    self._viewers[source_id] = remaining
+                else:
+                    self._viewers.pop(source_id, None)
+
+    def viewers(self, source_id: str) -> int:
+        return len(self._viewers.get(source_id, ()))
+
+    def get_statistics(self) -> Dict:
+        return {
+            'viewers': {source_id: len(viewers) for source_id, viewers in list(self._viewers.items())},
+            'messages_sent': self.messages_sent,
+            'bytes_sent': self.bytes_sent,
+            'frames_dropped': self.frames_dropped,
+        }
@@ -0,0 +1,285 @@
+import cv2
+import os
+import threading
+import time
+import numpy as np
+from collections import deque, namedtuple
+from typing import Optional, Union
+from src.utils.metrics import METRICS, LatencyHistogram
+
+DROP_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+# A frame as captured: index counts frames within the current loop of a file,
+# new_loop marks the first frame after a file source wrapped around
+CapturedFrame = namedtuple('CapturedFrame', ['frame', 'capture_time', 'index', 'new_loop'])
+
+# A processed frame as served to viewers: the raw frame, the annotated one (None
+# when nobody asked for annotation) and the capture time in epoch seconds
+FrameOutput = namedtuple('FrameOutput', ['frame', 'annotated', 'timestamp'])
+
+# perf_counter (capture times) to epoch seconds, fixed so every conversion agrees
+_WALL_CLOCK_OFFSET = time.time() - time.perf_counter()
+
+def wall_time(perf_time: float) -> float:
+    """Epoch seconds of a perf_counter timestamp such as CapturedFrame.capture_time"""
+    return perf_time + _WALL_CLOCK_OFFSET
+
+class VideoSource:
+    """
+    One camera / video input with its own tracking, behavior and alert state
+
+    A dedicated capture thread reads frames as they arrive, timestamps them
+    and keeps them in a small bounded ring, so slow inference never lets the
+    live source's own buffer back up. When the ring is full the drop policy
+    decides what happens:
+        drop_oldest: discard the oldest queued frame (live cameras, stay fresh)
+        drop_newest: discard the frame just read (keep continuity of the backlog)
+        block: stop reading until the scheduler catches up (files, no drops)
+    """
+
+    def __init__(self, source_id: str, uri: Union[str, int], pipeline,
+                 queue_size: Optional[int] = None, drop_policy: Optional[str] = None,
+                 loop: bool = True):
+        """
+        Args:
+            source_id: Unique name of the source
+            uri: File path, RTSP/HTTP URL, or device index (int or digit string)
+            pipeline: DroneDetectorTracker holding this source's per-source state
+            queue_size: Maximum number of frames waiting for inference; default is 1
+                        for live sources (newest frame only) and 4 for files
+            drop_policy: One of DROP_POLICIES; default is 'block' for files (no skipped
+                         frames) and 'drop_oldest' for live sources (stay fresh)
+            loop: Restart file sources from the beginning when they end
+        """
+        self.source_id = source_id
+        self.uri = int(uri) if isinstance(uri, str) and uri.isdigit() else uri
+        self.is_file = isinstance(self.uri, str) and os.path.exists(self.uri)
+
+        if drop_policy is None:
+            drop_policy = 'block' if self.is_file else 'drop_oldest'
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{drop_policy}', expected one of {DROP_POLICIES}")
+        self.pipeline = pipeline
+        self.queue_size = queue_size or (4 if self.is_file else 1)
+        self.drop_policy = drop_policy
+        self.loop = loop
+
+        self.capture = None
+        self.queue = deque()  # CapturedFrame
+        self.lock = threading.Lock()
+        self.frame_ready = threading.Condition(self.lock)
+        self.queue_space = threading.Condition(self.lock)
+        self._capture_thread = None
+        self._capturing = False
+        self.finished = False  # a non-looping file reached its end
+
+        # Latest processed output, served to viewers
+        self.latest_output: Optional[FrameOutput] = None
+        self.sequence = 0
+
+        # Counters
+        self.frames_read = 0
+        self.loops = 0
+        self._position = 0
+        self._new_loop = False
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.read_failures = 0
+        self.fps = 0.0
+        self._last_processed_at = None
+        self._latencies = deque(maxlen=100)
+        self.alert_latency = LatencyHistogram()  # capture -> alert emitted
+        self._annotate_until = 0.0
+
+    def open(self) -> bool:
+        """Open the underlying capture and start the capture thread"""
+        self.capture = cv2.VideoCapture(self.uri)
+        if not self.capture.isOpened():
+            print(f"Warning: could not open source '{self.source_id}' ({self.uri})")
+            return False
+
+        if not self.is_file:
+            # Keep the backend's own buffer minimal; freshness is handled here
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._start_capture()
+        return True
+
+    def _start_capture(self):
+        """Start the capture thread"""
+        self._capturing = True
+        self.finished = False
+        self._capture_thread = threading.Thread(target=self._capture_loop,
+                                                name=f"capture-{self.source_id}", daemon=True)
+        self._capture_thread.start()
+
+    def release(self):
+        """Stop the capture thread, release the capture and wake any waiting viewers"""
+        self._capturing = False
+        with self.lock:
+            self.queue_space.notify_all()
+        if self._capture_thread is not None:
+            self._capture_thread.join(timeout=5)
+            self._capture_thread = None
+
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+
+    def _capture_loop(self):
+        """Read frames continuously until released"""
+        while self._capturing:
+            if self.drop_policy == 'block':
+                with self.lock:
+                    while self._capturing and len(self.queue) >= self.queue_size:
+                        self.queue_space.wait(0.5)
+                if not self._capturing:
+                    break
+
+            if not self.read() and not self.finished:
+                time.sleep(0.01)
+
+    @property
+    def is_open(self) -> bool:
+        return self.capture is not None and self.capture.isOpened()
+
+    def read(self) -> bool:
+        """Read one frame into the queue, applying the drop policy"""
+        if not self.is_open:
+            return False
+
+        with METRICS.stage('decode'):
+            success, frame = self.capture.read()
+        if not success:
+            if self.is_file and not self.loop:
+                self._finish()
+                return False
+            self.read_failures += 1
+            if self.is_file:
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                self._start_loop()
+            return False
+
+        self.enqueue(self._captured(frame))
+        return True
+
+    def _finish(self):
+        """End of a non-looping file: stop the capture thread, queued frames are still served"""
+        self.finished = True
+        self._capturing = False
+
+    def _start_loop(self):
+        """Mark the next captured frame as the start of a new pass over a file"""
+        self.loops += 1
+        self._position = 0
+        self._new_loop = True
+
+    def _captured(self, frame: np.ndarray) -> CapturedFrame:
+        """Timestamp a frame at capture and advance the position counters"""
+        item = CapturedFrame(frame, time.perf_counter(), self._position, self._new_loop)
+        self.frames_read += 1
+        self._position += 1
+        self._new_loop = False
+        return item
+
+    def enqueue(self, item: CapturedFrame):
+        """Add a frame to the queue, applying the drop policy when full"""
+        with self.lock:
+            if len(self.queue) >= self.queue_size:
+                self.frames_dropped += 1
+                METRICS.inc('dropped_frames', source=self.source_id)
+                if self.drop_policy == 'drop_newest':
+                    return
+                dropped = self.queue.popleft()
+                if dropped.new_loop:
+                    # Keep the loop boundary so the tracker is still reset
+                    item = item._replace(new_loop=True)
+            self.queue.append(item)
+
+    def next_frame(self):
+        """
+        Pop the next queued frame for inference
+
+        Returns:
+            CapturedFrame or None. With drop_oldest and the default ring of one
+            this is always the freshest frame captured.
+        """
+        with self.lock:
+            item = self.queue.popleft() if self.queue else None
+            if item is not None:
+                self.queue_space.notify()
+            return item
+
+    def want_annotated(self, hold: float = 2.0):
+        """
+        A viewer wants server-annotated frames for the next hold seconds
+        (re-requested by the viewer for every frame it takes)
+        """
+        self._annotate_until = time.perf_counter() + hold
+
+    @property
+    def annotating(self) -> bool:
+        """Whether processed frames should be annotated (only while a viewer wants them)"""
+        return time.perf_counter() < self._annotate_until
+
+    def publish(self, annotated_frame, tracks, alerts, capture_time: float, frame: Optional[np.ndarray] = None):
+        """
+        Store processed output and update fps / latency counters
+
+        Args:
+            annotated_frame: Annotated frame, None when annotation was skipped
+            frame: The raw frame (default: annotated_frame)
+        """
+        now = time.perf_counter()
+        raw = annotated_frame if frame is None else frame
+        with self.frame_ready:
+            self.latest_output = FrameOutput(raw, annotated_frame, wall_time(capture_time))
+            self.sequence += 1
+            self.frame_ready.notify_all()
+
+        self.frames_processed += 1
+        self._latencies.append(now - capture_time)
+        if alerts:
+            self.alert_latency.observe(now - capture_time)
+        if self._last_processed_at is not None:
+            interval = now - self._last_processed_at
+            if interval > 0:
+                self.fps = 1.0 / interval if self.fps == 0.0 else 0.9 * self.fps + 0.1 / interval
+        self._last_processed_at = now
+
+    def wait_for_output(self, last_sequence: int, timeout: float = 1.0):
+        """
+        Block until output newer than last_sequence is published
+
+        Returns:
+            (sequence, FrameOutput); output is None on timeout
+        """
+        with self.frame_ready:
+            if self.sequence == last_sequence:
+                self.frame_ready.wait(timeout)
+            if self.sequence == last_sequence:
+                return last_sequence, None
+            return self.sequence, self.latest_output
+
+    def get_statistics(self) -> dict:
+        """Per-source fps, latency and drop counters"""
+        latencies = np.array(self._latencies) * 1000
+        return {
+            'source_id': self.source_id,
+            'uri': str(self.uri),
+            'open': self.is_open,
+            'drop_policy': self.drop_policy,
+            'queue_depth': len(self.queue),
+            'frames_read': self.frames_read,
+            'loops': self.loops,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'read_failures': self.read_failures,
+            'finished': self.finished,
+            'fps': round(self.fps, 2),
+            'latency_ms_mean': round(float(latencies.mean()), 2) if len(latencies) else None,
+            'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+            'capture_to_alert_ms': self.alert_latency.snapshot(),
+        }
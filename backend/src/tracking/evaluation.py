@@ -0,0 +1,71 @@
+import numpy as np
+from typing import Dict, List
+from src.utils.boxes import Tracks, box_iou, greedy_match
+
+# Columns of per-frame ground-truth label rows
+LABEL_COLUMNS = ('target_id', 'x1', 'y1', 'x2', 'y2', 'suspicious')
+
+class TrackingEvaluator:
+    """
+    Scores tracker and alert output against per-frame ground truth
+
+    Each frame, tracks are matched one-to-one to labelled targets by IoU.
+    An ID switch is counted whenever a target is matched to a different track
+    id than the last time it was matched (CLEAR-MOT style). Alerts are scored
+    per frame and track: an alert on a track matched to a target labelled
+    suspicious is a true positive, any other alert a false positive, and a
+    suspicious target without an alert on its track a false negative.
+    """
+
+    def __init__(self, iou_threshold: float = 0.5):
+        self.iou_threshold = iou_threshold
+        self._last_track: Dict[int, int] = {}
+        self.id_switches = 0
+        self.targets_seen = 0
+        self.targets_matched = 0
+        self.true_positives = 0
+        self.false_positives = 0
+        self.false_negatives = 0
+
+    def update(self, labels: np.ndarray, tracks: Tracks, alerts: List[dict]):
+        """
+        Args:
+            labels: (G, 6) rows of LABEL_COLUMNS for this frame
+            tracks: Active tracks for this frame
+            alerts: Alerts generated on this frame
+        """
+        target_ids = labels[:, 0].astype(np.int64)
+        suspicious = labels[:, 5] > 0
+        track_ids = tracks.ids
+        matches = greedy_match(box_iou(labels[:, 1:5], tracks.boxes), self.iou_threshold)
+
+        target_of_track = {}
+        for g, t in matches:
+            target, track = int(target_ids[g]), int(track_ids[t])
+            previous = self._last_track.get(target)
+            if previous is not None and previous != track:
+                self.id_switches += 1
+            self._last_track[target] = track
+            target_of_track[track] = g
+
+        alerted = {alert['track_id'] for alert in alerts}
+        for track in alerted:
+            g = target_of_track.get(track)
+            if g is not None and suspicious[g]:
+                self.true_positives += 1
+            else:
+                self.false_positives += 1
+
+        hits = {g for track, g in target_of_track.items() if track in alerted}
+        self.false_negatives += sum(1 for g in np.flatnonzero(suspicious).tolist() if g not in hits)
+        self.targets_seen += len(labels)
+        self.targets_matched += len(matches)
+
+    def summary(self) -> Dict:
+        tp, fp, fn = self.true_positives, self.false_positives, self.false_negatives
+        return {
+            'id_switches': self.id_switches,
+            'coverage': round(self.targets_matched / self.targets_seen, 4) if self.targets_seen else None,
+            'precision': round(tp / (tp + fp), 4) if tp + fp else None,
+            'recall': round(tp / (tp + fn), 4) if tp + fn else None,
+        }
@@ -0,0 +1,102 @@
+import itertools
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from src.alerts.alert_manager import AlertManager
+from src.detection.base import Detector
+from src.detection.detector_with_tracking import DroneDetectorTracker
+from src.tracking.evaluation import TrackingEvaluator
+from src.utils.boxes import Detections
+from src.utils.recording import RecordingReader, load_labels
+
+# Sweepable parameters and the component each one configures
+TRACKER_PARAMETERS = ('iou_threshold', 'max_age', 'min_hits')
+BEHAVIOR_PARAMETERS = ('speed_threshold_pixels', 'radius_threshold', 'hover_min_frames')
+
+def expand_grid(grid: Dict[str, Sequence]) -> List[Dict]:
+    """{'iou_threshold': [0.2, 0.3], 'max_age': [30]} -> one dict per combination"""
+    unknown = set(grid) - set(TRACKER_PARAMETERS) - set(BEHAVIOR_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {sorted(unknown)}")
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def replay(detections: Sequence[Detections], config: Dict, restricted_zones=None,
+           labels: Optional[Sequence] = None) -> Dict:
+    """
+    Run the tracking / behavior / alert pipeline for one configuration over
+    recorded per-frame detections and summarize the outcome
+
+    Args:
+        detections: Per-frame raw detections
+        config: Values for any of TRACKER_PARAMETERS and BEHAVIOR_PARAMETERS
+        restricted_zones: Zone polygons for the behavior classifier
+        labels: Optional per-frame ground truth (see TrackingEvaluator)
+    """
+    tracker_params = {key: config[key] for key in TRACKER_PARAMETERS if key in config}
+    behavior_params = {key: config[key] for key in BEHAVIOR_PARAMETERS if key in config}
+    # Recorded detections are fed straight to process_detections; the detector is never called
+    pipeline = DroneDetectorTracker(detector=Detector(), restricted_zones=restricted_zones,
+                                    tracker_params=tracker_params, behavior_params=behavior_params)
+    pipeline.alert_manager = AlertManager(log_file=None)
+    evaluator = TrackingEvaluator() if labels is not None else None
+
+    levels = Counter()
+    start = time.perf_counter()
+    for i, frame_detections in enumerate(detections):
+        # Replay on a copy: the pipeline may shift boxes in place
+        tracks, _, alerts = pipeline.process_detections(None, Detections(frame_detections.data.copy()),
+                                                        annotate=False)
+        levels.update(alert['alert_level'] for alert in alerts)
+        if evaluator is not None and i < len(labels):
+            evaluator.update(labels[i], tracks, alerts)
+    elapsed = time.perf_counter() - start
+
+    result = {
+        **config,
+        'alerts': sum(levels.values()),
+        'high': levels['HIGH'],
+        'medium': levels['MEDIUM'],
+        'low': levels['LOW'],
+        'tracks_created': pipeline.tracker.next_id,
+        'fps': round(len(detections) / elapsed, 1) if elapsed else None,
+    }
+    if evaluator is not None:
+        result.update(evaluator.summary())
+    return result
+
+# Per-worker inputs, loaded once by _init_worker instead of pickled with every task
+_worker = {}
+
+def _init_worker(recording: str, labels_path: Optional[str], restricted_zones):
+    _worker['detections'] = RecordingReader(recording).detections()
+    _worker['labels'] = load_labels(labels_path) if labels_path else None
+    _worker['zones'] = restricted_zones
+
+def _run_config(config: Dict) -> Dict:
+    return replay(_worker['detections'], config, _worker['zones'], _worker['labels'])
+
+def sweep(recording: str, grid: Dict[str, Sequence], labels_path: Optional[str] = None,
+          restricted_zones=None, workers: Optional[int] = None) -> List[Dict]:
+    """
+    Evaluate every combination in grid against a PipelineRecorder recording,
+    one configuration per task across a pool of worker processes
+
+    Returns:
+        One result dict per configuration, in grid order
+    """
+    configs = expand_grid(grid)
+    if restricted_zones is None:
+        restricted_zones = RecordingReader(recording).metadata.get('restricted_zones')
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+
+    if workers <= 1:
+        _init_worker(recording, labels_path, restricted_zones)
+        return [_run_config(config) for config in configs]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(recording, labels_path, restricted_zones)) as pool:
+        return list(pool.map(_run_config, configs))
@@ -1,6 +1,6 @@
 import numpy as np
-from collections import defaultdict, deque
 from typing import List, Tuple, Dict
+from src.utils.boxes import Detections, Tracks, box_iou, greedy_match
 
 class SimpleTracker:
     """
@@ -33,11 +33,23 @@ class SimpleTracker:
         Returns:
             List of active tracks: [(track_id, x1, y1, x2, y2, confidence), ...]
         """
+        return self.update_array(Detections.from_tuples(detections)).to_tuples()
+
+    def update_array(self, detections: Detections) -> Tracks:
+        """
+        Update tracks with new detections (columnar fast path)
+        
+        Args:
+            detections: Detections for the current frame
+        
+        Returns:
+            Tracks: active tracks as an (N, 6) array of track_id, x1, y1, x2, y2, conf
+        """
         self.frame_count += 1
         
         # Match detections to existing tracks
-        if detections and self.tracks:
-            matches, unmatched_detections, unmatched_tracks = self._match(detections)
+        if len(detections) and self.tracks:
+            matches, unmatched_detections, unmatched_tracks = self._match(detections.boxes)
         else:
             matches = []
             unmatched_detections = list(range(len(detections)))
@@ -45,11 +57,11 @@ class SimpleTracker:
         
         # Update matched tracks
         for det_idx, track_id in matches:
-            self.tracks[track_id].update(detections[det_idx], self.frame_count)
+            self.tracks[track_id].update(detections.data[det_idx], self.frame_count)
         
         # Create new tracks for unmatched detections
         for det_idx in unmatched_detections:
-            self._create_track(detections[det_idx])
+            self._create_track(detections.data[det_idx])
         
         # Mark unmatched tracks as lost
         for track_id in unmatched_tracks:
@@ -61,65 +73,20 @@ class SimpleTracker:
         # Return confirmed tracks
         return self._get_active_tracks()
     
-    def _match(self, detections):
+    def _match(self, det_boxes):
         """Match detections to tracks using IoU"""
-        iou_matrix = np.zeros((len(detections), len(self.tracks)))
-        
         track_ids = list(self.tracks.keys())
-        for d_idx, det in enumerate(detections):
-            for t_idx, track_id in enumerate(track_ids):
-                track_bbox = self.tracks[track_id].bbox
-                iou_matrix[d_idx, t_idx] = self._calculate_iou(det[:4], track_bbox)
+        track_boxes = np.array([self.tracks[track_id].bbox for track_id in track_ids], dtype=np.float32)
+        pairs = greedy_match(box_iou(det_boxes, track_boxes), self.iou_threshold)
         
-        # Simple greedy matching
-        matches = []
-        unmatched_detections = list(range(len(detections)))
-        unmatched_tracks = list(range(len(track_ids)))
-        
-        while True:
-            if iou_matrix.size == 0:
-                break
-            
-            max_iou = iou_matrix.max()
-            if max_iou < self.iou_threshold:
-                break
-            
-            d_idx, t_idx = np.unravel_index(iou_matrix.argmax(), iou_matrix.shape)
-            matches.append((d_idx, track_ids[t_idx]))
-            
-            unmatched_detections.remove(d_idx)
-            unmatched_tracks.remove(t_idx)
-            
-            iou_matrix[d_idx, :] = 0
-            iou_matrix[:, t_idx] = 0
-        
-        unmatched_tracks = [track_ids[i] for i in unmatched_tracks]
+        matched_detections = {d_idx for d_idx, _ in pairs}
+        matched_tracks = {t_idx for _, t_idx in pairs}
+        matches = [(d_idx, track_ids[t_idx]) for d_idx, t_idx in pairs]
+        unmatched_detections = [i for i in range(len(det_boxes)) if i not in matched_detections]
+        unmatched_tracks = [track_id for i, track_id in enumerate(track_ids) if i not in matched_tracks]
         
         return matches, unmatched_detections, unmatched_tracks
     
-    def _calculate_iou(self, bbox1, bbox2):
-        """Calculate IoU between two bboxes"""
-        x1_1, y1_1, x2_1, y2_1 = bbox1
-        x1_2, y1_2, x2_2, y2_2 = bbox2
-        
-        # Intersection
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
-        
-        if x2_i < x1_i or y2_i < y1_i:
-            return 0.0
-        
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
-        
-        # Union
-        area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
-        area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
-        union = area1 + area2 - intersection
-        
-        return intersection / union if union > 0 else 0.0
-    
     def _create_track(self, detection):
         """Create new track"""
         track = Track(self.next_id, detection, self.frame_count)
@@ -136,52 +103,96 @@ class SimpleTracker:
         for track_id in dead_tracks:
             del self.tracks[track_id]
     
-    def _get_active_tracks(self):
+    def _get_active_tracks(self) -> Tracks:
         """Get confirmed active tracks"""
-        active = []
-        for track_id, track in self.tracks.items():
-            if track.hits >= self.min_hits:
-                active.append((track_id, *track.bbox, track.confidence))
-        return active
+        active = [track for track in self.tracks.values() if track.hits >= self.min_hits]
+        data = np.empty((len(active), 6), dtype=np.float32)
+        for i, track in enumerate(active):
+            data[i, 0] = track.track_id
+            data[i, 1:5] = track.bbox
+            data[i, 5] = track.confidence
+        return Tracks(data)
     
     def get_track_history(self, track_id):
         """Get trajectory history for a track"""
         if track_id in self.tracks:
-            return list(self.tracks[track_id].history)
+            return [tuple(point) for point in self.tracks[track_id].history.tolist()]
         return []
 
+    def get_track_history_array(self, track_id) -> np.ndarray:
+        """Get trajectory history as a (K, 3) array of frame_num, center_x, center_y"""
+        if track_id in self.tracks:
+            return self.tracks[track_id].history
+        return np.empty((0, 3))
+
+    def get_predicted_boxes(self):
+        """
+        Predict where each live track will be on the next frame
+
+        Returns:
+            List of predicted boxes: [(x1, y1, x2, y2), ...]
+        """
+        return [track.predict(self.frame_count + 1) for track in self.tracks.values()]
+
 
 class Track:
     """Single tracked object"""
     
+    HISTORY_SIZE = 100  # Keep last 100 positions
+    
     def __init__(self, track_id, detection, frame_num):
         self.track_id = track_id
-        self.bbox = detection[:4]  # x1, y1, x2, y2
-        self.confidence = detection[4]
+        self.bbox = np.array(detection[:4], dtype=np.float32)  # x1, y1, x2, y2
+        self.confidence = float(detection[4])
         self.hits = 1
         self.age = 0
         self.last_seen = frame_num
         
-        # Trajectory history: [(frame_num, center_x, center_y), ...]
-        center = self._get_center(self.bbox)
-        self.history = deque(maxlen=100)  # Keep last 100 positions
-        self.history.append((frame_num, *center))
+        # Trajectory history: ring of (frame_num, center_x, center_y) rows,
+        # _next is the row the next point is written to
+        self._history = np.empty((self.HISTORY_SIZE, 3))
+        self._length = 0
+        self._next = 0
+        self._append_history(frame_num)
+    
+    @property
+    def history(self) -> np.ndarray:
+        """(K, 3) trajectory, oldest first (a view until the ring wraps), valid until the next update"""
+        if self._length < self.HISTORY_SIZE:
+            return self._history[:self._length]
+        return np.roll(self._history, -self._next, axis=0)
     
     def update(self, detection, frame_num):
         """Update track with new detection"""
-        self.bbox = detection[:4]
-        self.confidence = detection[4]
+        self.bbox = np.array(detection[:4], dtype=np.float32)
+        self.confidence = float(detection[4])
         self.hits += 1
         self.last_seen = frame_num
-        
-        center = self._get_center(self.bbox)
-        self.history.append((frame_num, *center))
+        self._append_history(frame_num)
     
     def mark_lost(self):
         """Mark track as lost (not detected this frame)"""
         self.age += 1
+
+    def predict(self, frame_num):
+        """Extrapolate bbox to frame_num using the last observed velocity"""
+        x1, y1, x2, y2 = self.bbox.tolist()
+        if self._length < 2:
+            return (x1, y1, x2, y2)
+
+        f1, cx1, cy1 = self._history[self._next - 2].tolist()
+        f2, cx2, cy2 = self._history[self._next - 1].tolist()
+        if f2 == f1:
+            return (x1, y1, x2, y2)
+
+        steps = (frame_num - f2) / (f2 - f1)
+        dx = (cx2 - cx1) * steps
+        dy = (cy2 - cy1) * steps
+        return (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
     
-    def _get_center(self, bbox):
-        """Get center point of bbox"""
-        x1, y1, x2, y2 = bbox
-        return ((x1 + x2) / 2, (y1 + y2) / 2)
\ No newline at end of file
+    def _append_history(self, frame_num):
+        """Append the current bbox center, overwriting the oldest point when full"""
+        x1, y1, x2, y2 = self.bbox
+        self._history[self._next] = (frame_num, (x1 + x2) / 2, (y1 + y2) / 2)
+        self._next = (self._next + 1) % self.HISTORY_SIZE
+        self._length = min(self._length + 1, self.HISTORY_SIZE)
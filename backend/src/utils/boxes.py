@@ -0,0 +1,128 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Iterator, List, Sequence, Tuple
+
+def _as_rows(data, width: int) -> np.ndarray:
+    """Coerce data into a C-contiguous (N, width) float32 array"""
+    if data is None:
+        return np.empty((0, width), dtype=np.float32)
+    return np.ascontiguousarray(data, dtype=np.float32).reshape(-1, width)
+
+@dataclass
+class Detections:
+    """
+    Columnar detections for one frame
+
+    data is an (N, 6) float32 array with columns x1, y1, x2, y2, conf, cls.
+    """
+    data: np.ndarray = field(default=None)
+
+    def __post_init__(self):
+        self.data = _as_rows(self.data, 6)
+
+    @classmethod
+    def from_tuples(cls, detections: Sequence[Sequence[float]]) -> 'Detections':
+        """Build from [(x1, y1, x2, y2, conf), ...] or 6-tuples with a class id"""
+        data = np.zeros((len(detections), 6), dtype=np.float32)
+        for i, det in enumerate(detections):
+            data[i, :len(det)] = det[:6]
+        return cls(data)
+
+    @classmethod
+    def concatenate(cls, parts: List['Detections']) -> 'Detections':
+        """Stack several Detections (e.g. from multiple crops)"""
+        if not parts:
+            return cls()
+        return cls(np.concatenate([part.data for part in parts]))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[Tuple[float, float, float, float, float]]:
+        return iter(self.to_tuples())
+
+    @property
+    def boxes(self) -> np.ndarray:
+        """(N, 4) xyxy view"""
+        return self.data[:, :4]
+
+    @property
+    def conf(self) -> np.ndarray:
+        return self.data[:, 4]
+
+    @property
+    def cls(self) -> np.ndarray:
+        return self.data[:, 5]
+
+    def offset(self, dx: float, dy: float) -> 'Detections':
+        """Shift boxes in place by (dx, dy), e.g. to map crop coordinates back to the frame"""
+        self.data[:, 0:4:2] += dx
+        self.data[:, 1:4:2] += dy
+        return self
+
+    def to_tuples(self) -> List[Tuple[float, float, float, float, float]]:
+        """Legacy format: [(x1, y1, x2, y2, conf), ...]"""
+        return [tuple(row) for row in self.data[:, :5].tolist()]
+
+@dataclass
+class Tracks:
+    """
+    Columnar active tracks for one frame
+
+    data is an (N, 6) float32 array with columns track_id, x1, y1, x2, y2, conf.
+    Track ids are exact in float32 up to 2**24.
+    """
+    data: np.ndarray = field(default=None)
+
+    def __post_init__(self):
+        self.data = _as_rows(self.data, 6)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self) -> Iterator[Tuple[int, float, float, float, float, float]]:
+        return iter(self.to_tuples())
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.data[:, 0].astype(np.int64)
+
+    @property
+    def boxes(self) -> np.ndarray:
+        """(N, 4) xyxy view"""
+        return self.data[:, 1:5]
+
+    @property
+    def conf(self) -> np.ndarray:
+        return self.data[:, 5]
+
+    def to_tuples(self) -> List[Tuple[int, float, float, float, float, float]]:
+        """Legacy format: [(track_id, x1, y1, x2, y2, conf), ...]"""
+        return [(int(row[0]), *row[1:]) for row in self.data.tolist()]
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy arrays, returned as (N, M)"""
+    if len(boxes1) == 0 or len(boxes2) == 0:
+        return np.zeros((len(boxes1), len(boxes2)), dtype=np.float32)
+
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+def greedy_match(iou: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """Greedy one-to-one (row, col) matches in descending IoU order, all >= threshold"""
+    iou = iou.copy()
+    matches = []
+    while iou.size and iou.max() >= threshold:
+        r, c = np.unravel_index(iou.argmax(), iou.shape)
+        matches.append((int(r), int(c)))
+        iou[r, :] = 0
+        iou[:, c] = 0
+    return matches
@@ -0,0 +1,122 @@
+import codecs
+import json
+from typing import Any, AsyncIterator, List, Optional
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+# A decode error this close to the end of the buffered text may just be a
+# value cut off mid-token (literal, number, \u escape): wait for more data
+_TRUNCATION_WINDOW = 8
+
+class PayloadTooLarge(ValueError):
+    """Upload or single record over its size limit"""
+
+class RecordParser:
+    """
+    Incremental parser for a top-level JSON array, NDJSON, or concatenated /
+    single JSON values
+
+    Bytes are fed as they arrive and each record (array element, or top-level
+    value) is returned as soon as it is complete, so memory is bounded by the
+    largest record, not the upload. max_bytes caps the whole upload and
+    max_record_bytes a single record (PayloadTooLarge); malformed input
+    raises ValueError.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_record_bytes: int = 1 << 20):
+        self.max_bytes = max_bytes
+        self.max_record_bytes = max_record_bytes
+
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._array: Optional[bool] = None  # top-level array? (None until the first character)
+        self._closed = False  # array's closing bracket seen
+        self._expect_comma = False
+        self._after_comma = False
+
+        self.bytes = 0
+        self.records = 0
+
+    @property
+    def format(self) -> Optional[str]:
+        if self._array is None:
+            return None
+        return 'array' if self._array else 'ndjson'
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Records completed by chunk"""
+        self.bytes += len(chunk)
+        if self.max_bytes is not None and self.bytes > self.max_bytes:
+            raise PayloadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        """Remaining records at end of input; raises ValueError if the input is incomplete"""
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(b'', final=True)
+        self._pos = 0
+        records = self._drain(final=True)
+        if self._array and not self._closed:
+            raise ValueError("Unterminated JSON array")
+        return records
+
+    def _drain(self, final: bool) -> List[Any]:
+        records = []
+        buffer = self._buffer
+        while True:
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos >= len(buffer):
+                break
+
+            char = buffer[pos]
+            if self._array is None:
+                self._array = char == '['
+                if self._array:
+                    self._pos += 1
+                    continue
+            if self._closed:
+                raise ValueError(f"Unexpected data after the JSON array (after record {self.records})")
+            if self._array:
+                if char == ']' and not self._after_comma:
+                    self._closed = True
+                    self._pos += 1
+                    continue
+                if self._expect_comma:
+                    if char != ',':
+                        raise ValueError(f"Expected ',' or ']' after record {self.records}")
+                    self._pos += 1
+                    self._expect_comma, self._after_comma = False, True
+                    continue
+
+            try:
+                value, end = _DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                incomplete = e.msg.startswith('Unterminated string') or len(buffer) - e.pos <= _TRUNCATION_WINDOW
+                if final or not incomplete:
+                    raise ValueError(f"Invalid JSON in record {self.records}: {e.msg}")
+                break
+            if end == len(buffer) and not final and not isinstance(value, (dict, list)):
+                break  # a number may continue in the next chunk
+            self._pos = end
+            self._expect_comma, self._after_comma = bool(self._array), False
+            self.records += 1
+            records.append(value)
+
+        if len(buffer) - self._pos > self.max_record_bytes:
+            raise PayloadTooLarge(f"Record {self.records} exceeds {self.max_record_bytes} bytes")
+        return records
+
+async def iter_records(chunks: AsyncIterator[bytes], parser: Optional[RecordParser] = None) -> AsyncIterator[Any]:
+    """Records of a chunked JSON array / NDJSON stream, in order"""
+    parser = parser or RecordParser()
+    async for chunk in chunks:
+        for record in parser.feed(chunk):
+            yield record
+    for record in parser.close():
+        yield record
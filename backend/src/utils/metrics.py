@@ -0,0 +1,266 @@
+import bisect
+import os
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Default latency bucket upper bounds in milliseconds
+DEFAULT_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 150, 250, 500, 750, 1000, 2500, 5000, 10000)
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (cumulative-friendly, Prometheus style)
+
+    Recording is O(log buckets) with no allocation; percentiles are estimated
+    by linear interpolation inside the bucket that contains them.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self.counts = [0] * (len(self.buckets_ms) + 1)  # last bucket is +Inf
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """Record one latency sample given in seconds"""
+        value_ms = seconds * 1000.0
+        index = bisect.bisect_left(self.buckets_ms, value_ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum_ms += value_ms
+            if value_ms > self.max_ms:
+                self.max_ms = value_ms
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate the q-th percentile (0-100) in milliseconds"""
+        with self._lock:
+            counts, total, max_ms = list(self.counts), self.total, self.max_ms
+        if total == 0:
+            return None
+
+        rank = q / 100.0 * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets_ms[i - 1] if i > 0 else 0.0
+                upper = self.buckets_ms[i] if i < len(self.buckets_ms) else max_ms
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return max_ms
+
+    def snapshot(self) -> Dict:
+        """Bucket counts and summary statistics"""
+        with self._lock:
+            counts, total, sum_ms, max_ms = list(self.counts), self.total, self.sum_ms, self.max_ms
+
+        labels: List[str] = [f"le_{bound:g}ms" for bound in self.buckets_ms] + ["le_inf"]
+        return {
+            'count': total,
+            'mean_ms': round(sum_ms / total, 2) if total else None,
+            'p50_ms': _round(self.percentile(50)),
+            'p95_ms': _round(self.percentile(95)),
+            'p99_ms': _round(self.percentile(99)),
+            'max_ms': round(max_ms, 2) if total else None,
+            'buckets': dict(zip(labels, counts)),
+        }
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+class RollingWindow:
+    """Last N samples in a preallocated ring, plus lifetime count and sum"""
+
+    def __init__(self, size: int = 2048):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.size = size
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % self.size
+        self.count += 1
+        self.total += value
+
+    def percentiles(self, quantiles: Sequence[float]) -> List[float]:
+        filled = self.samples[:min(self.count, self.size)]
+        if not len(filled):
+            return [0.0] * len(quantiles)
+        return np.percentile(filled, [q * 100 for q in quantiles]).tolist()
+
+class _NullStage:
+    """No-op timer used when metrics are disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _StageTimer:
+    __slots__ = ('registry', 'stage', 'start')
+
+    def __init__(self, registry: 'MetricsRegistry', stage: str):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+class MetricsRegistry:
+    """
+    Pipeline stage latencies (rolling percentiles), counters and gauges
+
+    Everything is a no-op when disabled, so instrumentation can stay in the
+    hot path. Rendered in the Prometheus text exposition format.
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, enabled: bool = True, prefix: str = 'uav', window: int = 2048):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.window = window
+        self.stages: Dict[str, RollingWindow] = {}
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.gauges: Dict[Tuple[str, Tuple], float] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        """Context manager timing one pipeline stage"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self, name)
+
+    def observe(self, stage: str, seconds: float):
+        """Record one stage duration in seconds"""
+        if not self.enabled:
+            return
+        with self._lock:
+            window = self.stages.get(stage)
+            if window is None:
+                window = self.stages[stage] = RollingWindow(self.window)
+            window.add(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter (name without the _total suffix)"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to its current value (queue depths, in-flight requests)"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+
+    def reset(self):
+        """Drop all samples, counters and gauges (e.g. between benchmark runs)"""
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def snapshot(self) -> Dict:
+        """Stage percentiles (ms), counters and gauges as plain data"""
+        with self._lock:
+            stages = {name: (window.percentiles(self.QUANTILES), window.count, window.total)
+                      for name, window in self.stages.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        return {
+            'stages': {
+                name: {
+                    **{f"p{int(q * 100)}_ms": round(v * 1000, 3) for q, v in zip(self.QUANTILES, values)},
+                    'count': count,
+                    'mean_ms': round(total / count * 1000, 3) if count else None,
+                }
+                for name, (values, count, total) in stages.items()
+            },
+            'counters': {_format_name(name, labels): value for (name, labels), value in counters.items()},
+            'gauges': {_format_name(name, labels): value for (name, labels), value in gauges.items()},
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition of stage summaries, counters and gauges"""
+        with self._lock:
+            stages = {name: (window.percentiles(self.QUANTILES), window.count, window.total)
+                      for name, window in self.stages.items()}
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        metric = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {metric} Pipeline stage latency (quantiles over the last {self.window} samples)",
+                 f"# TYPE {metric} summary"]
+        for name in sorted(stages):
+            values, count, total = stages[name]
+            for q, value in zip(self.QUANTILES, values):
+                lines.append(f'{metric}{{stage="{name}",quantile="{q:g}"}} {value:.6f}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {count}')
+
+        declared = set()
+        for (name, labels), value in counters:
+            full_name = f"{self.prefix}_{name}_total"
+            if full_name not in declared:
+                lines.append(f"# TYPE {full_name} counter")
+                declared.add(full_name)
+            lines.append(f"{full_name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), value in gauges:
+            full_name = f"{self.prefix}_{name}"
+            if full_name not in declared:
+                lines.append(f"# TYPE {full_name} gauge")
+                declared.add(full_name)
+            lines.append(f"{full_name}{_format_labels(labels)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+def render_histogram(name: str, histogram: LatencyHistogram, **labels) -> str:
+    """Prometheus text for a LatencyHistogram (values exported in seconds)"""
+    with histogram._lock:
+        counts, total, sum_ms = list(histogram.counts), histogram.total, histogram.sum_ms
+
+    base = tuple(sorted(labels.items()))
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(histogram.buckets_ms) + [None], counts):
+        cumulative += count
+        le = "+Inf" if bound is None else f"{bound / 1000:g}"
+        lines.append(f"{name}_bucket{_format_labels(base + (('le', le),))} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(base)} {sum_ms / 1000:.6f}")
+    lines.append(f"{name}_count{_format_labels(base)} {total}")
+    return "\n".join(lines) + "\n"
+
+def _escape_label(value) -> str:
+    """Label value as the text exposition format requires (source ids come from user input)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+def _format_name(name: str, labels: Tuple) -> str:
+    return name + _format_labels(labels)
+
+# Process-wide registry; METRICS_ENABLED=0 turns all instrumentation into no-ops (and /metrics into a 404)
+METRICS = MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "1") != "0")
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from typing import Awaitable, Dict, Iterable, Optional
+
+STARTING = 'starting'
+READY = 'ready'
+DISABLED = 'disabled'  # not configured or unreachable; the app runs without it
+FAILED = 'failed'
+
+class Readiness:
+    """
+    Startup state of the app's subsystems, for the /readyz probe
+
+    Subsystems initialize in the background after the server starts
+    accepting requests. Each one is 'starting' until its initialization
+    finishes, then 'ready', 'disabled' or 'failed' (with the error), along
+    with how long it took. The app is ready once nothing is starting and
+    every required subsystem is ready.
+    """
+
+    def __init__(self, required: Iterable[str] = ()):
+        self.required = tuple(required)
+        self.started = time.perf_counter()
+        self.subsystems: Dict[str, Dict] = {}
+
+    def mark(self, name: str, status: str, detail: Optional[str] = None):
+        entry = {'status': status, 'seconds': round(time.perf_counter() - self.started, 3)}
+        if detail:
+            entry['detail'] = detail
+        self.subsystems[name] = entry
+
+    def start(self, name: str, init: Awaitable) -> asyncio.Task:
+        """
+        Run a subsystem's initialization in the background: a truthy result
+        marks it ready, a falsy one disabled, an exception failed (logged,
+        not raised). The task's result is whether it became ready.
+        """
+        self.mark(name, STARTING)
+        return asyncio.get_running_loop().create_task(self._run(name, init))
+
+    async def _run(self, name: str, init: Awaitable) -> bool:
+        try:
+            ok = await init
+        except Exception as e:
+            print(f"Error initializing {name}: {e}")
+            self.mark(name, FAILED, str(e))
+            return False
+        self.mark(name, READY if ok else DISABLED)
+        return bool(ok)
+
+    @property
+    def ready(self) -> bool:
+        statuses = {name: entry['status'] for name, entry in self.subsystems.items()}
+        if STARTING in statuses.values():
+            return False
+        return all(statuses.get(name) == READY for name in self.required)
+
+    def snapshot(self) -> Dict:
+        return {
+            'ready': self.ready,
+            'required': list(self.required),
+            'uptime_seconds': round(time.perf_counter() - self.started, 3),
+            'subsystems': dict(self.subsystems),
+        }
@@ -0,0 +1,173 @@
+import json
+import os
+import numpy as np
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+from src.utils.boxes import Detections, Tracks
+
+# Alert levels as stored in recordings
+ALERT_LEVELS = ('NORMAL', 'LOW', 'MEDIUM', 'HIGH')
+
+# Columns of the per-frame behavior rows
+BEHAVIOR_COLUMNS = ('track_id', 'speed', 'speed_flag', 'hover_flag', 'zone_flag', 'level')
+
+INDEX_FILE = 'index.json'
+
+class PipelineRecorder:
+    """
+    Append-only recording of per-frame pipeline output
+
+    Frames are buffered and written as compressed NPZ chunks of chunk_frames
+    frames. Each chunk is columnar: all detections of the chunk in one (M, 6)
+    array, tracks in one (K, 6) array and behavior results in one (B, 6)
+    array, with per-frame offsets into each. index.json lists the chunks and
+    their frame ranges and is rewritten after every chunk, so a crash loses
+    at most the chunk being buffered.
+    """
+
+    def __init__(self, directory: str, chunk_frames: int = 1000, metadata: Optional[Dict] = None):
+        """
+        Args:
+            directory: Output directory (created; existing chunks are appended to)
+            chunk_frames: Frames per chunk file
+            metadata: Free-form run description stored in the index (source, model, ...)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunk_frames = chunk_frames
+
+        index_path = self.directory / INDEX_FILE
+        if index_path.exists():
+            with open(index_path) as f:
+                self.index = json.load(f)
+            self.index['metadata'].update(metadata or {})
+        else:
+            self.index = {'version': 1, 'metadata': metadata or {}, 'frames': 0, 'chunks': []}
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self._frames: List[int] = []
+        self._timestamps: List[float] = []
+        self._detections: List[np.ndarray] = []
+        self._tracks: List[np.ndarray] = []
+        self._behavior: List[np.ndarray] = []
+
+    def record(self, frame_num: int, detections: Detections, tracks: Tracks,
+               analyses: Sequence = (), timestamp: Optional[float] = None):
+        """Buffer one frame: raw detections, active tracks and BehaviorAnalysis results"""
+        behavior = np.empty((len(analyses), len(BEHAVIOR_COLUMNS)), dtype=np.float32)
+        for row, analysis in zip(behavior, analyses):
+            row[:] = (analysis.track_id, analysis.speed_value, analysis.speed_flag,
+                      analysis.hover_flag, analysis.zone_flag, ALERT_LEVELS.index(analysis.alert_level))
+
+        self._frames.append(frame_num)
+        self._timestamps.append(timestamp if timestamp is not None else np.nan)
+        self._detections.append(detections.data.copy())
+        self._tracks.append(tracks.data.copy())
+        self._behavior.append(behavior)
+
+        if len(self._frames) >= self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        """Write buffered frames as a new chunk and update the index"""
+        if not self._frames:
+            return
+
+        first = self.index['frames']
+        name = f"chunk-{len(self.index['chunks']):05d}.npz"
+        arrays = {'frames': np.asarray(self._frames, dtype=np.int64),
+                  'timestamps': np.asarray(self._timestamps, dtype=np.float64)}
+        for key, rows, width in (('detections', self._detections, 6), ('tracks', self._tracks, 6),
+                                 ('behavior', self._behavior, len(BEHAVIOR_COLUMNS))):
+            lengths = np.array([len(r) for r in rows], dtype=np.int64)
+            arrays[f'{key}_offsets'] = np.concatenate([[0], np.cumsum(lengths)])
+            arrays[key] = np.concatenate(rows).reshape(-1, width) if rows else np.empty((0, width), np.float32)
+
+        # Write then rename, so readers never see a partial chunk
+        tmp_path = self.directory / (name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, self.directory / name)
+
+        self.index['chunks'].append({'file': name, 'first_index': first, 'frames': len(self._frames)})
+        self.index['frames'] = first + len(self._frames)
+        self._write_index()
+        self._reset_buffer()
+
+    def _write_index(self):
+        tmp_path = self.directory / (INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.directory / INDEX_FILE)
+
+    def close(self):
+        self.flush()
+
+class RecordedFrame:
+    """One recorded frame (views into its chunk's arrays)"""
+    __slots__ = ('index', 'frame_num', 'timestamp', 'detections', 'tracks', 'behavior')
+
+    def __init__(self, index, frame_num, timestamp, detections, tracks, behavior):
+        self.index = index
+        self.frame_num = frame_num
+        self.timestamp = timestamp
+        self.detections = detections
+        self.tracks = tracks
+        self.behavior = behavior
+
+class RecordingReader:
+    """Read a PipelineRecorder directory chunk by chunk"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        with open(self.directory / INDEX_FILE) as f:
+            self.index = json.load(f)
+
+    @property
+    def metadata(self) -> Dict:
+        return self.index['metadata']
+
+    def __len__(self) -> int:
+        return self.index['frames']
+
+    def chunks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Raw chunk arrays, in order"""
+        for chunk in self.index['chunks']:
+            with np.load(self.directory / chunk['file']) as archive:
+                yield {key: archive[key] for key in archive.files}
+
+    def frames(self) -> Iterator[RecordedFrame]:
+        """Every recorded frame, in order"""
+        index = 0
+        for arrays in self.chunks():
+            det_off, trk_off, beh_off = (arrays['detections_offsets'], arrays['tracks_offsets'],
+                                         arrays['behavior_offsets'])
+            for i, frame_num in enumerate(arrays['frames'].tolist()):
+                yield RecordedFrame(
+                    index, frame_num, float(arrays['timestamps'][i]),
+                    Detections(arrays['detections'][det_off[i]:det_off[i + 1]]),
+                    Tracks(arrays['tracks'][trk_off[i]:trk_off[i + 1]]),
+                    arrays['behavior'][beh_off[i]:beh_off[i + 1]],
+                )
+                index += 1
+
+    def detections(self) -> List[Detections]:
+        """Per-frame raw detections (for ReplayDetector)"""
+        return [frame.detections for frame in self.frames()]
+
+def save_labels(path: str, frames: Sequence[np.ndarray]) -> None:
+    """
+    Save per-frame ground truth for a recording (one (G, 6) array of
+    target_id, x1, y1, x2, y2, suspicious per frame, aligned with its frames)
+    """
+    lengths = np.array([len(rows) for rows in frames], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    labels = np.concatenate(frames).reshape(-1, 6) if len(frames) else np.empty((0, 6))
+    np.savez_compressed(path, offsets=offsets, labels=labels.astype(np.float32))
+
+def load_labels(path: str) -> List[np.ndarray]:
+    """Load per-frame ground truth written by save_labels"""
+    with np.load(path) as archive:
+        offsets, labels = archive['offsets'], archive['labels']
+    return [labels[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
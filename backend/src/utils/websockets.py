@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+async def _until_closed(websocket):
+    # Incoming messages are ignored; returns once the client disconnects
+    while True:
+        message = await websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+
+async def send_queued(websocket, queue: asyncio.Queue, send: Callable[[Any], Awaitable],
+                      on_sent: Optional[Callable[[Any], None]] = None):
+    """
+    Send messages from queue with send (e.g. websocket.send_text) until the
+    client disconnects or a send fails; producers only ever touch the queue,
+    so a slow client never blocks them
+    """
+    receiver = asyncio.ensure_future(_until_closed(websocket))
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                return
+            message = getter.result()
+            await send(message)
+            if on_sent is not None:
+                on_sent(message)
+    except Exception:
+        pass  # client went away mid-send
+    finally:
+        receiver.cancel()
+
+class Broadcaster:
+    """
+    Fan-out of messages to accepted WebSockets, each with its own bounded
+    queue drained by send_queued: broadcast never waits on a client, and a
+    client that falls max_queue messages behind loses the oldest
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._clients: Set[asyncio.Queue] = set()
+
+        self.messages_sent = 0
+        self.dropped = 0
+
+    def broadcast(self, message: Any):
+        """Queue message for every client (event loop thread, never blocks)"""
+        for queue in list(self._clients):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+
+    async def serve(self, websocket, send: Optional[Callable[[Any], Awaitable]] = None):
+        """Send broadcasts to one accepted WebSocket (default send_text) until it disconnects"""
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self._clients.add(queue)
+        try:
+            await send_queued(websocket, queue, send or websocket.send_text, self._sent)
+        finally:
+            self._clients.discard(queue)
+
+    def _sent(self, message: Any):
+        self.messages_sent += 1
+
+    def get_statistics(self) -> Dict:
+        return {
+            'clients': len(self._clients),
+            'messages_sent': self.messages_sent,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# Add backend directory to path so imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.detection.stub_detectors import FixedCostDetector
+from src.streaming.batcher import MicroBatcher, decode_image
+
+def jpeg(width: int = 320, height: int = 240) -> bytes:
+    _, encoded = cv2.imencode('.jpg', np.full((height, width, 3), 128, dtype=np.uint8))
+    return encoded.tobytes()
+
+async def _test_coalescing():
+    detector = FixedCostDetector(setup_seconds=0.02, per_frame_seconds=0.001, max_batch=8)
+    batcher = MicroBatcher(detector, max_batch=8, max_wait=0.01)
+    batcher.start()
+    frame = decode_image(jpeg())
+    assert frame.shape == (240, 320, 3) and frame.dtype == np.uint8
+
+    # A lone request is run at once; 16 concurrent ones share about 2 calls
+    assert len(await batcher.detect([frame])) == 1 and detector.calls == 1
+    results = await asyncio.gather(*(batcher.detect([frame]) for _ in range(16)))
+    assert all(len(result) == 1 for result in results)
+    assert detector.calls - 1 <= 3, detector.calls
+
+    # Multi-image requests get one result per image, in order
+    assert len(await batcher.detect([frame] * 5)) == 5
+    stats = batcher.get_statistics()
+    assert stats['frames_batched'] == 22 and stats['avg_batch_size'] > 3, stats
+    await batcher.close()
+
+    try:
+        decode_image(b"not an image")
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+def test_coalescing():
+    asyncio.run(_test_coalescing())
+    print("Micro-batching test passed!")
+
+if __name__ == "__main__":
+    try:
+        test_coalescing()
+        print("Predict batching verification successful.")
+    except Exception as e:
+        print(f"Predict batching verification failed: {e}")
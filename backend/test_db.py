@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+from pymongo.errors import AutoReconnect
+
+# Add backend directory to path so imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.db.mongo import MongoStore
+from src.db.history import ANALYSIS_LOGS, JSON_UPLOAD_RECORDS, JSON_UPLOADS, ensure_collections
+from src.db.pagination import paginate
+from src.db.uploads import store_upload
+from src.utils.json_stream import PayloadTooLarge, RecordParser
+
+# Runs against the in-process fake unless MONGO_URI points at a real mongod
+MONGO_URI = os.getenv("MONGO_URI", "memory://")
+COLLECTION = "test_db_batches"
+
+class FlakyInsert:
+    """Fails the first `failures` calls with a transient error"""
+
+    def __init__(self, fn, failures):
+        self.fn = fn
+        self.failures = failures
+
+    def __call__(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("simulated failover")
+        return self.fn(*args, **kwargs)
+
+async def _test_store():
+    store = MongoStore(MONGO_URI, max_pool_size=8, backoff=0.01)
+    assert await store.connect(), "MongoDB not reachable"
+    collection = store.collection(COLLECTION)
+    await store.run(collection.raw.delete_many, {})
+
+    # Batched writes: 1200 documents in ceil(1200 / 500) insert_many calls
+    writer = store.batch_writer(COLLECTION, max_batch=500, flush_interval=0.05)
+    for i in range(1200):
+        writer.add({"seq": i, "timestamp": i})
+    await writer.flush()
+    assert writer.written == 1200, writer.get_statistics()
+    assert await collection.count_documents() == 1200
+
+    recent = await collection.find({}, {"_id": 0}, sort=[("timestamp", -1)], limit=3)
+    assert [doc["seq"] for doc in recent] == [1199, 1198, 1197]
+
+    # A retried batch that was already written counts as written, not duplicated
+    documents = [{"seq": -i} for i in range(1, 4)]
+    assert await collection.insert_many(documents) == 3
+    assert await collection.insert_many(documents) == 0
+    assert await collection.count_documents({"seq": {"$lt": 0}}) == 3
+
+    # Transient errors are retried with backoff
+    collection.raw.insert_one = FlakyInsert(collection.raw.insert_one, failures=2)
+    await collection.insert_one({"seq": "flaky"})
+    assert await collection.count_documents({"seq": "flaky"}) == 1
+
+    await store.run(collection.raw.delete_many, {})
+    await store.close()
+
+async def _test_pagination():
+    store = MongoStore(MONGO_URI, max_pool_size=4)
+    assert await store.connect(), "MongoDB not reachable"
+    collection = store.collection(COLLECTION)
+    await store.run(collection.raw.delete_many, {})
+
+    # Duplicate timestamps must neither repeat nor skip across page boundaries
+    await collection.insert_many([{"seq": i, "timestamp": i // 3} for i in range(100)])
+    seen, cursor = [], None
+    while True:
+        page, cursor = await paginate(collection, {}, "timestamp", 7, cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert sorted(doc["seq"] for doc in seen) == list(range(100))
+    assert [doc["timestamp"] for doc in seen] == sorted((doc["timestamp"] for doc in seen), reverse=True)
+
+    await store.run(collection.raw.delete_many, {})
+    await store.close()
+
+async def _test_string_timestamps():
+    store = MongoStore(MONGO_URI, max_pool_size=4)
+    assert await store.connect(), "MongoDB not reachable"
+    collection = store.collection(ANALYSIS_LOGS)
+    await store.run(collection.raw.delete_many, {"test_seq": {"$exists": True}})
+
+    # Legacy rows stored the ISO string, newer rows a date; interleaved in time
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    await collection.insert_many([
+        {"test_seq": i, "timestamp": (start + timedelta(minutes=i)).isoformat() if i % 2
+         else start + timedelta(minutes=i)}
+        for i in range(6)
+    ])
+    await ensure_collections(store)
+    # Idempotent: a second run has nothing left to convert
+    await ensure_collections(store)
+    assert await collection.count_documents({"test_seq": {"$exists": True}, "timestamp": {"$type": "string"}}) == 0
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = await paginate(collection, {"test_seq": {"$exists": True}}, "timestamp", 2, cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert [doc["test_seq"] for doc in seen] == [5, 4, 3, 2, 1, 0], seen
+    assert seen[0]["timestamp"] == start + timedelta(minutes=5)
+
+    await store.run(collection.raw.delete_many, {"test_seq": {"$exists": True}})
+    await store.close()
+
+async def _chunked(data: bytes, seed: int = 0):
+    """data split at random points (mid-token, mid-UTF-8 sequence)"""
+    rng = random.Random(seed)
+    position = 0
+    while position < len(data):
+        size = rng.randint(1, 97)
+        yield data[position:position + size]
+        position += size
+
+async def _test_upload_stream():
+    records = [{"seq": i, "rssi": -40.5 - i, "label": "dr\u00f6hne \"x\"", "flags": [True, None, 1e-3]}
+               for i in range(300)] + [7, "last"]
+    array = json.dumps(records, indent=1, ensure_ascii=False).encode()
+    ndjson = b"\n".join(json.dumps(record).encode() for record in records)
+
+    store = MongoStore(MONGO_URI)
+    assert await store.connect(), "MongoDB not reachable"
+    for data, expected_format in ((array, "array"), (ndjson, "ndjson")):
+        upload = await store_upload(store, _chunked(data), "capture.json", batch_size=64)
+        assert upload["format"] == expected_format and upload["records"] == len(records), upload
+        stored = await store.collection(JSON_UPLOAD_RECORDS).find({"upload_id": upload["_id"]}, sort=[("index", 1)])
+        assert [doc["data"] for doc in stored] == records
+
+    # Malformed and oversized uploads are rejected and leave nothing behind
+    before = await store.collection(JSON_UPLOAD_RECORDS).count_documents()
+    for data, error in ((array[:-5], ValueError), (array.replace(b"\"seq\"", b"seq", 1), ValueError),
+                        (b"[" + json.dumps({"blob": "x" * 5000}).encode() + b"]", PayloadTooLarge)):
+        try:
+            await store_upload(store, _chunked(data), "bad.json", batch_size=64, max_record_bytes=4096)
+            raise AssertionError("expected an error")
+        except error:
+            pass
+    assert await store.collection(JSON_UPLOAD_RECORDS).count_documents() == before
+    assert await store.collection(JSON_UPLOADS).count_documents() == 2
+
+    # Parser memory stays flat: ~14 MB streamed through, peak well under 1 MB
+    record = json.dumps({"seq": 0, "spectrum": [round(-90 + i * 0.1, 1) for i in range(200)]}).encode()
+    parser = RecordParser()
+    tracemalloc.start()
+    assert parser.feed(b"[") == []
+    parsed = 0
+    for _ in range(10000 // 64):
+        parsed += len(parser.feed(b",".join([record] * 64) + b","))
+    parsed += len(parser.feed(record + b"]")) + len(parser.close())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert parsed == 10000 // 64 * 64 + 1 and peak < 1 << 20, (parsed, peak)
+    await store.close()
+
+def test_store():
+    asyncio.run(_test_store())
+    print("MongoStore test passed!")
+
+def test_pagination():
+    asyncio.run(_test_pagination())
+    print("Pagination test passed!")
+
+def test_string_timestamps():
+    asyncio.run(_test_string_timestamps())
+    print("String timestamp migration test passed!")
+
+def test_upload_stream():
+    asyncio.run(_test_upload_stream())
+    print("Streaming upload test passed!")
+
+if __name__ == "__main__":
+    try:
+        test_store()
+        test_pagination()
+        test_string_timestamps()
+        test_upload_stream()
+        print("Database layer verification successful.")
+    except Exception as e:
+        print(f"Database layer verification failed: {e}")
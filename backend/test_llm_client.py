@@ -0,0 +1,157 @@
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+# Add backend directory to path so imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.db.mongo import MongoStore
+from src.llm.bulk import BulkAnalyzer, parse_records
+from src.llm.cache import CACHE_COLLECTION, ResponseCache, cache_key
+from src.llm.client import HTTPBackend, LLMClient, LLMError, LLMTimeout
+from src.llm.fake_server import create_app
+
+def make_client(fake_app, **kwargs) -> LLMClient:
+    backend = HTTPBackend("http://fake-llm", "gemini-2.0-flash", transport=httpx.ASGITransport(app=fake_app))
+    return LLMClient(backend, **kwargs)
+
+async def _test_concurrency_limit():
+    fake = create_app(latency=0.05)
+    client = make_client(fake, max_concurrency=4)
+    start = time.perf_counter()
+    replies = await asyncio.gather(*(client.generate(f"capture {i}") for i in range(20)))
+    elapsed = time.perf_counter() - start
+    assert all("Risk Score:" in reply for reply in replies)
+    assert fake.state.stats['max_in_flight'] <= 4, fake.state.stats
+    # 20 calls, 4 at a time, 50 ms each: about 5 rounds
+    assert elapsed >= 0.2, elapsed
+    await client.close()
+
+async def _test_retries():
+    fake = create_app(latency=0.0, error_rate=1.0, error_status=503)
+    client = make_client(fake, retries=2, backoff=0.01)
+    try:
+        await client.generate("always failing")
+        raise AssertionError("expected LLMError")
+    except LLMError as e:
+        assert e.status == 503
+    assert fake.state.stats['calls'] == 3 and client.retried == 2
+
+    # Client errors are not retried
+    fake.state.faults.update(error_status=400)
+    calls = fake.state.stats['calls']
+    try:
+        await client.generate("bad request")
+    except LLMError as e:
+        assert not e.retryable
+    assert fake.state.stats['calls'] == calls + 1
+
+    # Recovers once the fault clears
+    fake.state.faults.update(error_rate=0.0)
+    assert "Risk Score:" in await client.generate("healthy again")
+    await client.close()
+
+async def _test_timeouts():
+    fake = create_app(latency=0.0, hang_rate=1.0)
+    client = make_client(fake, timeout=0.1, retries=1, backoff=0.01)
+    try:
+        await client.generate("hangs")
+        raise AssertionError("expected LLMTimeout")
+    except LLMTimeout:
+        pass
+    assert client.timeouts == 2 and client.in_flight == 0
+    await client.close()
+
+async def _test_cache():
+    fake = create_app(latency=0.05)
+    client = make_client(fake)
+    store = MongoStore("memory://")
+    await store.connect()
+    cache = ResponseCache(max_entries=2, ttl=60, collection=store.collection(CACHE_COLLECTION))
+
+    capture = {"avg_power_db": -31.8, "burst_rate": 15.4, "bandwidth_mhz": 2.6}
+    nearly = {"bandwidth_mhz": 2.6001, "burst_rate": 15.41, "avg_power_db": -31.79}
+    key = cache_key("Analyze this RF signal capture.", capture, "gemini-2.0-flash")
+    assert key == cache_key("Analyze  this RF signal capture. ", nearly, "gemini-2.0-flash")
+    assert key != cache_key("Analyze this RF signal capture.", capture, "gemini-2.5-pro")
+
+    # Concurrent misses on one key make a single LLM call
+    results = await asyncio.gather(*(cache.get_or_compute(key, lambda: client.generate("same")) for _ in range(5)))
+    assert fake.state.stats['calls'] == 1
+    assert [cached for _, cached in results].count(False) == 1
+
+    # Evicted from the LRU but still served from the persistent tier
+    for other in ("a", "b"):
+        await cache.get_or_compute(other, lambda: client.generate(other))
+    _, cached = await cache.get_or_compute(key, lambda: client.generate("same"))
+    assert cached and cache.persistent_hits == 1 and fake.state.stats['calls'] == 3
+    stats = cache.get_statistics()
+    assert stats['hits'] == 5 and stats['saved_latency_seconds'] > 0, stats
+
+    await store.close()
+    await client.close()
+
+async def _test_bulk():
+    fake = create_app(latency=0.05)
+    client = make_client(fake)
+    store = MongoStore("memory://")
+    await store.connect()
+    logs = store.collection("analysis_logs")
+    ndjson = "\n".join(f'{{"avg_power_db": {-40 - i}, "burst_rate": {i % 7}}}' for i in range(25)).encode()
+    records = parse_records(ndjson)
+    assert records == parse_records(f"[{b','.join(ndjson.splitlines()).decode()}]".encode())
+
+    analyzer = BulkAnalyzer(client, "gemini-2.0-flash", collection=logs, batch_size=10)
+    lines = [line async for line in analyzer.run(records, "Analyze the following RF signal data.")]
+    results, summary = lines[:-1], lines[-1]['summary']
+    assert sorted(result['index'] for result in results) == list(range(25))
+    assert all(result['success'] and "Risk Score:" in result['analysis'] for result in results)
+    # 25 records, 10 per prompt: 3 LLM calls
+    assert fake.state.stats['calls'] == 3 and summary['llm_calls'] == 3, summary
+    assert summary['tokens_per_record'] > 0 and summary['records_per_second'] > 0, summary
+    assert await logs.count_documents({'bulk_id': summary['bulk_id']}) == 25
+
+    # Records left out of a batched reply fall back to single-record calls
+    fake.state.faults.update(omit_rate=0.5)
+    analyzer = BulkAnalyzer(client, "gemini-2.0-flash", batch_size=10)
+    lines = [line async for line in analyzer.run(records, "Analyze the following RF signal data.")]
+    summary = lines[-1]['summary']
+    assert summary['failed'] == 0 and summary['answered_by'] == {'llm': 25}, summary
+    assert summary['llm_calls'] > 3
+
+    await store.close()
+    await client.close()
+
+def test_concurrency_limit():
+    asyncio.run(_test_concurrency_limit())
+    print("LLM concurrency limit test passed!")
+
+def test_retries():
+    asyncio.run(_test_retries())
+    print("LLM retry test passed!")
+
+def test_cache():
+    asyncio.run(_test_cache())
+    print("LLM cache test passed!")
+
+def test_bulk():
+    asyncio.run(_test_bulk())
+    print("LLM bulk analysis test passed!")
+
+def test_timeouts():
+    asyncio.run(_test_timeouts())
+    print("LLM timeout test passed!")
+
+if __name__ == "__main__":
+    try:
+        test_concurrency_limit()
+        test_retries()
+        test_timeouts()
+        test_cache()
+        test_bulk()
+        print("LLM client verification successful.")
+    except Exception as e:
+        print(f"LLM client verification failed: {e}")
@@ -0,0 +1,108 @@
+import os
+import sys
+
+import numpy as np
+
+# Add backend directory to path so imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.detection.base import Detector
+from src.detection.detector_with_tracking import DroneDetectorTracker
+from src.detection.motion_gate import MotionGate
+from src.tracking.tracker import Track
+from src.utils.boxes import Detections
+
+WIDTH, HEIGHT = 640, 480
+
+def scene(blob=None) -> np.ndarray:
+    """Flat gray frame, with a white 40x40 square at blob=(x, y) if given"""
+    frame = np.full((HEIGHT, WIDTH, 3), 100, dtype=np.uint8)
+    if blob is not None:
+        x, y = blob
+        frame[y:y + 40, x:x + 40] = 255
+    return frame
+
+class CropDetector(Detector):
+    """Finds one 10x10 box at (5, 5) of every crop (nothing on full frames), and records the input sizes"""
+
+    def __init__(self):
+        self.shapes = []
+
+    def detect_array(self, frame):
+        self.shapes.append(frame.shape[:2])
+        if frame.shape[:2] == (HEIGHT, WIDTH):
+            return Detections()
+        return Detections([[5, 5, 15, 15, 0.9, 0]])
+
+def test_static_scene_skipped():
+    gate = MotionGate(full_frame_interval=0)
+    assert gate.check(scene()) == (0, 0, WIDTH, HEIGHT)  # first frame: no background yet
+    assert all(gate.check(scene()) is None for _ in range(10))
+    print("Static scene test passed!")
+
+def test_moving_blob_roi():
+    gate = MotionGate(full_frame_interval=0, padding=32)
+    gate.check(scene())
+    roi = gate.check(scene(blob=(300, 200)))
+    assert roi is not None and roi != (0, 0, WIDTH, HEIGHT), roi
+    x1, y1, x2, y2 = roi
+    # Covers the blob with at least the padding around it, and not much more
+    assert x1 <= 300 - 32 and y1 <= 200 - 32 and x2 >= 340 + 32 and y2 >= 240 + 32, roi
+    assert x1 >= 300 - 64 and y1 >= 200 - 64 and x2 <= 340 + 64 and y2 <= 240 + 64, roi
+
+    # Predicted track boxes are part of the ROI even where nothing moved
+    gate = MotionGate(full_frame_interval=0)
+    gate.check(scene())
+    assert gate.check(scene(), track_boxes=[(100, 100, 120, 120)]) == (68, 68, 152, 152)
+    print("Moving blob ROI test passed!")
+
+def test_periodic_full_frame():
+    gate = MotionGate(full_frame_interval=5)
+    results = [gate.check(scene()) for _ in range(10)]
+    full = [i + 1 for i, roi in enumerate(results) if roi == (0, 0, WIDTH, HEIGHT)]
+    assert full == [1, 5, 10], full
+    assert all(roi is None for i, roi in enumerate(results) if i + 1 not in full)
+    print("Periodic full-frame test passed!")
+
+def test_crop_offset():
+    detector = CropDetector()
+    pipeline = DroneDetectorTracker(detector=detector, motion_gate=MotionGate(full_frame_interval=0))
+    pipeline.alert_manager.log_file = None
+    pipeline.process_frame(scene())
+    tracks, _, _ = pipeline.process_frame(scene(blob=(300, 200)))
+
+    # Same frames through a fresh gate give the ROI the detector saw
+    gate = MotionGate(full_frame_interval=0)
+    gate.check(scene())
+    x1, y1, x2, y2 = gate.check(scene(blob=(300, 200)))
+    assert detector.shapes == [(HEIGHT, WIDTH), (y2 - y1, x2 - x1)], detector.shapes
+    # The box found at (5, 5) of the crop lands at the crop origin + (5, 5) in the frame
+    assert len(tracks) == 1 and np.allclose(tracks.boxes[0], [x1 + 5, y1 + 5, x1 + 15, y1 + 15]), tracks.boxes
+    print("Crop offset test passed!")
+
+def test_track_predict():
+    track = Track(0, [0, 0, 10, 10, 0.9], frame_num=1)
+    assert track.predict(2) == (0, 0, 10, 10)  # no velocity yet
+    track.update([4, 2, 14, 12, 0.9], frame_num=3)
+    # 2 px/frame in x, 1 px/frame in y, extrapolated 2 frames ahead
+    assert track.predict(5) == (8, 4, 18, 14), track.predict(5)
+
+    # History is a ring: past HISTORY_SIZE points the oldest are dropped, order is kept
+    for frame_num in range(4, Track.HISTORY_SIZE + 11):
+        track.update([frame_num, 0, frame_num + 10, 10, 0.9], frame_num)
+    history = track.history
+    assert len(history) == Track.HISTORY_SIZE and history[0, 0] == 11 and history[-1, 0] == Track.HISTORY_SIZE + 10
+    assert np.all(np.diff(history[:, 0]) == 1)
+    assert track.predict(Track.HISTORY_SIZE + 12) == (Track.HISTORY_SIZE + 12, 0, Track.HISTORY_SIZE + 22, 10)
+    print("Track predict test passed!")
+
+if __name__ == "__main__":
+    try:
+        test_static_scene_skipped()
+        test_moving_blob_roi()
+        test_periodic_full_frame()
+        test_crop_offset()
+        test_track_predict()
+        print("Motion gate verification successful.")
+    except Exception as e:
+        print(f"Motion gate verification failed: {e}")
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add backend directory to path so imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.state.backends import MemoryBackend, create_backend
+from src.state.shared import SharedState
+from src.state.stats_stream import StatsStream
+from src.utils.boxes import Tracks
+from src.utils.websockets import Broadcaster
+
+def tracks(*track_ids) -> Tracks:
+    return Tracks([[track_id, 0, 0, 10, 10, 0.9] for track_id in track_ids])
+
+def alert(level: str, track_id: int = 1, source_id: str = 'cam1') -> dict:
+    return {'track_id': track_id, 'alert_level': level, 'speed_flag': level == 'HIGH',
+            'hover_flag': False, 'zone_flag': level != 'LOW', 'source_id': source_id}
+
+async def _test_workers(url: str):
+    # Two workers sharing one backend: the owner of cam1 records, the other serves reads
+    owner = SharedState(create_backend(url), worker_id='a', lease_ttl=0.3, flush_interval=0.02)
+    reader = owner if url.startswith('memory') else SharedState(create_backend(url), worker_id='b',
+                                                                lease_ttl=0.3, flush_interval=0.02)
+    relayed = []
+
+    async def collect(message):
+        relayed.append(message)
+
+    reader.subscribe(collect)
+    owner.start()
+    reader.start()
+    await asyncio.sleep(0.05)
+
+    owner.on_frame('cam1', tracks(1, 2, 3), [alert('HIGH'), alert('LOW', 2)])
+    owner.on_frame('cam1', tracks(1, 2), [alert('MEDIUM')])
+    await asyncio.sleep(0.2)
+
+    stats = reader.alert_statistics()
+    assert stats['total_alerts'] == 3 and stats['high_alerts'] == 1 and stats['low_alerts'] == 1, stats
+    assert stats['speed_violations'] == 1 and stats['zone_violations'] == 2, stats
+    assert [a['alert_level'] for a in reader.recent_alerts(2)] == ['LOW', 'MEDIUM']
+    assert reader.occupancy() == {'cam1': 2} and reader.live_tracks() == {'cam1': [1, 2]}
+    assert [a['alert_level'] for a in relayed] == ['HIGH', 'LOW', 'MEDIUM'], relayed
+
+    owner.set_job('job1', {'status': 'processing', 'frames': 30})
+    assert reader.get_job('job1')['status'] == 'processing'
+    assert reader.get_job('missing') is None
+    # A finished job prunes those not updated for job_ttl
+    owner.job_ttl = 0.05
+    await asyncio.sleep(0.1)
+    owner.set_job('job2', {'status': 'complete'})
+    assert reader.get_job('job1') is None and reader.get_job('job2')['status'] == 'complete'
+
+    if reader is not owner:
+        # One owner per lease; the other takes over once it is released / expires
+        acquired = []
+        assert owner.own('source:cam1')
+        assert not reader.own('source:cam1', on_acquire=lambda: acquired.append(True))
+        await owner.close()
+        await asyncio.sleep(0.3)
+        assert acquired and reader.owns('source:cam1')
+    else:
+        await owner.close()
+    if reader is not owner:
+        await reader.close()
+
+class FlakyBackend(MemoryBackend):
+    """Memory backend that can't be written while down is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+
+    def write(self, **changes):
+        if self.down:
+            raise ConnectionError("backend unreachable")
+        super().write(**changes)
+
+def test_flush_retry():
+    # Nothing is lost to a failed flush: what wasn't written goes out with the next one
+    backend = FlakyBackend()
+    shared = SharedState(backend, max_pending=3)
+    backend.down = True
+    shared.on_frame('cam1', tracks(1), [alert('HIGH')])
+    shared.flush()
+    shared.on_frame('cam1', tracks(1, 2), [alert('LOW', 2)] * 3)
+    shared.flush()
+    assert shared.flush_errors == 2 and shared.dropped == 1
+    assert shared.alert_statistics()['total_alerts'] == 0
+    backend.down = False
+    shared.flush()
+    assert shared.alert_statistics()['total_alerts'] == 4
+    assert [a['alert_level'] for a in shared.recent_alerts()] == ['LOW'] * 3
+    assert shared.live_tracks() == {'cam1': [1, 2]}
+    assert [event['entered'] for _, event in backend.read('tracks', 0)] == [[1], [2]]
+    print("Flush retry test passed!")
+
+def test_pending_cap():
+    # Alerts waiting for the next flush are capped too, not only after a failed one
+    shared = SharedState(MemoryBackend(), max_pending=3)
+    shared.on_frame('cam1', tracks(1), [alert('HIGH')] * 2 + [alert('LOW')] * 3)
+    assert shared.dropped == 2
+    shared.flush()
+    assert shared.alert_statistics()['total_alerts'] == 5
+    assert [a['alert_level'] for a in shared.recent_alerts()] == ['LOW'] * 3
+    print("Pending cap test passed!")
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = asyncio.Event()
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def receive(self):
+        await self.closed.wait()
+        return {'type': 'websocket.disconnect'}
+
+class StalledWebSocket(FakeWebSocket):
+    """A client whose sends never complete"""
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+async def _test_slow_alert_client():
+    # A stalled /ws/alerts client neither holds up the others nor the relay
+    shared = SharedState(create_backend('memory://'), flush_interval=0.01)
+    broadcaster = Broadcaster(max_queue=4)
+
+    async def broadcast_alert(message):
+        broadcaster.broadcast(json.dumps(message))
+
+    shared.subscribe(broadcast_alert)
+    shared.start()
+    stalled, websocket = StalledWebSocket(), FakeWebSocket()
+    serving = [asyncio.ensure_future(broadcaster.serve(client)) for client in (stalled, websocket)]
+    await asyncio.sleep(0.05)
+    for track_id in range(10):
+        shared.on_frame('cam1', tracks(track_id), [alert('HIGH', track_id)])
+        await asyncio.sleep(0.02)
+    await asyncio.sleep(0.1)
+
+    assert [message['track_id'] for message in websocket.sent] == list(range(10)), websocket.sent
+    assert shared.alerts_relayed == 10 and broadcaster.dropped == 10 - 4 - 1, broadcaster.get_statistics()
+    # The stalled send never returns; its handler is cancelled when the connection drops
+    serving[0].cancel()
+    websocket.closed.set()
+    await asyncio.gather(*serving, return_exceptions=True)
+    assert broadcaster.get_statistics()['clients'] == 0
+    await shared.close()
+
+async def _test_renewal_with_stuck_relay():
+    # Leases are renewed even while a subscriber never returns
+    backend = create_backend('memory://')
+    owner = SharedState(backend, worker_id='a', lease_ttl=0.15, flush_interval=0.01)
+    other = SharedState(backend, worker_id='b', lease_ttl=0.15)
+
+    async def stuck(message):
+        await asyncio.Event().wait()
+
+    owner.subscribe(stuck)
+    owner.start()
+    assert owner.own('source:cam1')
+    owner.on_frame('cam1', tracks(1), [alert('HIGH')])
+    await asyncio.sleep(0.5)
+    assert not other.own('source:cam1') and owner.owns('source:cam1')
+    await owner.close()
+    assert other.own('source:cam1')
+    await other.close()
+
+async def _test_stats_stream():
+    shared = SharedState(create_backend('memory://'), flush_interval=0.01)
+    shared.on_frame('cam1', tracks(1), [alert('HIGH')])
+    shared.flush()
+    stream = StatsStream(shared, interval=0.05)
+    stream.start()
+    shared.start()
+    await asyncio.sleep(0.05)
+
+    websocket = FakeWebSocket()
+    serving = asyncio.ensure_future(stream.serve(websocket))
+    await asyncio.sleep(0.1)
+    # Track 3 enters and exits within one interval: no change to report
+    shared.on_frame('cam1', tracks(1, 2, 3), [alert('LOW', 2)] * 15)
+    shared.on_frame('cam1', tracks(2), [])
+    await asyncio.sleep(0.2)
+    await asyncio.sleep(0.2)  # idle: nothing more is sent
+    websocket.closed.set()
+    await serving
+
+    snapshot, delta = websocket.sent
+    assert snapshot['type'] == 'snapshot' and snapshot['counters']['total_alerts'] == 1, snapshot
+    assert snapshot['tracks'] == {'cam1': [1]} and len(snapshot['recent_alerts']) == 1
+    assert delta['seq'] == snapshot['seq'] + 1, delta
+    assert delta['counters'] == {'total_alerts': 15, 'low_alerts': 15}, delta
+    assert len(delta['alerts']) == 10 and delta['alerts_skipped'] == 5
+    assert delta['tracks'] == {'cam1': {'entered': [2], 'exited': [1]}} and delta['total_detections'] == 1
+
+    # A new client's snapshot matches the first snapshot plus the delta
+    assert stream.snapshot()['counters']['total_alerts'] == 16 and stream.snapshot()['tracks'] == {'cam1': [2]}
+    await stream.close()
+    await shared.close()
+
+async def _test_stats_stream_consistency():
+    # Another worker keeps writing while this one loads its snapshot: no alert is missed or counted twice
+    backend = create_backend('memory://')
+    writer = SharedState(backend, worker_id='a')
+    reader = SharedState(backend, worker_id='b', flush_interval=0.005)
+    stream = StatsStream(reader, interval=0.02)
+    stop = threading.Event()
+
+    def write():
+        while not stop.is_set():
+            writer.on_frame('cam1', tracks(1), [alert('HIGH')])
+            writer.flush()
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    # The relay is already running when the stream loads its model
+    reader.start()
+    await asyncio.sleep(0.05)
+    stream.start()
+    await asyncio.sleep(0.1)
+    stop.set()
+    thread.join()
+    await asyncio.sleep(0.1)
+
+    total = reader.alert_statistics()['total_alerts']
+    assert total > 20 and stream.snapshot()['counters']['total_alerts'] == total, (total, stream.snapshot())
+    await stream.close()
+    await reader.close()
+
+def test_shared_state():
+    asyncio.run(_test_workers('memory://'))
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_test_workers(f"sqlite:///{os.path.join(tmp, 'state.db')}"))
+    print("Shared state test passed!")
+
+def test_alert_relay():
+    asyncio.run(_test_slow_alert_client())
+    asyncio.run(_test_renewal_with_stuck_relay())
+    print("Alert relay test passed!")
+
+def test_stats_stream():
+    asyncio.run(_test_stats_stream())
+    asyncio.run(_test_stats_stream_consistency())
+    print("Stats stream test passed!")
+
+if __name__ == "__main__":
+    try:
+        test_shared_state()
+        test_flush_retry()
+        test_pending_cap()
+        test_alert_relay()
+        test_stats_stream()
+        print("Shared state verification successful.")
+    except Exception as e:
+        print(f"Shared state verification failed: {e}")
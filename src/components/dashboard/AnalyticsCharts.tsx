@@ -13,7 +13,7 @@ import {
   Pie,
   Cell
 } from "recharts";
-import { getStats, Stats } from "@/lib/api";
+import { subscribeStats, Stats } from "@/lib/api";
 
 interface AnalyticsChartsProps {
   initialStats?: any;
@@ -26,43 +26,36 @@ const AnalyticsCharts = ({ initialStats }: AnalyticsChartsProps) => {
   const [behaviorData, setBehaviorData] = useState<any[]>([]);
 
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const data = await getStats();
-        setStats(data);
+    const applyStats = (data: Stats) => {
+      setStats(data);
 
-        // Transform hourly_breakdown for chart (mock data to real structure)
-        if (data.hourly_breakdown) {
-          const chartData = data.hourly_breakdown.map((val: number, idx: number) => ({
-            time: `${idx}:00`,
-            detections: val,
-            threats: Math.floor(val * 0.2) // Mock threat data based on detections
-          }));
-          setTimelineData(chartData);
-        }
-
-        // Threat Distribution
-        setThreatDistribution([
-          { name: "Low", value: data.low_alerts || 0, color: "hsl(199, 89%, 48%)" },
-          { name: "Medium", value: data.medium_alerts || 0, color: "hsl(38, 92%, 50%)" },
-          { name: "High", value: data.high_alerts || 0, color: "hsl(0, 72%, 51%)" },
-        ]);
+      // Transform hourly_breakdown for chart (mock data to real structure)
+      if (data.hourly_breakdown) {
+        const chartData = data.hourly_breakdown.map((val: number, idx: number) => ({
+          time: `${idx}:00`,
+          detections: val,
+          threats: Math.floor(val * 0.2) // Mock threat data based on detections
+        }));
+        setTimelineData(chartData);
+      }
 
-        // Behavior Pattern (Mock for now or derive if backend provides)
-        setBehaviorData([
-          { pattern: "Speeding", count: data.speed_violations || 0 },
-          { pattern: "Hovering", count: data.hover_detections || 0 },
-          { pattern: "In Zone", count: data.zone_violations || 0 },
-        ]);
+      // Threat Distribution
+      setThreatDistribution([
+        { name: "Low", value: data.low_alerts || 0, color: "hsl(199, 89%, 48%)" },
+        { name: "Medium", value: data.medium_alerts || 0, color: "hsl(38, 92%, 50%)" },
+        { name: "High", value: data.high_alerts || 0, color: "hsl(0, 72%, 51%)" },
+      ]);
 
-      } catch (error) {
-        console.error("Failed to load stats", error);
-      }
+      // Behavior Pattern (Mock for now or derive if backend provides)
+      setBehaviorData([
+        { pattern: "Speeding", count: data.speed_violations || 0 },
+        { pattern: "Hovering", count: data.hover_detections || 0 },
+        { pattern: "In Zone", count: data.zone_violations || 0 },
+      ]);
     };
 
-    fetchData();
-    const interval = setInterval(fetchData, 2000); // Poll every 2s for "real-time" feel
-    return () => clearInterval(interval);
+    // Pushed by the backend as things change instead of polling /stats
+    return subscribeStats(applyStats);
   }, []);
 
   return (
@@ -1,23 +1,116 @@
-import React from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
-import { API_BASE_URL } from "@/lib/api";
+import { RawFrame, TrackBox, TrackFrame, subscribeRawFeed, subscribeTracks } from "@/lib/api";
+
+// Box colors per alert level (NORMAL is green, as in the server-side annotation)
+const LEVEL_COLORS: Record<string, string> = {
+  NORMAL: "rgb(0, 255, 0)",
+  LOW: "rgb(255, 255, 0)",
+  MEDIUM: "rgb(255, 165, 0)",
+  HIGH: "rgb(255, 0, 0)",
+};
+
+// Track messages kept for matching frames, how long a frame waits for its tracks, and
+// how close the newest tracks must be to stand in for a frame's own (seconds)
+const MAX_TRACK_FRAMES = 64;
+const MATCH_WAIT_MS = 200;
+const FALLBACK_MAX_AGE = 0.5;
+
+// X-Timestamp is printed with 6 decimals, the track message carries the float64
+const sameFrame = (a: number, b: number) => Math.abs(a - b) < 1e-5;
 
 const VideoPanel: React.FC = () => {
+  const canvasRef = useRef<HTMLCanvasElement>(null);
+  const [connected, setConnected] = useState(false);
+
+  // Raw frames and their tracks arrive separately (MJPEG and /ws/tracks); each frame is
+  // drawn with the track message of the same capture time, so boxes stay on the frame
+  // they were detected in. The server skips annotating frames for this view.
+  useEffect(() => {
+    const trackFrames: TrackFrame[] = [];
+    let pending: { frame: RawFrame; timer: ReturnType<typeof setTimeout> } | null = null;
+
+    // Boxes for a frame whose tracks never came (e.g. the track socket is reconnecting)
+    const fallbackTracks = (timestamp: number): TrackBox[] => {
+      const newest = trackFrames[trackFrames.length - 1];
+      return newest && Math.abs(newest.timestamp - timestamp) < FALLBACK_MAX_AGE ? newest.tracks : [];
+    };
+
+    const draw = ({ image }: RawFrame, tracks: TrackBox[]) => {
+      const canvas = canvasRef.current;
+      const ctx = canvas?.getContext("2d");
+      if (!canvas || !ctx) {
+        image.close();
+        return;
+      }
+      canvas.width = canvas.clientWidth;
+      canvas.height = canvas.clientHeight;
+      ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+      // Fit the frame like object-contain
+      const scale = Math.min(canvas.width / image.width, canvas.height / image.height);
+      const dx = (canvas.width - image.width * scale) / 2;
+      const dy = (canvas.height - image.height * scale) / 2;
+      ctx.drawImage(image, dx, dy, image.width * scale, image.height * scale);
+      image.close();
+
+      ctx.lineWidth = 2;
+      ctx.font = "12px monospace";
+      for (const track of tracks) {
+        const [x1, y1, x2, y2] = track.bbox;
+        const color = LEVEL_COLORS[track.alert_level] || LEVEL_COLORS.NORMAL;
+        ctx.strokeStyle = color;
+        ctx.fillStyle = color;
+        ctx.strokeRect(dx + x1 * scale, dy + y1 * scale, (x2 - x1) * scale, (y2 - y1) * scale);
+        ctx.fillText(`ID:${track.track_id} ${track.alert_level} (${track.conf.toFixed(2)})`, dx + x1 * scale, dy + y1 * scale - 4);
+      }
+    };
+
+    const flushPending = (tracks?: TrackBox[]) => {
+      if (!pending) return;
+      clearTimeout(pending.timer);
+      draw(pending.frame, tracks ?? fallbackTracks(pending.frame.timestamp));
+      pending = null;
+    };
+
+    const stopTracks = subscribeTracks((trackFrame) => {
+      trackFrames.push(trackFrame);
+      if (trackFrames.length > MAX_TRACK_FRAMES) trackFrames.shift();
+      if (pending && sameFrame(pending.frame.timestamp, trackFrame.timestamp)) {
+        flushPending(trackFrame.tracks);
+      }
+    });
+
+    const stopFeed = subscribeRawFeed((frame) => {
+      setConnected(true);
+      // A frame still waiting for its tracks is shown before the newer one
+      flushPending();
+      const match = trackFrames.find((trackFrame) => sameFrame(trackFrame.timestamp, frame.timestamp));
+      if (match) {
+        draw(frame, match.tracks);
+      } else {
+        // Tracks usually arrive first; give them a moment before falling back
+        pending = { frame, timer: setTimeout(() => flushPending(), MATCH_WAIT_MS) };
+      }
+    });
+
+    return () => {
+      stopTracks();
+      stopFeed();
+      if (pending) {
+        clearTimeout(pending.timer);
+        pending.frame.image.close();
+      }
+    };
+  }, []);
+
   return (
     <Card className="col-span-1 lg:col-span-2 h-[500px]">
       <CardHeader>
         <CardTitle>Live Surveillance Feed</CardTitle>
       </CardHeader>
       <CardContent className="p-0 flex items-center justify-center h-[calc(100%-4rem)] bg-black overflow-hidden relative">
-        <img
-          src={`${API_BASE_URL}/video_feed`}
-          alt="Live Stream"
-          className="w-full h-full object-contain"
-          onError={(e) => {
-            e.currentTarget.style.display = 'none';
-            // Show error state
-          }}
-        />
+        <canvas ref={canvasRef} className={`absolute inset-0 w-full h-full ${connected ? "" : "hidden"}`} />
         <div className="absolute top-4 right-4 bg-red-600 text-white px-2 py-1 rounded text-xs animate-pulse font-bold">
           LIVE
         </div>
@@ -26,4 +119,4 @@ const VideoPanel: React.FC = () => {
   );
 };
 
-export default VideoPanel;
\ No newline at end of file
+export default VideoPanel;
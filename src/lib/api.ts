@@ -57,6 +57,258 @@ export async function getStats(): Promise<Stats> {
     }
 }
 
+function emptyStats(): Stats {
+    return {
+        total_detections: 0,
+        current_occupancy: 0,
+        hourly_breakdown: new Array(24).fill(0),
+        total_alerts: 0,
+        high_alerts: 0,
+        medium_alerts: 0,
+        low_alerts: 0,
+        speed_violations: 0,
+        hover_detections: 0,
+        zone_violations: 0,
+        recent_alerts: [],
+    };
+}
+
+// Live stats from /ws/stats: a snapshot, then deltas (counter increments, new
+// alerts, track enter / exit) applied here. Reconnects, and so resyncs, after a
+// drop or a missed delta. Returns a function that closes the stream.
+export function subscribeStats(onStats: (stats: Stats) => void): () => void {
+    let ws: WebSocket;
+    let stats = emptyStats();
+    let tracks: Record<string, number[]> = {};
+    let seq = -1;
+    let stopped = false;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+
+    const connect = () => {
+        ws = new WebSocket(`${API_BASE_URL.replace("http", "ws")}/ws/stats`);
+
+        ws.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (message.type === "snapshot") {
+                tracks = message.tracks;
+                stats = {
+                    ...emptyStats(),
+                    ...message.counters,
+                    total_detections: message.total_detections,
+                    recent_alerts: message.recent_alerts,
+                };
+            } else if (message.seq !== seq + 1) {
+                ws.close(); // missed a delta: start over from a new snapshot
+                return;
+            } else {
+                const next: any = { ...stats };
+                for (const [field, amount] of Object.entries<number>(message.counters || {})) {
+                    next[field] = (next[field] || 0) + amount;
+                }
+                if (message.alerts) {
+                    next.recent_alerts = [...stats.recent_alerts, ...message.alerts].slice(-10);
+                }
+                if (message.tracks) {
+                    for (const [sourceId, change] of Object.entries<any>(message.tracks)) {
+                        const live = new Set(tracks[sourceId] || []);
+                        (change.entered || []).forEach((id: number) => live.add(id));
+                        (change.exited || []).forEach((id: number) => live.delete(id));
+                        tracks = { ...tracks, [sourceId]: [...live] };
+                    }
+                    next.total_detections = message.total_detections;
+                }
+                stats = next;
+            }
+            seq = message.seq;
+            onStats(stats);
+        };
+
+        ws.onclose = () => {
+            seq = -1;
+            if (!stopped) retry = setTimeout(connect, 2000);
+        };
+
+        ws.onerror = (err) => {
+            console.error("Stats WebSocket error:", err);
+        };
+    };
+
+    connect();
+    return () => {
+        stopped = true;
+        clearTimeout(retry);
+        ws.close();
+    };
+}
+
+export const ALERT_LEVELS = ["NORMAL", "LOW", "MEDIUM", "HIGH"] as const;
+
+export interface TrackBox {
+    track_id: number;
+    bbox: [number, number, number, number];
+    conf: number;
+    alert_level: typeof ALERT_LEVELS[number];
+}
+
+export interface TrackFrame {
+    frame: number;
+    timestamp: number; // capture time, epoch seconds (X-Timestamp of /video_feed?raw=1 parts)
+    tracks: TrackBox[];
+}
+
+// Decode one binary /ws/tracks message (see backend src/streaming/track_codec.py)
+export function decodeTracks(buffer: ArrayBuffer): TrackFrame {
+    const view = new DataView(buffer);
+    const count = view.getUint16(2, true);
+    const frame = view.getUint32(4, true);
+    const timestamp = view.getFloat64(8, true);
+    const boxes = new Float32Array(buffer, 16, count * 4);
+    const bytes = new Uint8Array(buffer);
+    let offset = 16 + count * 16;
+    const conf = bytes.subarray(offset, offset + count);
+    const levels = bytes.subarray(offset + count, offset + 2 * count);
+    offset += 2 * count;
+
+    const tracks: TrackBox[] = [];
+    let trackId = 0;
+    for (let i = 0; i < count; i++) {
+        let delta = 0;
+        let shift = 0;
+        let byte: number;
+        do {
+            byte = bytes[offset++];
+            delta += (byte & 0x7f) * 2 ** shift;
+            shift += 7;
+        } while (byte >= 0x80);
+        trackId += delta;
+        tracks.push({
+            track_id: trackId,
+            bbox: [boxes[i * 4], boxes[i * 4 + 1], boxes[i * 4 + 2], boxes[i * 4 + 3]],
+            conf: conf[i] / 255,
+            alert_level: ALERT_LEVELS[levels[i]],
+        });
+    }
+    return { frame, timestamp, tracks };
+}
+
+// Retry delays after a dropped connection: doubling from 1 s up to 30 s, back to 1 s once data flows
+function backoff() {
+    let delay = 1000;
+    return {
+        next: () => {
+            const current = delay;
+            delay = Math.min(delay * 2, 30000);
+            return current;
+        },
+        reset: () => {
+            delay = 1000;
+        },
+    };
+}
+
+// Per-frame tracks of a source (default: the first one) from /ws/tracks, reconnecting
+// when the socket drops (backend restart, or 4404 from a worker not running the source).
+// Returns a function that closes the stream.
+export function subscribeTracks(onFrame: (frame: TrackFrame) => void, sourceId?: string): () => void {
+    const path = sourceId ? `/ws/tracks/${encodeURIComponent(sourceId)}` : "/ws/tracks";
+    const delays = backoff();
+    let ws: WebSocket;
+    let stopped = false;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+
+    const connect = () => {
+        ws = new WebSocket(`${API_BASE_URL.replace("http", "ws")}${path}`);
+        ws.binaryType = "arraybuffer";
+        ws.onmessage = (event) => {
+            delays.reset();
+            onFrame(decodeTracks(event.data));
+        };
+        ws.onclose = () => {
+            if (!stopped) retry = setTimeout(connect, delays.next());
+        };
+        ws.onerror = (err) => console.error("Tracks WebSocket error:", err);
+    };
+
+    connect();
+    return () => {
+        stopped = true;
+        clearTimeout(retry);
+        ws.close();
+    };
+}
+
+export interface RawFrame {
+    image: ImageBitmap;
+    timestamp: number; // capture time, epoch seconds (matches TrackFrame.timestamp)
+}
+
+// Raw frames of a source with their capture times, parsed from the /video_feed?raw=1
+// MJPEG stream (an <img> can't expose the per-part X-Timestamp headers). Reconnects
+// like subscribeTracks. Returns a function that closes the stream.
+export function subscribeRawFeed(onFrame: (frame: RawFrame) => void, sourceId?: string): () => void {
+    const path = sourceId ? `/video_feed/${encodeURIComponent(sourceId)}` : "/video_feed";
+    const delays = backoff();
+    let controller: AbortController;
+    let stopped = false;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+
+    const read = async () => {
+        controller = new AbortController();
+        const response = await fetch(`${API_BASE_URL}${path}?raw=1`, { signal: controller.signal });
+        if (!response.ok || !response.body) throw new Error(`Error: ${response.statusText}`);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = new Uint8Array(0);
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) return;
+            const joined = new Uint8Array(buffer.length + value.length);
+            joined.set(buffer);
+            joined.set(value, buffer.length);
+            buffer = joined;
+
+            // Each part: --frame, headers (with Content-Length), blank line, JPEG bytes
+            while (true) {
+                let headerEnd = -1;
+                for (let i = 0; i + 3 < buffer.length; i++) {
+                    if (buffer[i] === 13 && buffer[i + 1] === 10 && buffer[i + 2] === 13 && buffer[i + 3] === 10) {
+                        headerEnd = i;
+                        break;
+                    }
+                }
+                if (headerEnd < 0) break;
+                const headers = decoder.decode(buffer.subarray(0, headerEnd));
+                const length = Number(/Content-Length: (\d+)/i.exec(headers)?.[1]);
+                const timestamp = Number(/X-Timestamp: ([\d.]+)/i.exec(headers)?.[1]);
+                const start = headerEnd + 4;
+                if (buffer.length < start + length + 2) break;
+                const image = await createImageBitmap(new Blob([buffer.slice(start, start + length)], { type: "image/jpeg" }));
+                buffer = buffer.slice(start + length + 2);
+                delays.reset();
+                onFrame({ image, timestamp });
+            }
+        }
+    };
+
+    const connect = () => {
+        read()
+            .catch((err) => {
+                if (!stopped) console.error("Raw video feed error:", err);
+            })
+            .finally(() => {
+                if (!stopped) retry = setTimeout(connect, delays.next());
+            });
+    };
+
+    connect();
+    return () => {
+        stopped = true;
+        clearTimeout(retry);
+        controller.abort();
+    };
+}
+
 export async function updateZones(zones: any[]): Promise<any> {
     try {
         const response = await fetch(`${API_BASE_URL}/config/zones`, {
@@ -78,7 +330,8 @@ export interface VideoAnalysisResponse {
     output_video_path: string;
 }
 
-export async function analyzeVideo(videoFile: File): Promise<VideoAnalysisResponse> {
+// /analyze-video answers with a job id at once; the result is polled from /jobs/{job_id}
+export async function analyzeVideo(videoFile: File, pollInterval = 1000): Promise<VideoAnalysisResponse> {
     const formData = new FormData();
     formData.append("file", videoFile);
 
@@ -92,7 +345,17 @@ export async function analyzeVideo(videoFile: File): Promise<VideoAnalysisRespon
             throw new Error(`Error: ${response.statusText}`);
         }
 
-        return await response.json();
+        const { job_id } = await response.json();
+        while (true) {
+            await new Promise((resolve) => setTimeout(resolve, pollInterval));
+            const jobResponse = await fetch(`${API_BASE_URL}/jobs/${job_id}`);
+            if (!jobResponse.ok) {
+                throw new Error(`Error: ${jobResponse.statusText}`);
+            }
+            const job = await jobResponse.json();
+            if (job.status === "complete") return job;
+            if (job.status === "failed") throw new Error(job.error || "Video analysis failed");
+        }
     } catch (error) {
         console.error("Video analysis failed:", error);
         throw error;